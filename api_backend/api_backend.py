@@ -1,36 +1,134 @@
 # Copyright (c) 2023 NGITL
 
-import psycopg2
-import psycopg2.extras
-import json
+import itertools
+import threading
 import logging
 from datetime import date
 
+from api_backend.cache import BestSectorCache, VersionedCache
+from api_backend.connection_pool import ISOLATION_LEVELS, READ_MODES, ConnectionPool, TimedDictCursor
+from api_backend.metrics import track_methods
+from api_backend.replicas import ReplicaRouter
+from api_backend.resource_manager.sql_queries import registry
+from api_backend.versions import VersionTracker
 from api_backend.entities import (
     driver,
     drivertime,
-    convention
+    convention,
+    leaderboard
 ) 
 
+@track_methods
 class Backend:
-    def __init__(self, host, port, user, password, database):
+    def __init__(self, host, port, user, password, database, min_size: int = 1, max_size: int = 10, checkout_timeout: float = 5.0, health_check_interval: float = 30.0, best_sectors_cache: BestSectorCache = None, stats_cache: VersionedCache = None, versions: VersionTracker = None, open: bool = True, replica_dsns: list = None, replica_strategy: str = "round_robin", read_your_writes_window: float = 5.0, read_mode: str = "autocommit", read_isolation_level: str = "DEFAULT"):
+        if read_mode not in READ_MODES:
+            raise ValueError(f"Invalid read mode: {read_mode}. Expected one of: {', '.join(READ_MODES)}.")
+        read_isolation_level = read_isolation_level.replace("_", " ").upper()
+        if read_isolation_level not in ISOLATION_LEVELS:
+            raise ValueError(f"Invalid isolation level: {read_isolation_level}. Expected one of: {', '.join(ISOLATION_LEVELS)}.")
+
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
 
-        self.conn = psycopg2.connect(
+        self.pool = ConnectionPool(
+            min_size=min_size,
+            max_size=max_size,
+            checkout_timeout=checkout_timeout,
+            health_check_interval=health_check_interval,
+            open=False,
             host=self.host,
             port=self.port,
             user=self.user,
             password=self.password,
             database=self.database
         )
-        self.cursor = self.conn.cursor()
-        self.cursor_dict = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        # -- Replicas share the pool settings of the primary, reads are spread across them --
+        self.replicas = [
+            ConnectionPool(
+                min_size=min_size,
+                max_size=max_size,
+                checkout_timeout=checkout_timeout,
+                health_check_interval=health_check_interval,
+                open=False,
+                dsn=dsn
+            )
+            for dsn in replica_dsns or []
+        ]
+        self.router = ReplicaRouter(self.pool, self.replicas, strategy=replica_strategy, window=read_your_writes_window)
+        self.best_sectors_cache = best_sectors_cache if best_sectors_cache is not None else BestSectorCache()
+        self.read_mode = read_mode
+        self.read_isolation_level = read_isolation_level
+        self.stats_cache = stats_cache if stats_cache is not None else VersionedCache()
+        self.versions = versions if versions is not None else VersionTracker()
+
+        self._opened = False
+        self._open_lock = threading.Lock()
+        if open:
+            self._open()
+
+    def _open(self) -> None:
+        """Connect the pool and validate the registered statements, once, on first use."""
+        if self._opened:
+            return
+        with self._open_lock:
+            if self._opened:
+                return
+            self.router.open()
+            # -- Validate the registered statements against the schema before the first query --
+            with self.pool.connection() as conn:
+                registry.prepare_all(conn)
+            self._opened = True
         logging.info("Connected to database")
-    
+
+    def _execute(self, function, *args, dict_cursor: bool = False, read: bool = False, primary: bool = False, **kwargs):
+        """Run an entity function on its own pooled connection and cursor, reads may go to a replica unless `primary` is set.
+
+        Reads run in the configured read mode, by default autocommit, where the
+        commit of the entity function costs no round trip. Writes run in a
+        plain transaction that the entity function commits.
+        """
+        self._open()
+        cursor_factory = TimedDictCursor if dict_cursor else None
+        with self.router.connection(read=read, primary=primary) as conn:
+            if read:
+                conn.set_mode(self.read_mode, self.read_isolation_level)
+            else:
+                conn.set_mode("transaction")
+            with conn.cursor(cursor_factory=cursor_factory) as cursor:
+                return function(conn, cursor, *args, **kwargs)
+
+    def _stream_chunks(self, function, *args, **kwargs):
+        self._open()
+        with self.router.connection(read=True) as conn:
+            # -- Server-side cursors only exist within a transaction --
+            conn.set_mode("transaction" if self.read_mode == "transaction" else "read_only", self.read_isolation_level)
+            yield from function(conn, *args, **kwargs)
+
+    def _stream(self, function, *args, **kwargs):
+        """Run a streaming entity function, the connection is held until the stream is exhausted or closed.
+
+        The first chunk is produced right away, so invalid parameters and query
+        errors are raised here and not after the response has started.
+        """
+        stream = self._stream_chunks(function, *args, **kwargs)
+        first = next(stream)
+        return itertools.chain([first], stream)
+
+    def prewarm(self) -> threading.Thread:
+        """Connect in a background thread, so the first request does not pay for the handshake."""
+        def run():
+            try:
+                self._open()
+            except Exception as e:
+                logging.warning(f"Pre-warming the database connection failed, retrying on first use: {e}")
+
+        thread = threading.Thread(target=run, name="backend-prewarm", daemon=True)
+        thread.start()
+        return thread
+
     # Utility Functions
     def check_correct_datatypes(self, values: dict, required_datatypes: dict):
         for key, value in values.items():
@@ -38,32 +136,53 @@ class Backend:
                 raise TypeError(f"Expected {required_datatypes[key]} for {key} but got {type(value)}")
 
     # Driver Functions
-    def get_drivers(self, sorted_by: str = None, order: str = None, limit: int = None):
+    def get_drivers(self, sorted_by: str = None, order: str = None, limit: int = None, after: str = None, encoding: str = None):
         logging.info("Get all drivers was called.")
-        return driver.get_all_drivers(self.conn, self.cursor_dict, sorted_by=sorted_by, order=order, limit=limit)
+        return self._execute(driver.get_all_drivers, sorted_by=sorted_by, order=order, limit=limit, after=after, encoding=encoding, dict_cursor=encoding is None, read=True)
+
+    def stream_drivers(self, sorted_by: str = None, order: str = None):
+        logging.info("Stream all drivers was called.")
+        return self._stream(driver.stream_drivers, sorted_by=sorted_by, order=order)
 
     def get_driver(self, driver_id: str):
         logging.info(f"Get driver with id: {driver_id} was called.")
-        return driver.get_driver(self.conn, self.cursor_dict, driver_id)
+        return self._execute(driver.get_driver, driver_id, dict_cursor=True, read=True)
+
+    def get_drivers_by_ids(self, driver_ids: list):
+        logging.info(f"Get {len(driver_ids)} drivers by id was called.")
+        return self._execute(driver.get_drivers_by_ids, driver_ids, read=True)
     
     def post_driver(self, driver_name: str, driver_id: str = None, driver_email: str = None) -> dict:
         logging.info(f"Post driver with name: {driver_name} was called.")
-        return driver.post_driver(self.conn, self.cursor, driver_name, driver_id, driver_email)
+        try:
+            return self._execute(driver.post_driver, driver_name, driver_id, driver_email)
+        finally:
+            self.versions.bump("drivers")
     
     def put_driver(self, driver_id: str, values: dict):
         logging.info(f"Update driver with id: {driver_id} was called.")
-        return driver.put_driver(self.conn, self.cursor, driver_id=driver_id, values=values)
+        try:
+            return self._execute(driver.put_driver, driver_id=driver_id, values=values)
+        finally:
+            self.versions.bump("drivers")
     
     def delete_driver(self, driver_id: str):
         logging.info(f"Delete driver with id: {driver_id} was called.")
-        return driver.delete_driver(self.conn, self.cursor, driver_id)
+        try:
+            return self._execute(driver.delete_driver, driver_id)
+        finally:
+            self.versions.bump("drivers")
 
     # Drivertime Functions
-    def get_drivertimes(self, sorted_by: str = None, order: str = None, limit: int = None, driver_id: str = None, convention_id: int = None):
+    def get_drivertimes(self, sorted_by: str = None, order: str = None, limit: int = None, driver_id: str = None, convention_id: int = None, after: str = None, encoding: str = None, expand=None):
         logging.info("Get all drivertimes was called.")
-        return drivertime.get_all_drivertimes(self.conn, self.cursor_dict, sorted_by=sorted_by, order=order, limit=limit, driver_id=driver_id)
+        return self._execute(drivertime.get_all_drivertimes, sorted_by=sorted_by, order=order, limit=limit, driver_id=driver_id, convention_id=convention_id, after=after, encoding=encoding, expand=expand, dict_cursor=encoding is None, read=True)
     
     
+    def stream_drivertimes(self, sorted_by: str = None, order: str = None, driver_id: str = None, convention_id: int = None):
+        logging.info("Stream all drivertimes was called.")
+        return self._stream(drivertime.stream_drivertimes, sorted_by=sorted_by, order=order, driver_id=driver_id, convention_id=convention_id)
+
     def get_drivertimes_best_sectors(self, driver_id: str, convention_id: int):
         if driver_id is not None:
             logging.info(f"Get best sectors for driver with id: {driver_id} was called.")
@@ -72,46 +191,127 @@ class Backend:
         else:
             logging.info(f"Get best overall sectors for all drivers was called.")
 
-        return drivertime.get_best_sectors(self.conn, self.cursor_dict, driver_id, convention_id)
+        best_sectors, generation = self.best_sectors_cache.get(driver_id, convention_id)
+        if best_sectors is not None:
+            return best_sectors
+
+        # -- Read from the primary, a lagging replica would leave a stale entry in the cache --
+        best_sectors = self._execute(drivertime.get_best_sectors, driver_id, convention_id, dict_cursor=True, read=True, primary=True)
+        self.best_sectors_cache.put(driver_id, convention_id, best_sectors, generation)
+        return best_sectors
+
+    def get_drivertime_stats(self, driver_id: str = None, convention_id: int = None, buckets: int = 10) -> dict:
+        logging.info(f"Get drivertime stats for driver: {driver_id} and convention: {convention_id} was called.")
+
+        # -- Read the version before querying, a write in between leaves the entry stale for the next call --
+        version = self.versions.version("drivertimes", convention_id)
+        key = (
+            str(driver_id).lower() if driver_id is not None else None,
+            str(convention_id).strip() if convention_id is not None else None,
+            buckets
+        )
+        stats = self.stats_cache.get(key, version)
+        if stats is not None:
+            return stats
+
+        # -- Read from the primary, a lagging replica would leave a stale entry in the cache --
+        stats = self._execute(drivertime.get_drivertime_stats, driver_id, convention_id, buckets, read=True, primary=True)
+        self.stats_cache.put(key, version, stats)
+        return stats
+
+    def get_leaderboard(self, convention_id: int):
+        logging.info(f"Get leaderboard for convention with id: {convention_id} was called.")
+        return self._execute(leaderboard.get_leaderboard, convention_id, dict_cursor=True, read=True)
 
     def get_drivertime(self, drivertime_id: int):
         logging.info(f"Get drivertime with id: {drivertime_id} was called.")
-        return drivertime.get_drivertime(self.conn, self.cursor_dict, drivertime_id)
+        return self._execute(drivertime.get_drivertime, drivertime_id, dict_cursor=True, read=True)
+
+    def get_drivertimes_by_ids(self, drivertime_ids: list):
+        logging.info(f"Get {len(drivertime_ids)} drivertimes by id was called.")
+        return self._execute(drivertime.get_drivertimes_by_ids, drivertime_ids, read=True)
     
-    def post_drivertime(self, driver_id: str, convention_id: int, drivertime_sector1: float, drivertime_sector2: float, drivertime_sector3: float, drivertime_laptime: float):
+    def post_drivertime(self, driver_id: str, convention_id: int, drivertime_sector1: float, drivertime_sector2: float, drivertime_sector3: float, drivertime_laptime: float, placement: bool = False):
         logging.info(f"Post drivertime with driver_id: {driver_id} and convention_id: {convention_id} was called.")
-        return drivertime.post_drivertime(self.conn, self.cursor, driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime)
+        result = self._execute(drivertime.post_drivertime, driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, placement)
+        self.best_sectors_cache.record_drivertime(result["driver_id"], result["convention_id"], result["sector1"], result["sector2"], result["sector3"], result["laptime"])
+        self.versions.bump("drivertimes", result["convention_id"])
+        return result
     
+    def post_drivertimes(self, rows: list, checkpoint: tuple = None) -> dict:
+        logging.info(f"Post {len(rows)} drivertimes in bulk was called.")
+        try:
+            return self._execute(drivertime.post_drivertimes, rows, checkpoint)
+        finally:
+            self.best_sectors_cache.invalidate()
+            self.versions.bump("drivertimes")
+
+    def get_write_behind_checkpoint(self, buffer: str) -> int:
+        return self._execute(drivertime.get_checkpoint, buffer, read=True, primary=True)
+
     def delete_drivertime(self, drivertime_id):
         logging.info(f"Delete drivertime with id: {drivertime_id} was called.")
-        return drivertime.delete_drivertime(self.conn, self.cursor, drivertime_id)
+        try:
+            return self._execute(drivertime.delete_drivertime, drivertime_id)
+        finally:
+            self.best_sectors_cache.invalidate()
+            self.versions.bump("drivertimes")
 
     # Convention Functions
-    def get_conventions(self, sorted_by: str = None, order: str = None, limit: int = None):
+    def get_conventions(self, sorted_by: str = None, order: str = None, limit: int = None, after: str = None, encoding: str = None):
         logging.info("Get all conventions was called.")
-        return convention.get_all_conventions(self.conn, self.cursor_dict, sorted_by=sorted_by, order=order, limit=limit)
+        return self._execute(convention.get_all_conventions, sorted_by=sorted_by, order=order, limit=limit, after=after, encoding=encoding, dict_cursor=encoding is None, read=True)
     
     def get_convention(self, convention_id: int):
         logging.info(f"Get convention with id: {convention_id} was called.")
-        return convention.get_convention(self.conn, self.cursor_dict, convention_id)
+        return self._execute(convention.get_convention, convention_id, dict_cursor=True, read=True)
+
+    def get_conventions_by_ids(self, convention_ids: list):
+        logging.info(f"Get {len(convention_ids)} conventions by id was called.")
+        return self._execute(convention.get_conventions_by_ids, convention_ids, read=True)
     
     def post_convention(self, convention_name: str, convention_location: str, convention_date: date):
         logging.info(f"Post convention with name: {convention_name} was called.")
-        return convention.post_convention(self.conn, self.cursor, convention_name, convention_location, convention_date)
+        try:
+            return self._execute(convention.post_convention, convention_name, convention_location, convention_date)
+        finally:
+            self.versions.bump("conventions")
     
     def delete_convention(self, convention_id: int):
         logging.info(f"Delete convention with id: {convention_id} was called.")
-        return convention.delete_convention(self.conn, self.cursor, convention_id)
+        try:
+            return self._execute(convention.delete_convention, convention_id)
+        finally:
+            self.versions.bump("conventions")
     
     def update_convention(self, convention_id: int, values: dict):
         logging.info(f"Update convention with id: {convention_id} was called.")
-        return convention.post_convention(self.conn, self.cursor, convention_id, values)
+        try:
+            return self._execute(convention.put_convention, convention_id, values)
+        finally:
+            self.versions.bump("conventions")
     
     
+    # Pool Functions
+    def get_pool_stats(self) -> dict:
+        stats = self.pool.stats()
+        if self.replicas:
+            stats["routing"] = self.router.stats()
+        return stats
+
+    def get_cache_stats(self) -> dict:
+        stats = self.best_sectors_cache.stats()
+        stats["drivertime_stats"] = self.stats_cache.stats()
+        return stats
+
+    def get_statement_stats(self) -> dict:
+        return registry.stats()
+
+    def get_version_stats(self) -> dict:
+        return self.versions.stats()
+
     def close(self):
-        self.cursor.close()
-        self.cursor_dict.close()
-        self.conn.close()
+        self.router.close()
         logging.info("Disconnected from database")
 
 
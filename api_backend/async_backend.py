@@ -0,0 +1,210 @@
+# Copyright (c) 2023 NGITL
+
+import logging
+import time
+
+from api_backend import pagination, query_builder
+from api_backend.cache import BestSectorCache
+from api_backend.metrics import metrics, track_methods
+from api_backend.entities import (
+    driver,
+    drivertime,
+    convention,
+    leaderboard
+)
+from api_backend.entities.driver import DriverNotFound, _driver_to_dict
+from api_backend.entities.drivertime import DriverTimeNotFound, _drivertime_to_dict
+from api_backend.entities.convention import ConventionNotFound, _convention_to_dict
+from api_backend.resource_manager.sql_queries import registry
+from api_backend.versions import VersionTracker
+
+
+DRIVER_COLUMNS = "id, name, email, createdAt"
+CONVENTION_COLUMNS = "id, name, location, date"
+DRIVERTIME_COLUMNS = "id, sector1, sector2, sector3, laptime, driver, convention"
+
+
+@track_methods
+class AsyncBackend:
+    """Asyncio counterpart of `Backend` built on psycopg 3 and its async pool.
+
+    The pool is created and opened on first use, because it needs a running
+    event loop, which also keeps psycopg 3 out of the cold start import.
+    psycopg 3 prepares repeated statements on its own, so the statement
+    registry is only used for its SQL texts here. With the "autocommit" read
+    mode the pooled connections run in autocommit and reads need no BEGIN and
+    COMMIT, writes open their transaction explicitly.
+    """
+    def __init__(self, host, port, user, password, database, min_size: int = 1, max_size: int = 10, checkout_timeout: float = 5.0, best_sectors_cache: BestSectorCache = None, versions: VersionTracker = None, read_mode: str = "autocommit"):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.read_mode = read_mode
+
+        self.pool = None
+        self._opened = False
+        self.best_sectors_cache = best_sectors_cache if best_sectors_cache is not None else BestSectorCache()
+        self.versions = versions if versions is not None else VersionTracker()
+
+    async def _open(self) -> None:
+        if not self._opened:
+            if self.pool is None:
+                import psycopg
+                from psycopg_pool import AsyncConnectionPool
+
+                self.pool = AsyncConnectionPool(
+                    conninfo=psycopg.conninfo.make_conninfo(
+                        host=self.host,
+                        port=self.port,
+                        user=self.user,
+                        password=self.password,
+                        dbname=self.database
+                    ),
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    timeout=self.checkout_timeout,
+                    kwargs={"autocommit": self.read_mode == "autocommit"},
+                    open=False
+                )
+            await self.pool.open()
+            self._opened = True
+            logging.info("Connected to database (async)")
+
+    async def _fetch(self, query, params: tuple = None, many: bool = True):
+        await self._open()
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                start = time.perf_counter()
+                await cursor.execute(query, params)
+                metrics.observe_execute(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                if many:
+                    rows = await cursor.fetchall()
+                    metrics.observe_fetch(time.perf_counter() - start, len(rows))
+                    return rows
+                row = await cursor.fetchone()
+                metrics.observe_fetch(time.perf_counter() - start, 0 if row is None else 1)
+                return row
+
+    async def _fetch_page(self, query: query_builder.Select, to_dict, sorted_by: str, order: str, limit: int, after: str) -> dict:
+        # -- Stable statement texts, psycopg prepares them once they repeat --
+        rows = await self._fetch(*query.page(sorted_by, order, limit, after).build())
+        return {
+            "items": [to_dict(row) for row in rows[:query.size]],
+            "next": pagination.next_cursor(rows, query.size, query.sort_index),
+        }
+
+    # Driver Functions
+    async def get_drivers(self, sorted_by: str = None, order: str = None, limit: int = None, after: str = None):
+        logging.info("Get all drivers was called.")
+        return await self._fetch_page(
+            query_builder.Select("drivers", DRIVER_COLUMNS, driver.SORT_COLUMNS),
+            _driver_to_dict, sorted_by, order, limit, after
+        )
+
+    async def get_driver(self, driver_id: str):
+        logging.info(f"Get driver with id: {driver_id} was called.")
+        row = await self._fetch(f"SELECT {DRIVER_COLUMNS} FROM drivers WHERE id = %s", (driver_id,), many=False)
+        if row is None:
+            raise DriverNotFound(driver_id)
+        return _driver_to_dict(row)
+
+    # Drivertime Functions
+    async def get_drivertimes(self, sorted_by: str = None, order: str = None, limit: int = None, driver_id: str = None, convention_id: int = None, after: str = None):
+        logging.info("Get all drivertimes was called.")
+        query = (
+            query_builder.Select("drivertimes", DRIVERTIME_COLUMNS, drivertime.SORT_COLUMNS)
+            .filter("driver", driver_id)
+            .filter("convention", convention_id)
+        )
+        return await self._fetch_page(query, _drivertime_to_dict, sorted_by, order, limit, after)
+
+    async def get_drivertimes_best_sectors(self, driver_id: str, convention_id: int):
+        logging.info(f"Get best sectors for driver: {driver_id} and convention: {convention_id} was called.")
+        best_sectors, generation = self.best_sectors_cache.get(driver_id, convention_id)
+        if best_sectors is not None:
+            return best_sectors
+
+        query = (
+            query_builder.Select("drivertimes", "MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime)")
+            .filter("driver", driver_id)
+            .filter("convention", convention_id)
+        )
+
+        best_sector1, best_sector2, best_sector3, best_laptime = await self._fetch(*query.build(), many=False)
+        best_sectors = {
+            "sector_1_best_time": best_sector1,
+            "sector_2_best_time": best_sector2,
+            "sector_3_best_time": best_sector3,
+            "lap_best_time": best_laptime
+        }
+        self.best_sectors_cache.put(driver_id, convention_id, best_sectors, generation)
+        return best_sectors
+
+    async def get_drivertime(self, drivertime_id: int):
+        logging.info(f"Get drivertime with id: {drivertime_id} was called.")
+        row = await self._fetch(f"SELECT {DRIVERTIME_COLUMNS} FROM drivertimes WHERE id = %s", (drivertime_id,), many=False)
+        if row is None:
+            raise DriverTimeNotFound(drivertime_id)
+        return _drivertime_to_dict(row)
+
+    async def post_drivertime(self, driver_id: str, convention_id: int, drivertime_sector1: float, drivertime_sector2: float, drivertime_sector3: float, drivertime_laptime: float, placement: bool = False):
+        logging.info(f"Post drivertime with driver_id: {driver_id} and convention_id: {convention_id} was called.")
+        await self._open()
+        # -- Explicit transaction, the pooled connections may be in autocommit --
+        async with self.pool.connection() as conn:
+            async with conn.transaction(), conn.cursor() as cursor:
+                await cursor.execute(
+                    "INSERT INTO drivertimes (driver, convention, sector1, sector2, sector3, laptime) "
+                    f"VALUES (%s, %s, %s, %s, %s, %s) RETURNING {DRIVERTIME_COLUMNS}",
+                    (driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime)
+                )
+                row = await cursor.fetchone()
+                drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id = row
+                result = _drivertime_to_dict(row)
+                if driver_id is not None and convention_id is not None:
+                    if placement:
+                        await cursor.execute(registry["BEST_LEADERBOARD"].text, (convention_id, driver_id))
+                        previous = await cursor.fetchone()
+                    await cursor.execute(registry["RECORD_LEADERBOARD"].text, (convention_id, driver_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime))
+                    if placement:
+                        await cursor.execute(registry["PLACEMENT_LEADERBOARD"].text, (convention_id, drivertime_laptime, driver_id, convention_id))
+                        faster, p1_laptime = await cursor.fetchone()
+                        result["placement"] = leaderboard.placement(faster, p1_laptime, drivertime_laptime, previous[0] if previous is not None else None)
+        self.best_sectors_cache.record_drivertime(driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime)
+        self.versions.bump("drivertimes", convention_id)
+        return result
+
+    # Convention Functions
+    async def get_conventions(self, sorted_by: str = None, order: str = None, limit: int = None, after: str = None):
+        logging.info("Get all conventions was called.")
+        return await self._fetch_page(
+            query_builder.Select("conventions", CONVENTION_COLUMNS, convention.SORT_COLUMNS),
+            _convention_to_dict, sorted_by, order, limit, after
+        )
+
+    async def get_convention(self, convention_id: int):
+        logging.info(f"Get convention with id: {convention_id} was called.")
+        row = await self._fetch(f"SELECT {CONVENTION_COLUMNS} FROM conventions WHERE id = %s", (convention_id,), many=False)
+        if row is None:
+            raise ConventionNotFound(convention_id)
+        return _convention_to_dict(row)
+
+    # Pool Functions
+    def get_pool_stats(self) -> dict:
+        if self.pool is None:
+            return {}
+        return self.pool.get_stats()
+
+    async def close(self):
+        if self._opened:
+            await self.pool.close()
+            self._opened = False
+        logging.info("Disconnected from database (async)")
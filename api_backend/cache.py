@@ -0,0 +1,136 @@
+# Copyright (c) 2023 NGITL
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def _lower(cached, new):
+    if cached is None:
+        return new
+    if new is None:
+        return cached
+    return min(cached, new)
+
+
+class BestSectorCache:
+    """In-process cache of best sector results keyed by (driver_id, convention_id).
+
+    A new lap can only lower the minimums, so posts adjust the cached entries
+    in place. Deletes clear the cache. Entries expire after `ttl` seconds to
+    bound staleness against writes made by other instances.
+    """
+    def __init__(self, ttl: float = 10.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(driver_id, convention_id) -> tuple:
+        return (
+            str(driver_id).lower() if driver_id is not None else None,
+            str(convention_id).strip() if convention_id is not None else None
+        )
+
+    def get(self, driver_id, convention_id) -> tuple:
+        """Return (best_sectors, generation). best_sectors is None on a miss."""
+        key = self._key(driver_id, convention_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self.hits += 1
+                return dict(entry[0]), self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def put(self, driver_id, convention_id, best_sectors: dict, generation: int) -> None:
+        """Store a queried result, unless a write happened since `generation` was read."""
+        key = self._key(driver_id, convention_id)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (dict(best_sectors), time.monotonic())
+
+    def record_drivertime(self, driver_id, convention_id, sector1, sector2, sector3, laptime) -> None:
+        """Lower the cached minimums that a new lap belongs to."""
+        driver_key, convention_key = self._key(driver_id, convention_id)
+        with self._lock:
+            self._generation += 1
+            for key in {(driver_key, convention_key), (driver_key, None), (None, convention_key), (None, None)}:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                best_sectors = entry[0]
+                best_sectors["sector_1_best_time"] = _lower(best_sectors["sector_1_best_time"], sector1)
+                best_sectors["sector_2_best_time"] = _lower(best_sectors["sector_2_best_time"], sector2)
+                best_sectors["sector_3_best_time"] = _lower(best_sectors["sector_3_best_time"], sector3)
+                best_sectors["lap_best_time"] = _lower(best_sectors["lap_best_time"], laptime)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+class VersionedCache:
+    """In-process cache of query results that stay valid while a data version does not change.
+
+    Callers read the version before querying and store the result under it,
+    a write bumps the version and with it turns the old entries into misses.
+    Entries also expire after `ttl` seconds to bound staleness against
+    writes made by other instances. The oldest entries are evicted beyond
+    `max_entries`.
+    """
+    def __init__(self, ttl: float = 10.0, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version: str):
+        """Return the result stored for `key` at `version`, None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version and (self.ttl is None or time.monotonic() - entry[2] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, version: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, version, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,301 @@
+# Copyright (c) 2023 NGITL
+
+import threading
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+from api_backend.metrics import metrics
+
+
+class _TimedCursorMixin:
+    """Records execute and fetch time and fetched rows in the metrics of the running route."""
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            metrics.observe_execute(time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        metrics.observe_fetch(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        metrics.observe_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        metrics.observe_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+
+class TimedCursor(_TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class TimedDictCursor(_TimedCursorMixin, psycopg2.extras.DictCursor):
+    pass
+
+
+# -- Session modes of a checked out connection, "transaction" is also the mode of writes --
+READ_MODES = ("autocommit", "read_only", "transaction")
+ISOLATION_LEVELS = ("DEFAULT", "READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE")
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has prepared and times its cursors."""
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.cursor_factory = TimedCursor
+        self.mode = ("transaction", "DEFAULT")
+
+    def set_mode(self, mode: str, isolation_level: str = "DEFAULT") -> None:
+        """Switch an idle connection between autocommit, read only transactions and plain transactions.
+
+        psycopg2 keeps these settings client-side and sends them with the next
+        BEGIN, so switching costs no round trip. In autocommit there is no
+        BEGIN and `commit()` returns without contacting the server.
+        """
+        if mode == "transaction":
+            isolation_level = "DEFAULT"
+        if self.mode == (mode, isolation_level):
+            return
+        # -- Leave autocommit first, outside of it read only and isolation are not sent as SET commands --
+        self.autocommit = False
+        if mode == "read_only":
+            self.set_session(isolation_level=isolation_level, readonly=True)
+        else:
+            self.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+        if mode == "autocommit":
+            self.autocommit = True
+        self.mode = (mode, isolation_level)
+
+
+class PoolTimeout(Exception):
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        super().__init__(f"No database connection available within {timeout} seconds.")
+
+
+class PoolClosed(Exception):
+    def __init__(self) -> None:
+        super().__init__("Connection pool is closed.")
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are checked out per request and returned afterwards, so
+    concurrent invocations never share a cursor or a transaction.
+    """
+    def __init__(
+            self,
+            min_size: int = 1,
+            max_size: int = 10,
+            checkout_timeout: float = 5.0,
+            health_check_interval: float = 30.0,
+            open: bool = True,
+            **connect_kwargs
+            ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+        self.connect_kwargs.setdefault("connection_factory", PooledConnection)
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+
+        self._metrics = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+        # -- A pool that is not opened connects on demand, at the first checkout --
+        if open:
+            self.open()
+
+    # Internal Functions
+    def _connect(self) -> psycopg2.extensions.connection:
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._metrics["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+
+        # -- Only ping connections that sat idle long enough to have been dropped --
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: psycopg2.extensions.connection) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._metrics["discarded"] += 1
+            self._cond.notify()
+
+    def open(self) -> None:
+        """Open connections until `min_size` are in the pool."""
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolClosed()
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    # Checkout Functions
+    def getconn(self, timeout: float = None) -> psycopg2.extensions.connection:
+        """Check out a connection, waiting at most `timeout` seconds."""
+        if timeout is None:
+            timeout = self.checkout_timeout
+
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            conn = None
+            idle_since = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosed()
+
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["timeouts"] += 1
+                        raise PoolTimeout(timeout)
+                    self._cond.wait(remaining)
+
+            # -- Connect and health check outside of the lock --
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            elif not self._is_healthy(conn, idle_since):
+                logging.warning("Discarding unhealthy database connection.")
+                with self._cond:
+                    self._metrics["health_check_failures"] += 1
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._metrics["checkouts"] += 1
+                self._metrics["wait_seconds_total"] += time.monotonic() - start
+            return conn
+
+    def putconn(self, conn: psycopg2.extensions.connection, discard: bool = False) -> None:
+        """Return a connection to the pool."""
+        if not discard and not conn.closed:
+            # -- Never hand out a connection with a transaction left open --
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    # Utility Functions
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            })
+        return stats
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+        for conn, _ in idle:
+            self._discard(conn)
+        logging.info("Connection pool closed")
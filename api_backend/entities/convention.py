@@ -2,51 +2,49 @@ from datetime import date
 
 import psycopg2
 
+from api_backend import pagination, query_builder, serialization
+from api_backend.resource_manager.sql_queries import registry
+
+# -- Sortable keys with their column and position in "SELECT *" --
+# -- Only NOT NULL columns, keyset comparisons skip rows with NULL values --
+SORT_COLUMNS = {
+    "id": ("id", 0),
+    "name": ("name", 1),
+}
+
+# -- Output keys and value kinds in "SELECT *" order, for the encoded list paths --
+ENCODER_COLUMNS = [("id", "int"), ("name", "str"), ("location", "str"), ("created", "date")]
+ENCODER = serialization.RowEncoder(ENCODER_COLUMNS)
+
+# -- Columns a post or an update may set --
+CONVENTION_COLUMNS = ("name", "location", "date")
+
 class ConventionNotFound(Exception):
-    def __init__(self, con_id) -> None:
-        self.args = con_id
-        super().__init__(f"Driver not found: {self.args}")
+    def __init__(self, convention_id) -> None:
+        self.id = convention_id
+        super().__init__(f"Convention not found with ID: {convention_id}")
 
 def post_convention(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         convention_name: str, 
         convention_location: str = None,
-        convetion_date: date = None
+        convention_date: date = None
         ) -> dict:
     """Post a new convention to the database."""
     try:    
-        sql_query = ""
-
         if convention_name is None:
             raise ValueError("No Convention name given.")
 
-        elif convention_location is None and convention_date is None:
-            sql_query = "INSERT INTO conventions (name) VALUES (%s) RETURNING *"
-            cursor.execute(sql_query, (convention_name,))
-        
-        elif convention_location is None:
-            sql_query = "INSERT INTO conventions (name, date) VALUES (%s, %s) RETURNING *"
-            cursor.execute(sql_query, (convention_name, convetion_date))
-        
-        elif convetion_date is None:
-            sql_query = "INSERT INTO conventions (name, location) VALUES (%s, %s) RETURNING *"
-            cursor.execute(sql_query, (convention_name, convention_location))
-        
-        else:
-            sql_query = "INSERT INTO conventions (name, location, date) VALUES (%s, %s, %s) RETURNING *"
-            cursor.execute(sql_query, (convention_name, convention_location, convetion_date))
-
+        # -- The statement only holds the given columns --
+        values = {"name": convention_name, "location": convention_location, "date": convention_date}
+        sql_query, params = query_builder.insert("conventions", values, CONVENTION_COLUMNS)
+        registry.execute_built(cursor, sql_query, params)
 
-        convention_id, convention_name, convention_location, convention_date = cursor.fetchone()
+        row = cursor.fetchone()
         connection.commit()
 
-        return {
-            "id": convention_id,
-            "name": convention_name,
-            "location": convention_location,
-            "created": convention_date.strftime("%Y-%m-%d"),
-        }
+        return _convention_to_dict(row)
     
 
     except psycopg2.Error as e:
@@ -60,12 +58,12 @@ def get_convention(
         ) -> dict:
     """Get a convention from the database."""
     try:
-        sql_query = "SELECT * FROM conventions WHERE id = %s"
-        cursor.execute(sql_query, (convention_id,))
-        convention_id, convention_name, convention_location, convention_created = cursor.fetchone()
-        if convention_id is None: 
+        registry.execute(cursor, "GET_CONVENTION", (convention_id,))
+        row = cursor.fetchone()
+        if row is None: 
             raise ConventionNotFound(convention_id)
         else:
+            convention_id, convention_name, convention_location, convention_created = row
             connection.commit()
             if convention_created is not None:
                 convention_created = convention_created.strftime("%Y-%m-%d")
@@ -79,121 +77,108 @@ def get_convention(
         connection.rollback()
         raise e
 
+def _convention_to_dict(row) -> dict:
+    convention_id, convention_name, convention_location, convention_created = row
+    if convention_created is not None:
+        convention_created = convention_created.strftime("%Y-%m-%d")
+    return {
+        "id": convention_id,
+        "name": convention_name,
+        "location": convention_location,
+        "created": convention_created,
+    }
+
+def get_conventions_by_ids(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        convention_ids: list
+        ) -> list:
+    """Get several conventions with one query, in request order and with a marker for each missing ID."""
+    try:
+        registry.execute(cursor, "GET_CONVENTIONS_BY_IDS", (list(dict.fromkeys(convention_ids)),))
+        found = {row[0]: _convention_to_dict(row) for row in cursor.fetchall()}
+        connection.commit()
+
+        return [found.get(convention_id, {"id": convention_id, "not_found": True}) for convention_id in convention_ids]
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
 def get_all_conventions(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         sorted_by: str = None,
         order: str = None,
-        limit: int = None
-        ) -> list:
-    """Get all conventions from the database."""
+        limit: int = None,
+        after: str = None,
+        encoding: str = None
+        ) -> dict:
+    """Get one page of conventions from the database, `encoding` returns the items as bytes in that encoding."""
     try:
-        sql_query = "SELECT * FROM conventions"
-
-        if sorted_by is not None:
-            sql_query += f" ORDER BY {sorted_by}"
-            if order is not None:
-                sql_query += f" {order}"
-        
-        if limit is not None:
-            sql_query += f" LIMIT {limit}"
-
-        cursor.execute(sql_query)
-        conventions = []
-        for convention_id, convention_name, convention_location, convention_created in cursor.fetchall():
-            if convention_created is not None:
-                convention_created = convention_created.strftime("%Y-%m-%d")
-            conventions.append({
-                "id": convention_id,
-                "name": convention_name,
-                "location": convention_location,
-                "created": convention_created,
-            })
+        query = query_builder.Select("conventions", sort_columns=SORT_COLUMNS).page(sorted_by, order, limit, after)
+        size = query.size
+
+        registry.execute_built(cursor, *query.build())
+        rows = cursor.fetchall()
         connection.commit()
-        return conventions
+
+        if encoding is not None:
+            conventions = ENCODER.encode_as(rows[:size], encoding)
+        else:
+            conventions = [_convention_to_dict(row) for row in rows[:size]]
+        return {
+            "items": conventions,
+            "next": pagination.next_cursor(rows, size, query.sort_index),
+        }
     except psycopg2.Error as e:
         connection.rollback()
         raise e
 
-def post_convention(
+def put_convention(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         convention_id: int,
         values: dict
         ) -> dict:
-    """Update a convention in the database."""
+    """Update a convention in the database, one statement, zero updated rows raise ConventionNotFound."""
     if not values:
         raise ValueError("No valid values to update.")
 
     try:
-        get_convention(connection, cursor, convention_id)
-        key_list = list(values.keys())
-        try:
-            if "name" in key_list and "location" in key_list and "date" in key_list:
-                sql_query = "UPDATE conventions SET name = %s, location = %s, date = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["name"], values["location"], values["date"], convention_id))
-            
-            elif "name" in key_list and "location" in key_list:
-                sql_query = "UPDATE conventions SET name = %s, location = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["name"], values["location"], convention_id))
-            
-            elif "name" in key_list and "date" in key_list:
-                sql_query = "UPDATE conventions SET name = %s, date = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["name"], values["date"], convention_id))
-            
-            elif "location" in key_list and "date" in key_list:
-                sql_query = "UPDATE conventions SET location = %s, date = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["location"], values["date"], convention_id))
-            
-            elif "name" in key_list:
-                sql_query = "UPDATE conventions SET name = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["name"], convention_id))
-            
-            elif "location" in key_list:
-                sql_query = "UPDATE conventions SET location = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["location"], convention_id))
-            
-            elif "date" in key_list:
-                sql_query = "UPDATE conventions SET date = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (values["date"], convention_id))
-
-            else:
-                raise ValueError("No valid values to update.")
-            
-            convention_id, convention_name, convention_location, convention_created = cursor.fetchone()
-            connection.commit()
-            
-            return {
-                "convention_id": convention_id,
-                "name": convention_name,
-                "location": convention_location,
-                "created": convention_created.strftime("%Y-%m-%d"),
-            }
+        # -- Only the given columns are set, raises ValueError without valid values --
+        sql_query, params = query_builder.update("conventions", values, CONVENTION_COLUMNS, "id", convention_id)
+        registry.execute_built(cursor, sql_query, params)
 
-        except psycopg2.Error as e:
+        row = cursor.fetchone()
+        if row is None:
             connection.rollback()
-            raise e
-        
-    except ConventionNotFound as e:
-        raise e(convention_id)
+            raise ConventionNotFound(convention_id)
+
+        connection.commit()
+
+        return _convention_to_dict(row)
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
 
 def delete_convention(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         convention_id: int
         ) -> str:
+    """Delete a convention from the database, zero deleted rows raise ConventionNotFound."""
     try:
-        get_convention(connection, cursor, convention_id)
-        try:
-            sql_query = "DELETE FROM conventions WHERE id = %s RETURNING *"
-            cursor.execute(sql_query, (convention_id,))
-            connection.commit()
-
-            return f'Convention deleted with id: {convention_id}'
-        except psycopg2.Error as e:
+        registry.execute(cursor, "DELETE_CONVENTION", (convention_id,))
+        if cursor.fetchone() is None:
             connection.rollback()
-            raise e
-        
-    except ConventionNotFound as e:
-        raise e(convention_id)
+            raise ConventionNotFound(convention_id)
+        connection.commit()
+
+        return f'Convention deleted with id: {convention_id}'
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
       
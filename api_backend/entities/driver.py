@@ -1,5 +1,27 @@
+import uuid
+
 import psycopg2
 
+from api_backend import pagination, query_builder, serialization, streaming
+from api_backend.resource_manager.sql_queries import registry
+
+# -- Sortable keys with their column and position in "SELECT *" --
+# -- Only NOT NULL columns, keyset comparisons skip rows with NULL values, createdAt since migration 0005 --
+SORT_COLUMNS = {
+    "id": ("id", 0),
+    "name": ("name", 1),
+    "created": ("createdAt", 3),
+    "createdat": ("createdAt", 3),
+}
+
+# -- Columns a post or an update may set --
+INSERT_COLUMNS = ("name", "id", "email")
+UPDATE_COLUMNS = ("email", "name")
+
+# -- Output keys and value kinds in "SELECT *" order, for the encoded list paths --
+ENCODER_COLUMNS = [("id", "str"), ("name", "str"), ("email", "str"), ("created", "timestamp")]
+ENCODER = serialization.RowEncoder(ENCODER_COLUMNS)
+
 
 class DriverNotFound(Exception):
     def __init__(self, driver_id: str) -> None:
@@ -16,26 +38,12 @@ def post_driver(
         ) -> dict:
     """Post a new driver to the database."""
     try:    
-        # -- Check if values are valid and create SQL Query according to it --
-        sql_query = ""
+        # -- Check if values are valid, the statement only holds the given columns --
         if driver_name is None:
             raise ValueError("No valid values to post.")
-        
-        elif driver_id is None and driver_email is None:
-            sql_query = "INSERT INTO drivers (name) VALUES (%s) RETURNING *"
-            cursor.execute(sql_query, (driver_name,))
-        
-        elif driver_id is None:
-            sql_query = "INSERT INTO drivers (name, email) VALUES (%s, %s) RETURNING *"
-            cursor.execute(sql_query, (driver_name, driver_email))
 
-        elif driver_email is None:
-            sql_query = "INSERT INTO drivers (name, id) VALUES (%s, %s) RETURNING *"
-            cursor.execute(sql_query, (driver_name, driver_id))
-        
-        else:
-            sql_query = "INSERT INTO drivers (name, id, email) VALUES (%s, %s, %s) RETURNING *"
-            cursor.execute(sql_query, (driver_name, driver_id, driver_email))
+        sql_query, params = query_builder.insert("drivers", {"name": driver_name, "id": driver_id, "email": driver_email}, INSERT_COLUMNS)
+        registry.execute_built(cursor, sql_query, params)
 
         driver_id, driver_name, driver_email, driver_created = cursor.fetchone()
         connection.commit()
@@ -60,8 +68,7 @@ def get_driver(
     """Get a driver from the database."""
     try:
         # -- Check if driver exists --
-        sql_query = "SELECT * FROM drivers WHERE id = %s"
-        cursor.execute(sql_query, (driver_id,))
+        registry.execute(cursor, "GET_DRIVER", (driver_id,))
         try:
             driver_id, driver_name, driver_email, driver_created = cursor.fetchone()
 
@@ -82,40 +89,50 @@ def get_driver(
         connection.rollback()
         raise e
 
-def get_all_drivers(
+def get_drivers_by_ids(
         connection: psycopg2.extensions.connection,
         cursor: psycopg2.extensions.cursor,
-        sorted_by: str = None,
-        order: str = None,
-        limit: int = None
+        driver_ids: list
         ) -> list:
-    """Get all drivers from the database."""
-    try: 
-        # -- Create SQL Query --
-        sql_query = "SELECT * FROM drivers"
+    """Get several drivers with one query, in request order and with a marker for each missing ID."""
+    try:
+        registry.execute(cursor, "GET_DRIVERS_BY_IDS", (list(dict.fromkeys(driver_ids)),))
+        found = {str(row[0]): _driver_to_dict(row) for row in cursor.fetchall()}
+        connection.commit()
 
-        # -- Add sorting, ordering and limiting --
-        if sorted_by is not None:
-            sql_query += f" ORDER BY {sorted_by}"
+        return [found.get(str(driver_id), {"id": driver_id, "not_found": True}) for driver_id in driver_ids]
 
-            if order is not None and order.lower() in ["asc", "desc"]:
-                sql_query += f" {order}"
-        
-        if limit is not None:
-            sql_query += f" LIMIT {limit}"
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
 
-        cursor.execute(sql_query)
+def get_all_drivers(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        sorted_by: str = None,
+        order: str = None,
+        limit: int = None,
+        after: str = None,
+        encoding: str = None
+        ) -> dict:
+    """Get one page of drivers from the database, `encoding` returns the items as bytes in that encoding."""
+    try: 
+        # -- Resolve sorting and page size --
+        query = query_builder.Select("drivers", sort_columns=SORT_COLUMNS).page(sorted_by, order, limit, after)
+        size = query.size
 
-        drivers = []
-        for driver_id, driver_name, driver_email, driver_created in cursor.fetchall():
-            drivers.append({
-            "id": driver_id,
-            "name": driver_name,
-            "email": driver_email,
-            "created": driver_created.strftime("%Y-%m-%d-%H-%M-%S"),
-        })
+        registry.execute_built(cursor, *query.build())
+        rows = cursor.fetchall()
         connection.commit()
-        return drivers
+
+        if encoding is not None:
+            drivers = ENCODER.encode_as(rows[:size], encoding)
+        else:
+            drivers = [_driver_to_dict(row) for row in rows[:size]]
+        return {
+            "items": drivers,
+            "next": pagination.next_cursor(rows, size, query.sort_index),
+        }
     
     except psycopg2.Error as e:
         connection.rollback()
@@ -125,84 +142,93 @@ def get_all_drivers(
         connection.rollback()
         raise e
 
+def _driver_to_dict(row) -> dict:
+    driver_id, driver_name, driver_email, driver_created = row
+    # -- psycopg 3 returns UUID objects, psycopg2 strings --
+    return {
+        "id": str(driver_id),
+        "name": driver_name,
+        "email": driver_email,
+        "created": driver_created.strftime("%Y-%m-%d-%H-%M-%S"),
+    }
+
+def stream_drivers(
+        connection: psycopg2.extensions.connection,
+        sorted_by: str = None,
+        order: str = None,
+        itersize: int = 2000
+        ):
+    """Stream all drivers as JSON array chunks from a server-side cursor."""
+    sql_query, params = query_builder.Select("drivers", sort_columns=SORT_COLUMNS).order(sorted_by, order).build()
+
+    # -- Server-side cursors can not run prepared statements, DECLARE takes a plain query --
+    cursor = connection.cursor(name=f"stream_drivers_{uuid.uuid4().hex}")
+    cursor.itersize = itersize
+    try:
+        cursor.execute(sql_query, params)
+        yield from streaming.encoded_array_chunks(cursor, ENCODER, itersize)
+        connection.commit()
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
+    finally:
+        cursor.close()
+
 def put_driver(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         driver_id: str,
         values: dict
         ) -> dict:
-    """Update a driver in the database."""
+    """Update a driver in the database, one statement, zero updated rows raise DriverNotFound."""
     # -- Check if values are given --
     if not values:
         raise ValueError("No Values given")
     
     try:
-        # -- Check if driver exists --
-        get_driver(connection, cursor, driver_id)
-        # -- Create Key list for given Values --
-        key_list = list(values.keys())
-        # -- Create SQL Query and adapt it to given Values--
-        try:
-            if "email" in key_list and "name" in key_list:
-                driver_email = values["email"]
-                driver_name = values["name"]
-                sql_query = "UPDATE drivers SET email = %s, name = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (driver_email, driver_name, driver_id))
-
-
-            elif "email" in key_list:
-                driver_email = values["email"]
-                sql_query = "UPDATE drivers SET email = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (driver_email, driver_id))
-
-            
-            elif "name" in key_list:
-                driver_name = values["name"]
-                sql_query = "UPDATE drivers SET name = %s WHERE id = %s RETURNING *"
-                cursor.execute(sql_query, (driver_name, driver_id))
-
-
-            else:
-                raise ValueError("No valid values to update.")
+        # -- Only the given columns are set, raises ValueError without valid values --
+        sql_query, params = query_builder.update("drivers", values, UPDATE_COLUMNS, "id", driver_id)
+        registry.execute_built(cursor, sql_query, params)
 
+        row = cursor.fetchone()
+        if row is None:
+            connection.rollback()
+            raise DriverNotFound(driver_id)
 
-            driver_id, driver_name, driver_email, driver_created = cursor.fetchone()
-            connection.commit()
+        driver_id, driver_name, driver_email, driver_created = row
+        connection.commit()
 
-            return {
-                "id": driver_id,
-                "name": driver_name,
-                "email": driver_email,
-                "created": driver_created.strftime("%Y-%m-%d-%H-%M-%S"),
-            }
-        
-        except psycopg2.Error as e:
-            connection.rollback()
-            raise e
-        
-    except DriverNotFound:
-        raise DriverNotFound(driver_id)
+        return {
+            "id": driver_id,
+            "name": driver_name,
+            "email": driver_email,
+            "created": driver_created.strftime("%Y-%m-%d-%H-%M-%S"),
+        }
+    
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
     
 def delete_driver(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
         driver_id: int
         ) -> str:
-    """Delete a driver from the database."""
-    try:
-        get_driver(connection, cursor, driver_id)
-        try: 
-            sql_query = "DELETE FROM drivers WHERE id = %s RETURNING *"
-            cursor.execute(sql_query, (driver_id,))
-            connection.commit()
-
-            return f'Driver deleted with id: {driver_id}'
-        except psycopg2.Error as e:
+    """Delete a driver from the database, zero deleted rows raise DriverNotFound."""
+    try: 
+        registry.execute(cursor, "DELETE_DRIVER", (driver_id,))
+        if cursor.fetchone() is None:
             connection.rollback()
-            raise e
-    
-    except DriverNotFound:
-        raise DriverNotFound(driver_id)
+            raise DriverNotFound(driver_id)
+        connection.commit()
+
+        return f'Driver deleted with id: {driver_id}'
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
         
 
 
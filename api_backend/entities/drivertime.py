@@ -1,7 +1,51 @@
 import psycopg2
-import logging
+import psycopg2.extras
 import uuid
 
+from api_backend import pagination, query_builder, serialization, streaming
+from api_backend.entities import leaderboard
+from api_backend.resource_manager.sql_queries import registry
+
+# -- Sortable keys with their column and position in "SELECT *" --
+SORT_COLUMNS = {
+    "id": ("id", 0),
+    "sector1": ("sector1", 1),
+    "sector2": ("sector2", 2),
+    "sector3": ("sector3", 3),
+    "laptime": ("laptime", 4),
+}
+
+# -- Output keys and value kinds in "SELECT *" order, for the encoded list paths --
+ENCODER_COLUMNS = [
+    ("drivertime_id", "int"), ("sector1", "float"), ("sector2", "float"), ("sector3", "float"),
+    ("laptime", "float"), ("driver_id", "str"), ("convention_id", "int"),
+]
+ENCODER = serialization.RowEncoder(ENCODER_COLUMNS)
+
+# -- Joins for ?expand=, applied to the rows of one page: (join, projected column, encoder column) --
+EXPANSIONS = {
+    "driver": ("LEFT JOIN drivers ON drivers.id = page.driver", "drivers.name AS driver_name", ("driver_name", "str")),
+    "convention": ("LEFT JOIN conventions ON conventions.id = page.convention", "conventions.name AS convention_name", ("convention_name", "str")),
+}
+_EXPANDED_ENCODERS = {}
+
+# -- Used when a drivertime is posted without driver or convention --
+DUMMY_DRIVER_ID = "4823662a-29c5-47d7-bdba-68baa2825990"
+DUMMY_CONVENTION_ID = 1
+
+BULK_PAGE_SIZE = 1000
+
+# -- Write-behind checkpoints, only used when the buffer is enabled, so they are not in the registry --
+CHECKPOINT_GET_QUERY = "SELECT seq FROM write_behind_checkpoints WHERE buffer = %s"
+CHECKPOINT_SET_QUERY = """
+    INSERT INTO write_behind_checkpoints (buffer, seq) VALUES (%s, %s)
+    ON CONFLICT (buffer) DO UPDATE SET seq = GREATEST(write_behind_checkpoints.seq, EXCLUDED.seq)
+    """
+
+# -- Metrics of /drivertimes/stats in output order, and the histogram bucket range --
+STATS_METRICS = ("sector1", "sector2", "sector3", "laptime")
+MAX_STATS_BUCKETS = 100
+
 class DriverTimeNotFound(Exception):
     def __init__(self, *args: object) -> None:
         self.args = args
@@ -15,17 +59,20 @@ def post_drivertime(
         drivertime_sector1: float,
         drivertime_sector2: float,
         drivertime_sector3: float,
-        drivertime_laptime: float
+        drivertime_laptime: float,
+        placement: bool = False
         ) -> dict:
-    """Post a new drivertime to the database."""
+    """Post a new drivertime to the database, with `placement` also its rank, personal best and gap to P1."""
     try:
-        sql_query = "INSERT INTO drivertimes (driver, convention, sector1, sector2, sector3, laptime) VALUES (%s, %s, %s, %s, %s, %s) RETURNING *"
-        cursor.execute(sql_query, (driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime))
+        registry.execute(cursor, "CREATE_DRIVERTIME", (driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime))
 
-        driver_id, convention_id, drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime = cursor.fetchone()
-        connection.commit()
-
-        return {
+        drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id = cursor.fetchone()
+        # -- Laps without driver or convention are not on any leaderboard --
+        placement = placement and driver_id is not None and convention_id is not None
+        if placement:
+            previous_best = leaderboard.lock_best(cursor, driver_id, convention_id)
+        leaderboard.record_drivertime(cursor, driver_id, convention_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime)
+        result = {
             "drivertime_id": drivertime_id,
             "sector1": drivertime_sector1,
             "sector2": drivertime_sector2,
@@ -34,12 +81,109 @@ def post_drivertime(
             "driver_id": driver_id,
             "convention_id": convention_id
         }
+        if placement:
+            result["placement"] = leaderboard.get_placement(cursor, driver_id, convention_id, drivertime_laptime, previous_best)
+        connection.commit()
+        return result
     
 
     except psycopg2.Error as e:
         connection.rollback()
         raise e
 
+def _validate_bulk_row(row: dict) -> tuple:
+    """Turn one bulk row into insert values, raises ValueError for invalid rows."""
+    if not isinstance(row, dict):
+        raise ValueError("Expected an object.")
+
+    values = []
+    for key in ("sector1", "sector2", "sector3", "laptime"):
+        value = row.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"Missing or invalid {key}.")
+        values.append(float(value))
+
+    driver_id = row.get("driver_id") or DUMMY_DRIVER_ID
+    convention_id = row.get("convention_id") or DUMMY_CONVENTION_ID
+    driver_id = str(uuid.UUID(str(driver_id)))
+    convention_id = int(convention_id)
+
+    return (driver_id, convention_id, *values)
+
+def post_drivertimes(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        rows: list,
+        checkpoint: tuple = None
+        ) -> dict:
+    """Post many drivertimes to the database in one transaction.
+
+    Invalid rows and rows referencing unknown drivers or conventions are
+    reported per row, all other rows are inserted with multi-row VALUES.
+    A `checkpoint` of (buffer, seq) is stored in the same transaction.
+    """
+    errors = []
+    valid = []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, _validate_bulk_row(row)))
+        except (ValueError, TypeError) as e:
+            errors.append({"row": index, "error": f"{e}"})
+
+    try:
+        # -- Check the referenced drivers and conventions in two queries --
+        driver_ids = list({values[0] for _, values in valid})
+        convention_ids = list({values[1] for _, values in valid})
+        cursor.execute("SELECT id::text FROM drivers WHERE id = ANY(%s::uuid[])", (driver_ids,))
+        known_drivers = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT id FROM conventions WHERE id = ANY(%s)", (convention_ids,))
+        known_conventions = {row[0] for row in cursor.fetchall()}
+
+        inserts = []
+        for index, values in valid:
+            if values[0] not in known_drivers:
+                errors.append({"row": index, "error": f"Driver not found with ID: {values[0]}"})
+            elif values[1] not in known_conventions:
+                errors.append({"row": index, "error": f"Convention not found with ID: {values[1]}"})
+            else:
+                inserts.append(values)
+
+        ids = []
+        if inserts:
+            sql_query = "INSERT INTO drivertimes (driver, convention, sector1, sector2, sector3, laptime) VALUES %s RETURNING id"
+            ids = [row[0] for row in psycopg2.extras.execute_values(cursor, sql_query, inserts, page_size=BULK_PAGE_SIZE, fetch=True)]
+            leaderboard.record_drivertimes(cursor, inserts)
+        if checkpoint is not None:
+            cursor.execute(CHECKPOINT_SET_QUERY, checkpoint)
+        connection.commit()
+
+        errors.sort(key=lambda error: error["row"])
+        return {
+            "inserted": len(ids),
+            "ids": ids,
+            "errors": errors
+        }
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
+def get_checkpoint(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        buffer: str
+        ) -> int:
+    """Get the last committed log sequence number of a write-behind buffer, 0 if none was committed yet."""
+    try:
+        cursor.execute(CHECKPOINT_GET_QUERY, (buffer,))
+        row = cursor.fetchone()
+        connection.commit()
+        return row[0] if row is not None else 0
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
 def get_drivertime(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
@@ -47,12 +191,13 @@ def get_drivertime(
         ) -> dict:
     """Get a drivertime from the database."""
     try:
-        sql_query = "SELECT * FROM drivertimes WHERE id = %s"
-        cursor.execute(sql_query, (drivertime_id,))
-        driver_id, convention_id, drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime = cursor.fetchone()
-        if drivertime_id is None: 
+        registry.execute(cursor, "GET_DRIVERTIME", (drivertime_id,))
+        row = cursor.fetchone()
+        if row is None: 
             raise DriverTimeNotFound(drivertime_id)
         
+        drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id = row
+        connection.commit()
         return {
             "drivertime_id": drivertime_id,
             "sector1": drivertime_sector1,
@@ -67,6 +212,45 @@ def get_drivertime(
         connection.rollback()
         raise e
 
+def get_drivertimes_by_ids(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        drivertime_ids: list
+        ) -> list:
+    """Get several drivertimes with one query, in request order and with a marker for each missing ID."""
+    try:
+        registry.execute(cursor, "GET_DRIVERTIMES_BY_IDS", (list(dict.fromkeys(drivertime_ids)),))
+        found = {row[0]: _drivertime_to_dict(row) for row in cursor.fetchall()}
+        connection.commit()
+
+        return [found.get(drivertime_id, {"drivertime_id": drivertime_id, "not_found": True}) for drivertime_id in drivertime_ids]
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
+def parse_expand(expand) -> tuple:
+    """Turn "driver,convention" or a list into the known expansions, in EXPANSIONS order."""
+    if not expand:
+        return ()
+    if isinstance(expand, str):
+        expand = expand.split(",")
+    requested = {name.strip().lower() for name in expand if name.strip()}
+    unknown = requested - EXPANSIONS.keys()
+    if unknown:
+        raise ValueError(f"Invalid expand: {', '.join(sorted(unknown))}. Expected any of: {', '.join(EXPANSIONS)}.")
+    return tuple(name for name in EXPANSIONS if name in requested)
+
+def _expanded_encoder(expansions: tuple) -> serialization.RowEncoder:
+    if not expansions:
+        return ENCODER
+    encoder = _EXPANDED_ENCODERS.get(expansions)
+    if encoder is None:
+        encoder = _EXPANDED_ENCODERS[expansions] = serialization.RowEncoder(
+            ENCODER_COLUMNS + [EXPANSIONS[name][2] for name in expansions]
+        )
+    return encoder
+
 def get_all_drivertimes(
         connection: psycopg2.extensions.connection, 
         cursor: psycopg2.extensions.cursor,
@@ -74,64 +258,98 @@ def get_all_drivertimes(
         order: str = None,
         limit: int = None,
         driver_id: str = None,
-        convention_id: int = None
-        ) -> list:
-    """Get all drivertimes from the database."""
-    try:
-        def expand_sql_query(query ,sorted_by, order, limit) -> str:
-            if sorted_by is not None:
-                query += f" ORDER BY {sorted_by}"
-                if order is not None:
-                    query += f" {order}"
-            
-            if limit is not None:
-                query += f" LIMIT {limit}"
-
-            return query
+        convention_id: int = None,
+        after: str = None,
+        encoding: str = None,
+        expand=None
+        ) -> dict:
+    """Get one page of drivertimes from the database, `encoding` returns the items as bytes in that encoding.
 
-        if driver_id is None and convention_id is None:
-            sql_query = "SELECT * FROM drivertimes"
+    `expand` adds the names of the driver and/or convention, joined in the same query.
+    """
+    try:
+        expansions = parse_expand(expand)
+        # -- Filters first, then the keyset condition --
+        query = (
+            query_builder.Select("drivertimes", sort_columns=SORT_COLUMNS)
+            .filter("driver", driver_id)
+            .filter("convention", convention_id)
+            .page(sorted_by, order, limit, after)
+        )
+        size = query.size
+        sql_query, params = query.build()
 
-            sql_query = expand_sql_query(sql_query, sorted_by, order, limit)
-            cursor.execute(sql_query)
-        
-        elif driver_id is not None and convention_id is None:
-            sql_query = "SELECT * FROM drivertimes WHERE driver = %s"
+        # -- Join only the rows of the page, the outer ORDER BY refers to the output columns --
+        if expansions:
+            columns = ", ".join(EXPANSIONS[name][1] for name in expansions)
+            joins = " ".join(EXPANSIONS[name][0] for name in expansions)
+            sql_query = f"SELECT page.*, {columns} FROM ({sql_query}) AS page {joins}{query.order_by}"
 
-            sql_query = expand_sql_query(sql_query, sorted_by, order, limit)
-            cursor.execute(sql_query, (driver_id,))
-        
-        elif driver_id is None and convention_id is not None:
-            sql_query = "SELECT * FROM drivertimes WHERE convention = %s"
-
-            sql_query = expand_sql_query(sql_query, sorted_by, order, limit)
-            cursor.execute(sql_query, (convention_id,))
+        registry.execute_built(cursor, sql_query, params)
+        rows = cursor.fetchall()
+        connection.commit()
 
-        elif driver_id is not None and convention_id is not None:
-            sql_query = "SELECT * FROM drivertimes WHERE driver = %s AND convention = %s"
+        if encoding is not None:
+            drivertimes = _expanded_encoder(expansions).encode_as(rows[:size], encoding)
+        else:
+            drivertimes = [_drivertime_to_dict(row, expansions) for row in rows[:size]]
+        return {
+            "items": drivertimes,
+            "next": pagination.next_cursor(rows, size, query.sort_index),
+        }
+    
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
 
-            sql_query = expand_sql_query(sql_query, sorted_by, order, limit)
-            cursor.execute(sql_query, (driver_id, convention_id))
+def _drivertime_to_dict(row, expansions: tuple = ()) -> dict:
+    drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id = row[:7]
+    drivertime = {
+        "drivertime_id": drivertime_id,
+        "sector1": drivertime_sector1,
+        "sector2": drivertime_sector2,
+        "sector3": drivertime_sector3,
+        "laptime": drivertime_laptime,
+        "driver_id": str(driver_id) if driver_id is not None else None,
+        "convention_id": convention_id
+    }
+    for offset, name in enumerate(expansions, start=7):
+        key = EXPANSIONS[name][2][0]
+        drivertime[key] = row[offset]
+    return drivertime
 
-        drivertimes = []
+def stream_drivertimes(
+        connection: psycopg2.extensions.connection,
+        sorted_by: str = None,
+        order: str = None,
+        driver_id: str = None,
+        convention_id: int = None,
+        itersize: int = 2000
+        ):
+    """Stream all matching drivertimes as JSON array chunks from a server-side cursor."""
+    sql_query, params = (
+        query_builder.Select("drivertimes", sort_columns=SORT_COLUMNS)
+        .filter("driver", driver_id)
+        .filter("convention", convention_id)
+        .order(sorted_by, order)
+        .build()
+    )
 
-        for drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id in cursor.fetchall():
-            drivertimes.append({
-            "drivertime_id": drivertime_id,
-            "sector1": drivertime_sector1,
-            "sector2": drivertime_sector2,
-            "sector3": drivertime_sector3,
-            "laptime": drivertime_laptime,
-            "driver_id": driver_id,
-            "convention_id": convention_id
-        })
+    # -- Server-side cursors can not run prepared statements, DECLARE takes a plain query --
+    cursor = connection.cursor(name=f"stream_drivertimes_{uuid.uuid4().hex}")
+    cursor.itersize = itersize
+    try:
+        cursor.execute(sql_query, params)
+        yield from streaming.encoded_array_chunks(cursor, ENCODER, itersize)
         connection.commit()
-        return drivertimes
-    
+
     except psycopg2.Error as e:
         connection.rollback()
         raise e
 
+    finally:
+        cursor.close()
+
 def get_best_sectors(
         connection: psycopg2.extensions.connection,
         cursor: psycopg2.extensions.cursor,
@@ -140,31 +358,19 @@ def get_best_sectors(
         ) -> dict:
     """Get the best sectors for a driver or convention."""
     try:
-        sql_query = """
-            SELECT 
-            MIN(sector1) AS best_sector1,
-            MIN(sector2) AS best_sector2,
-            MIN(sector3) AS best_sector3,
-            MIN(laptime) AS best_laptime
-            FROM drivertimes
-            """
         if driver_id is None and convention_id is None:
-            cursor.execute(sql_query)
+            registry.execute(cursor, "BEST_SECTORS")
+
+        elif driver_id is not None and convention_id is None:
+            registry.execute(cursor, "BEST_SECTORS_DRIVER", (driver_id,))
 
+        elif driver_id is None and convention_id is not None:
+            registry.execute(cursor, "BEST_SECTORS_CONVENTION", (convention_id,))
+        
         else:
-            if driver_id is not None and convention_id is None:
-                sql_query += " WHERE driver = %s"
-                cursor.execute(sql_query, (driver_id,))
-
-            elif driver_id is None and convention_id is not None:
-                sql_query += " WHERE convention = %s"
-                cursor.execute(sql_query, (convention_id,))
-            
-            else:
-                sql_query += " WHERE driver = %s AND convention = %s"
-                cursor.execute(sql_query, (driver_id, convention_id))
-            
+            registry.execute(cursor, "BEST_SECTORS_DRIVER_CONVENTION", (driver_id, convention_id))
     
+
         best_sector1, best_sector2, best_sector3, best_laptime = cursor.fetchone()
         connection.commit()
         return {
@@ -178,20 +384,71 @@ def get_best_sectors(
         connection.rollback()
         raise e
 
+def _histogram(low: float, high: float, bucket_ids: list, bucket_counts: list, buckets: int) -> list:
+    """Expand the non-empty buckets of the query into `buckets` equal width buckets from `low` to `high`."""
+    if high == low:
+        return [{"lower": low, "upper": high, "count": sum(bucket_counts)}]
+
+    counts = [0] * buckets
+    for bucket_id, count in zip(bucket_ids, bucket_counts):
+        counts[bucket_id - 1] = count
+    width = (high - low) / buckets
+    return [
+        {"lower": low + index * width, "upper": high if index == buckets - 1 else low + (index + 1) * width, "count": count}
+        for index, count in enumerate(counts)
+    ]
+
+def get_drivertime_stats(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        driver_id: str = None,
+        convention_id: int = None,
+        buckets: int = 10
+        ) -> dict:
+    """Get count, mean, median, p90, p99 and a histogram of every sector and the laptime for a driver or convention."""
+    if driver_id is None and convention_id is None:
+        raise ValueError("A driver or convention ID is required.")
+    if not 1 <= buckets <= MAX_STATS_BUCKETS:
+        raise ValueError(f"Invalid bucket count: {buckets}. Expected 1 to {MAX_STATS_BUCKETS}.")
+
+    try:
+        registry.execute(cursor, "DRIVERTIME_STATS", (convention_id, convention_id, driver_id, driver_id, buckets, buckets))
+
+        stats = {metric: {"count": 0, "mean": None, "median": None, "p90": None, "p99": None, "min": None, "max": None, "histogram": []} for metric in STATS_METRICS}
+        for metric, count, mean, low, high, percentiles, bucket_ids, bucket_counts in cursor.fetchall():
+            median, p90, p99 = percentiles
+            stats[metric] = {
+                "count": count,
+                "mean": mean,
+                "median": median,
+                "p90": p90,
+                "p99": p99,
+                "min": low,
+                "max": high,
+                "histogram": _histogram(low, high, bucket_ids, bucket_counts, buckets)
+            }
+        connection.commit()
+        return stats
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
+
 def delete_drivertime(
         connection: psycopg2.extensions.connection,
         cursor: psycopg2.extensions.cursor,
         drivertime_id: int
         ) -> None:
-    """Delete a drivertime from the database."""
+    """Delete a drivertime from the database, zero deleted rows raise DriverTimeNotFound."""
     try:
-        get_drivertime(connection, cursor, drivertime_id)
-        try:
-            sql_query = "DELETE FROM drivertimes WHERE id = %s"
-            cursor.execute(sql_query, (drivertime_id,))
-            connection.commit()
-        except psycopg2.Error as e:
+        registry.execute(cursor, "DELETE_DRIVERTIME", (drivertime_id,))
+        row = cursor.fetchone()
+        if row is None:
             connection.rollback()
-            raise e
-    except DriverTimeNotFound:
-        raise DriverTimeNotFound(drivertime_id)
+            raise DriverTimeNotFound(drivertime_id)
+        leaderboard.remove_drivertime(cursor, row[0], row[1])
+        connection.commit()
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
@@ -0,0 +1,138 @@
+import psycopg2
+import psycopg2.extras
+
+from api_backend.resource_manager.sql_queries import registry
+
+# -- Per convention and driver bests, maintained by the drivertime write paths --
+
+RECORD_MANY_QUERY = """
+    INSERT INTO leaderboard (convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+    VALUES %s
+    ON CONFLICT (convention, driver) DO UPDATE SET
+    best_sector1 = LEAST(leaderboard.best_sector1, EXCLUDED.best_sector1),
+    best_sector2 = LEAST(leaderboard.best_sector2, EXCLUDED.best_sector2),
+    best_sector3 = LEAST(leaderboard.best_sector3, EXCLUDED.best_sector3),
+    best_laptime = LEAST(leaderboard.best_laptime, EXCLUDED.best_laptime),
+    laps = leaderboard.laps + EXCLUDED.laps
+    """
+
+
+def record_drivertime(
+        cursor: psycopg2.extensions.cursor,
+        driver_id: str,
+        convention_id: int,
+        drivertime_sector1: float,
+        drivertime_sector2: float,
+        drivertime_sector3: float,
+        drivertime_laptime: float
+        ) -> None:
+    """Fold a new lap into the leaderboard, runs inside the caller's transaction."""
+    if driver_id is None or convention_id is None:
+        return
+    registry.execute(cursor, "RECORD_LEADERBOARD", (convention_id, driver_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime))
+
+
+def record_drivertimes(
+        cursor: psycopg2.extensions.cursor,
+        rows: list
+        ) -> None:
+    """Fold many laps into the leaderboard, rows are (driver, convention, sector1, sector2, sector3, laptime)."""
+    # -- Reduce per driver first, one statement can not update the same row twice --
+    bests = {}
+    for driver_id, convention_id, sector1, sector2, sector3, laptime in rows:
+        if driver_id is None or convention_id is None:
+            continue
+        key = (convention_id, driver_id)
+        if key not in bests:
+            bests[key] = [sector1, sector2, sector3, laptime, 1]
+        else:
+            best = bests[key]
+            best[0] = min(best[0], sector1)
+            best[1] = min(best[1], sector2)
+            best[2] = min(best[2], sector3)
+            best[3] = min(best[3], laptime)
+            best[4] += 1
+
+    if bests:
+        psycopg2.extras.execute_values(
+            cursor,
+            RECORD_MANY_QUERY,
+            [(*key, *best) for key, best in sorted(bests.items())]
+        )
+
+
+def remove_drivertime(
+        cursor: psycopg2.extensions.cursor,
+        driver_id: str,
+        convention_id: int
+        ) -> None:
+    """Recompute the bests of one driver after a lap was deleted, runs inside the caller's transaction."""
+    if driver_id is None or convention_id is None:
+        return
+    # -- Lock the row first so concurrent lap posts wait for the recomputed bests --
+    registry.execute(cursor, "LOCK_LEADERBOARD", (convention_id, driver_id))
+    registry.execute(cursor, "REFRESH_LEADERBOARD", (convention_id, driver_id))
+    registry.execute(cursor, "PRUNE_LEADERBOARD", (convention_id, driver_id, convention_id, driver_id))
+
+
+def lock_best(
+        cursor: psycopg2.extensions.cursor,
+        driver_id: str,
+        convention_id: int
+        ) -> float:
+    """Lock the leaderboard row of a driver and return their best laptime before the new lap, None for a first lap."""
+    registry.execute(cursor, "BEST_LEADERBOARD", (convention_id, driver_id))
+    row = cursor.fetchone()
+    return row[0] if row is not None else None
+
+
+def placement(faster: int, p1_laptime: float, laptime: float, previous_best: float) -> dict:
+    """Placement of a new lap from the count of faster drivers and the best laptime of the convention."""
+    return {
+        "rank": faster + 1,
+        "personal_best": previous_best is None or laptime < previous_best,
+        "previous_best": previous_best,
+        "gap_to_p1": laptime - p1_laptime if p1_laptime is not None else 0.0
+    }
+
+
+def get_placement(
+        cursor: psycopg2.extensions.cursor,
+        driver_id: str,
+        convention_id: int,
+        laptime: float,
+        previous_best: float
+        ) -> dict:
+    """Rank of a new lap among the bests of the other drivers, runs inside the caller's transaction after the lap was recorded."""
+    registry.execute(cursor, "PLACEMENT_LEADERBOARD", (convention_id, laptime, driver_id, convention_id))
+    faster, p1_laptime = cursor.fetchone()
+    return placement(faster, p1_laptime, laptime, previous_best)
+
+
+def get_leaderboard(
+        connection: psycopg2.extensions.connection,
+        cursor: psycopg2.extensions.cursor,
+        convention_id: int
+        ) -> list:
+    """Get the ranked bests of every driver in a convention."""
+    try:
+        registry.execute(cursor, "GET_LEADERBOARD", (convention_id,))
+
+        leaderboard = []
+        for rank, driver_id, driver_name, best_laptime, best_sector1, best_sector2, best_sector3, laps in cursor.fetchall():
+            leaderboard.append({
+                "rank": rank,
+                "driver_id": driver_id,
+                "driver_name": driver_name,
+                "lap_best_time": best_laptime,
+                "sector_1_best_time": best_sector1,
+                "sector_2_best_time": best_sector2,
+                "sector_3_best_time": best_sector3,
+                "laps": laps
+            })
+        connection.commit()
+        return leaderboard
+
+    except psycopg2.Error as e:
+        connection.rollback()
+        raise e
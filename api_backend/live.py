@@ -0,0 +1,236 @@
+# Copyright (c) 2023 NGITL
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+import psycopg2
+import psycopg2.extensions
+
+# -- Channel the drivertimes triggers notify on, see migration 0004 --
+CHANNEL = "drivertimes"
+
+# -- Reconnect delays of the listening connection, doubled up to the maximum --
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 10.0
+
+# -- Conventions with recent events kept in memory, the least recently active ones are dropped --
+MAX_TRACKED_CONVENTIONS = 1000
+
+
+class InvalidLiveCursor(Exception):
+    def __init__(self, cursor: str) -> None:
+        self.cursor = cursor
+        super().__init__(f"Invalid live cursor: {cursor}")
+
+
+class LiveFeed:
+    """Listens for drivertime notifications on a dedicated connection and hands them to waiting clients.
+
+    The last `max_events` events of each convention are kept with a
+    sequence number. Clients pass the cursor of the last event they saw and
+    get everything newer, or wait until it arrives. Events are only kept in
+    memory, so a cursor of another instance, of a previous process or from
+    before a gap (evicted events, a lost connection) returns `reset`, and
+    the client reloads the drivertimes once before it continues.
+    """
+    def __init__(self, max_events: int = 1000, poll_interval: float = 5.0, **connect_kwargs) -> None:
+        if max_events < 1:
+            raise ValueError(f"Invalid live feed settings: max_events={max_events}")
+
+        self.max_events = max_events
+        self.poll_interval = poll_interval
+        self.connect_kwargs = connect_kwargs
+        self.epoch = uuid.uuid4().hex[:8]
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._events = OrderedDict()
+        self._floors = {}
+        self._dropped_floor = 0
+        self._gap_floor = 0
+        self._waiters = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+        self._metrics = {
+            "received": 0,
+            "invalid": 0,
+            "connects": 0,
+            "disconnects": 0,
+            "listening": False,
+        }
+
+    # Listener Functions
+    def _listen(self) -> psycopg2.extensions.connection:
+        connection = psycopg2.connect(**self.connect_kwargs)
+        connection.set_session(autocommit=True)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        with self._lock:
+            # -- Events committed while no connection listened are lost, cursors issued before any connect included --
+            self._seq += 1
+            self._gap_floor = self._seq
+            self._metrics["connects"] += 1
+            self._metrics["listening"] = True
+        return connection
+
+    def _run(self) -> None:
+        delay = RETRY_DELAY
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self._listen()
+                delay = RETRY_DELAY
+                while not self._stopped.is_set():
+                    if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._publish(connection.notifies.pop(0).payload)
+
+            except Exception as e:
+                # -- Any failure reconnects, a dead thread would never deliver events again --
+                with self._lock:
+                    self._metrics["listening"] = False
+                    self._metrics["disconnects"] += 1
+                logging.warning(f"Live feed connection lost, reconnecting in {delay}s: {e}")
+                self._stopped.wait(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+            finally:
+                if connection is not None:
+                    connection.close()
+
+        with self._lock:
+            self._metrics["listening"] = False
+
+    def _publish(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            convention_id = event["convention"]
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"Ignoring invalid drivertime notification: {payload}")
+            with self._lock:
+                self._metrics["invalid"] += 1
+            return
+
+        with self._lock:
+            self._seq += 1
+            self._metrics["received"] += 1
+            if convention_id is None:
+                return
+            event["cursor"] = f"{self.epoch}-{self._seq}"
+
+            events = self._events.get(convention_id)
+            if events is None:
+                if len(self._events) >= MAX_TRACKED_CONVENTIONS:
+                    dropped_id, dropped = self._events.popitem(last=False)
+                    self._floors.pop(dropped_id, None)
+                    self._dropped_floor = max(self._dropped_floor, dropped[-1][0])
+                events = self._events[convention_id] = deque()
+                self._floors[convention_id] = self._dropped_floor
+            self._events.move_to_end(convention_id)
+
+            if len(events) >= self.max_events:
+                self._floors[convention_id] = events.popleft()[0]
+            events.append((self._seq, event))
+
+            waiters = self._waiters.pop(convention_id, ())
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # -- Loop of a finished request is closed --
+                pass
+
+    # Wait Functions
+    def _resolve(self, convention_id: int, cursor: str) -> tuple:
+        """Return (after, reset) for a client cursor, must hold the lock."""
+        if cursor is None:
+            return self._seq, False
+        epoch, _, seq = cursor.partition("-")
+        try:
+            after = int(seq)
+        except ValueError:
+            raise InvalidLiveCursor(cursor)
+        if epoch != self.epoch or after > self._seq:
+            return self._seq, True
+        floor = max(self._gap_floor, self._floors.get(convention_id, self._dropped_floor))
+        return after, after < floor
+
+    def _since(self, convention_id: int, after: int) -> list:
+        """Events of a convention newer than `after`, must hold the lock."""
+        events = self._events.get(convention_id, ())
+        return [event for seq, event in events if seq > after]
+
+    async def wait(self, convention_id: int, cursor: str = None, timeout: float = 25.0) -> dict:
+        """Events of a convention after `cursor`, waits up to `timeout` seconds for the first one.
+
+        Without a cursor only events from now on are returned. Raises
+        InvalidLiveCursor for malformed cursors.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        with self._lock:
+            after, reset = self._resolve(convention_id, cursor)
+        while True:
+            wakeup = asyncio.Event()
+            waiter = (loop, wakeup)
+            remaining = deadline - loop.time()
+            with self._lock:
+                events = self._since(convention_id, after)
+                last = self._seq
+                if events or reset or remaining <= 0:
+                    break
+                # -- Registered under the lock, an event published meanwhile wakes this waiter --
+                self._waiters.setdefault(convention_id, set()).add(waiter)
+            try:
+                await asyncio.wait_for(wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(convention_id)
+                    if waiters is not None:
+                        waiters.discard(waiter)
+                        if not waiters:
+                            del self._waiters[convention_id]
+
+        # -- Without events the cursor moves to now, nothing of this convention arrived in between --
+        next_cursor = events[-1]["cursor"] if events else f"{self.epoch}-{last}"
+        return {"events": events, "cursor": next_cursor, "reset": reset}
+
+    # Utility Functions
+    def start(self) -> None:
+        """Start listening in a background thread on first use, and again should it have died."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._stopped.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name="live-feed-listener", daemon=True)
+            self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update({
+                "epoch": self.epoch,
+                "last_seq": self._seq,
+                "conventions": len(self._events),
+                "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+                "max_events": self.max_events,
+            })
+        return stats
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,200 @@
+# Copyright (c) 2023 NGITL
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+
+# -- Upper bounds in seconds, the last bucket is +Inf --
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# -- Route of the running invocation, DB and serialization timings are recorded under it --
+current_route = contextvars.ContextVar("current_route", default="none")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = None) -> str:
+    labels = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra is not None:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Histogram:
+    """Prometheus histogram with one set of buckets per label combination."""
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter per label combination."""
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, amount: float, *label_values) -> None:
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for label_values, value in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Metrics:
+    """In-process request, backend and database timings, rendered in the Prometheus text format."""
+    def __init__(self) -> None:
+        self.request_seconds = Histogram("api_request_duration_seconds", "Route handler duration.", ("route",))
+        self.requests = Counter("api_requests_total", "Handled requests by status code.", ("route", "status"))
+        self.errors = Counter("api_errors_total", "Requests answered with a status of 400 or above, or raising.", ("route",))
+        self.backend_seconds = Histogram("api_backend_duration_seconds", "Backend method duration.", ("method",))
+        self.backend_errors = Counter("api_backend_errors_total", "Backend methods that raised.", ("method",))
+        self.execute_seconds = Histogram("api_db_execute_seconds", "Time spent in cursor.execute.", ("route",))
+        self.fetch_seconds = Histogram("api_db_fetch_seconds", "Time spent fetching result rows.", ("route",))
+        self.rows = Counter("api_db_rows_total", "Result rows fetched from the database.", ("route",))
+        self.serialization_seconds = Histogram("api_serialization_seconds", "Time spent encoding response bodies.", ("route",))
+
+    def observe_execute(self, seconds: float) -> None:
+        self.execute_seconds.observe(seconds, current_route.get())
+
+    def observe_fetch(self, seconds: float, rows: int) -> None:
+        route = current_route.get()
+        self.fetch_seconds.observe(seconds, route)
+        self.rows.inc(rows, route)
+
+    def observe_serialization(self, seconds: float) -> None:
+        self.serialization_seconds.observe(seconds, current_route.get())
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.request_seconds, self.requests, self.errors,
+            self.backend_seconds, self.backend_errors,
+            self.execute_seconds, self.fetch_seconds, self.rows,
+            self.serialization_seconds,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _finish_request(route: str, start: float, response) -> None:
+    metrics.request_seconds.observe(time.perf_counter() - start, route)
+    status = getattr(response, "status_code", 200)
+    metrics.requests.inc(1, route, str(status))
+    if status >= 400:
+        metrics.errors.inc(1, route)
+
+
+def track_route(function):
+    """Time a route handler and label the DB timings it causes with its name."""
+    route = function.__name__
+
+    if asyncio.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            token = current_route.set(route)
+            start = time.perf_counter()
+            try:
+                response = await function(*args, **kwargs)
+            except Exception:
+                metrics.request_seconds.observe(time.perf_counter() - start, route)
+                metrics.errors.inc(1, route)
+                raise
+            finally:
+                current_route.reset(token)
+            _finish_request(route, start, response)
+            return response
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = current_route.set(route)
+        start = time.perf_counter()
+        try:
+            response = function(*args, **kwargs)
+        except Exception:
+            metrics.request_seconds.observe(time.perf_counter() - start, route)
+            metrics.errors.inc(1, route)
+            raise
+        finally:
+            current_route.reset(token)
+        _finish_request(route, start, response)
+        return response
+    return wrapper
+
+
+def _track_method(name: str, function):
+    if asyncio.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            except Exception:
+                metrics.backend_errors.inc(1, name)
+                raise
+            finally:
+                metrics.backend_seconds.observe(time.perf_counter() - start, name)
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            metrics.backend_errors.inc(1, name)
+            raise
+        finally:
+            metrics.backend_seconds.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def track_methods(cls):
+    """Class decorator that times every public method, labelled as `Class.method`."""
+    for name, function in list(vars(cls).items()):
+        if name.startswith("_") or not callable(function):
+            continue
+        setattr(cls, name, _track_method(f"{cls.__name__}.{name}", function))
+    return cls
@@ -0,0 +1,215 @@
+# Copyright (c) 2023 NGITL
+
+import logging
+import os
+import re
+from pathlib import Path
+
+import psycopg2
+import psycopg2.extensions
+
+MIGRATIONS_DIR_PATH = Path(__file__).parent / "migrations"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction --"
+DOLLAR_QUOTE_PATTERN = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+((?:\w+\.)?\w+)\s",
+    re.IGNORECASE
+)
+
+# -- Arbitrary key, keeps two runners from applying migrations at the same time --
+ADVISORY_LOCK_KEY = 7_310_001
+
+CREATE_VERSION_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """
+
+
+class MigrationError(Exception):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+
+def load_migrations(path: Path = MIGRATIONS_DIR_PATH) -> list:
+    """Load all migrations as (version, name, sql) ordered by version."""
+    migrations = []
+    versions = set()
+    for file in sorted(path.iterdir()):
+        if file.suffix != ".sql":
+            continue
+        match = MIGRATION_FILE_PATTERN.match(file.name)
+        if match is None:
+            raise MigrationError(f"Invalid migration file name: {file.name}")
+
+        version = int(match.group(1))
+        if version in versions:
+            raise MigrationError(f"Duplicate migration version: {version}")
+        versions.add(version)
+        migrations.append((version, match.group(2), file.read_text()))
+
+    return migrations
+
+
+def _is_escape_string(sql: str, position: int) -> bool:
+    """Whether the quote at `position` opens an `E'...'` string, where backslashes escape quotes."""
+    if position == 0 or sql[position - 1] not in "Ee":
+        return False
+    return position == 1 or not (sql[position - 2].isalnum() or sql[position - 2] in "_$")
+
+
+def _escape_string_end(sql: str, position: int) -> int:
+    """Return the position after the quote that closes the `E'...'` string whose body starts at `position`."""
+    while position < len(sql):
+        char = sql[position]
+        if char == "\\":
+            position += 2
+        elif char == "'" and sql.startswith("''", position):
+            position += 2
+        elif char == "'":
+            return position + 1
+        else:
+            position += 1
+    return len(sql)
+
+
+def _split_statements(sql: str) -> list:
+    """Split a script on the semicolons between statements and drop comments.
+
+    Semicolons in string literals, including backslash escapes in `E'...'`
+    strings, quoted identifiers, dollar-quoted bodies and comments do not
+    end a statement.
+    """
+    statements = []
+    current = []
+    position = 0
+    while position < len(sql):
+        char = sql[position]
+        if sql.startswith("--", position):
+            end = sql.find("\n", position)
+            position = len(sql) if end == -1 else end
+            continue
+        if sql.startswith("/*", position):
+            end = sql.find("*/", position + 2)
+            position = len(sql) if end == -1 else end + 2
+            current.append(" ")
+            continue
+        if char == "'" and _is_escape_string(sql, position):
+            end = _escape_string_end(sql, position + 1)
+            current.append(sql[position:end])
+            position = end
+            continue
+        if char in ("'", '"'):
+            # -- Doubled quotes escape themselves, so scanning to the next quote pairs them up --
+            end = sql.find(char, position + 1)
+            end = len(sql) if end == -1 else end + 1
+            current.append(sql[position:end])
+            position = end
+            continue
+        if char == "$":
+            match = DOLLAR_QUOTE_PATTERN.match(sql, position)
+            if match is not None:
+                end = sql.find(match.group(0), match.end())
+                end = len(sql) if end == -1 else end + len(match.group(0))
+                current.append(sql[position:end])
+                position = end
+                continue
+        if char == ";":
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        position += 1
+    statements.append("".join(current))
+
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def _drop_invalid_index(cursor: psycopg2.extensions.cursor, statement: str) -> None:
+    """Drop the INVALID leftover of a failed `CREATE INDEX CONCURRENTLY IF NOT EXISTS`, which would skip it."""
+    match = CONCURRENT_INDEX_PATTERN.match(statement)
+    if match is None:
+        return
+    index = match.group(1)
+    cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (index,))
+    row = cursor.fetchone()
+    if row is not None and not row[0]:
+        logging.warning(f"Dropping invalid index {index} left by an earlier run.")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+
+def applied_versions(cursor: psycopg2.extensions.cursor) -> set:
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(connection: psycopg2.extensions.connection, path: Path = MIGRATIONS_DIR_PATH) -> list:
+    """Apply all pending migrations in order and record them in schema_migrations.
+
+    Migrations run in one transaction each. Migrations marked with
+    `-- migrate: no-transaction --` run statement by statement in autocommit
+    mode, which `CREATE INDEX CONCURRENTLY` requires.
+    """
+    migrations = load_migrations(path)
+    applied = []
+
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+        cursor.execute(CREATE_VERSION_TABLE_QUERY)
+        done = applied_versions(cursor)
+
+        for version, name, sql in migrations:
+            if version in done:
+                continue
+            logging.info(f"Applying migration {version:04d}_{name}.")
+
+            if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+                # -- Statements must be idempotent, a failed run is retried from the start --
+                try:
+                    for statement in _split_statements(sql):
+                        _drop_invalid_index(cursor, statement)
+                        cursor.execute(statement)
+                    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                except psycopg2.Error as e:
+                    raise MigrationError(f"Migration {version:04d}_{name} failed: {e}")
+
+            else:
+                connection.autocommit = False
+                try:
+                    cursor.execute(sql)
+                    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    connection.commit()
+                except psycopg2.Error as e:
+                    connection.rollback()
+                    raise MigrationError(f"Migration {version:04d}_{name} failed: {e}")
+                finally:
+                    connection.autocommit = True
+
+            applied.append(f"{version:04d}_{name}")
+
+        return applied
+
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        cursor.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    conn = psycopg2.connect(
+        host=os.environ["HOST"],
+        port=os.environ["PORT"],
+        user=os.environ["USER"],
+        password=os.environ["PASSWORD"],
+        database=os.environ["DATABASE"]
+    )
+    try:
+        applied = apply_migrations(conn)
+        print(f"Applied {len(applied)} migration(s): {', '.join(applied) or '-'}")
+    finally:
+        conn.close()
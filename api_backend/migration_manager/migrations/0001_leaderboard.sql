@@ -0,0 +1,20 @@
+-- Leaderboard summary for databases created before it was part of setup_database.sql --
+CREATE TABLE IF NOT EXISTS leaderboard (
+    convention INTEGER REFERENCES conventions(id) ON DELETE CASCADE,
+    driver UUID REFERENCES drivers(id) ON DELETE CASCADE,
+    best_sector1 FLOAT NOT NULL,
+    best_sector2 FLOAT NOT NULL,
+    best_sector3 FLOAT NOT NULL,
+    best_laptime FLOAT NOT NULL,
+    laps INTEGER NOT NULL,
+    PRIMARY KEY (convention, driver)
+);
+
+CREATE INDEX IF NOT EXISTS leaderboard_convention_laptime ON leaderboard (convention, best_laptime);
+
+INSERT INTO leaderboard (convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+SELECT convention, driver, MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime), COUNT(*)
+FROM drivertimes
+WHERE convention IS NOT NULL AND driver IS NOT NULL
+GROUP BY convention, driver
+ON CONFLICT (convention, driver) DO NOTHING;
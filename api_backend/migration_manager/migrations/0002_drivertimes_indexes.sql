@@ -0,0 +1,5 @@
+-- migrate: no-transaction --
+-- Indexes for the drivertimes filters, built without locking out lap posts --
+CREATE INDEX CONCURRENTLY IF NOT EXISTS drivertimes_convention_laptime ON drivertimes (convention, laptime);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS drivertimes_driver_convention ON drivertimes (driver, convention);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS drivertimes_convention_driver_laptime ON drivertimes (convention, driver, laptime);
@@ -0,0 +1,5 @@
+-- Last log sequence number of each write-behind buffer whose laps are committed, written in the same transaction as the laps --
+CREATE TABLE IF NOT EXISTS write_behind_checkpoints (
+    buffer VARCHAR(255) PRIMARY KEY,
+    seq BIGINT NOT NULL
+);
@@ -0,0 +1,24 @@
+-- Notify listeners on the drivertimes channel of every inserted and deleted lap, sent on commit --
+CREATE OR REPLACE FUNCTION notify_drivertimes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('drivertimes', json_build_object('op', 'insert', 'id', id, 'convention', convention, 'driver', driver, 'laptime', laptime)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('drivertimes', json_build_object('op', 'delete', 'id', id, 'convention', convention, 'driver', driver, 'laptime', laptime)::text)
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger call per statement, bulk inserts do not pay a call per row --
+DROP TRIGGER IF EXISTS drivertimes_notify_insert ON drivertimes;
+CREATE TRIGGER drivertimes_notify_insert AFTER INSERT ON drivertimes
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_drivertimes();
+
+DROP TRIGGER IF EXISTS drivertimes_notify_delete ON drivertimes;
+CREATE TRIGGER drivertimes_notify_delete AFTER DELETE ON drivertimes
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_drivertimes();
@@ -0,0 +1,3 @@
+-- Drivers are sortable by createdAt, keyset comparisons would skip rows with NULL values --
+UPDATE drivers SET createdAt = NOW() WHERE createdAt IS NULL;
+ALTER TABLE drivers ALTER COLUMN createdAt SET NOT NULL;
@@ -0,0 +1,85 @@
+# Copyright (c) 2023 NGITL
+
+import base64
+import json
+from datetime import date, datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(Exception):
+    def __init__(self, cursor: str) -> None:
+        self.cursor = cursor
+        super().__init__(f"Invalid pagination cursor: {cursor}")
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    """Encode the sort value and id of the last row into an opaque cursor."""
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor created by `encode_cursor` into (sort_value, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort_value, row_id
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def page_size(limit: int = None) -> int:
+    """Bound the requested limit to the allowed page size."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError(f"Invalid limit: {limit}")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def sort_column(sorted_by: str, sort_columns: dict) -> tuple:
+    """Map a requested sort key to its (column, row index), only whitelisted keys are accepted."""
+    if sorted_by is None:
+        return sort_columns["id"]
+    try:
+        return sort_columns[sorted_by.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot sort by: {sorted_by}")
+
+
+def keyset(column: str, order: str = None, after: str = None) -> tuple:
+    """Create the keyset condition and ORDER BY clause for a page.
+
+    Returns (condition, condition_params, order_by). `condition` is None on
+    the first page. Rows are ordered by the sort column plus `id`, so the
+    position of the last row is unique and deep pages cost the same as the first.
+    """
+    descending = order is not None and order.lower() == "desc"
+    direction = "DESC" if descending else "ASC"
+
+    if column == "id":
+        order_by = f" ORDER BY id {direction}"
+    else:
+        order_by = f" ORDER BY {column} {direction}, id {direction}"
+
+    if after is None:
+        return None, (), order_by
+
+    sort_value, row_id = decode_cursor(after)
+    comparison = "<" if descending else ">"
+    if column == "id":
+        return f"id {comparison} %s", (row_id,), order_by
+    return f"({column}, id) {comparison} (%s, %s)", (sort_value, row_id), order_by
+
+
+def next_cursor(rows: list, size: int, sort_index: int, id_index: int = 0):
+    """Return the cursor for the page after `rows`, which holds up to size + 1 rows."""
+    if len(rows) <= size:
+        return None
+    last = rows[size - 1]
+    return encode_cursor(last[sort_index], last[id_index])
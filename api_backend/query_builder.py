@@ -0,0 +1,95 @@
+# Copyright (c) 2023 NGITL
+
+from api_backend import pagination
+
+# Identifiers in the generated SQL only come from the code (tables, columns
+# and whitelisted sort keys), request values are always bound parameters.
+# So the set of statement texts is small and stable, and each text can be
+# prepared once per connection.
+
+
+class Select:
+    """SELECT over one table with composable filters, a whitelisted sort and keyset pagination.
+
+    The statement text only depends on which filters are set, the sort key,
+    the direction and whether a cursor is given, never on the values.
+    """
+    def __init__(self, table: str, columns: str = "*", sort_columns: dict = None) -> None:
+        self.table = table
+        self.columns = columns
+        self.sort_columns = sort_columns
+        self._conditions = []
+        self._params = []
+        self._order_by = ""
+        self._limit = None
+        self.sort_index = 0
+        self.size = None
+
+    def where(self, condition: str, *params) -> "Select":
+        """Add a condition with %s placeholders for `params`, ANDed with the others."""
+        self._conditions.append(condition)
+        self._params.extend(params)
+        return self
+
+    def filter(self, column: str, value) -> "Select":
+        """Add `column = value`, unless value is None."""
+        if value is not None:
+            self.where(f"{column} = %s", value)
+        return self
+
+    def order(self, sorted_by: str = None, order: str = None) -> "Select":
+        """Order by a whitelisted sort key plus id, raises ValueError for other keys."""
+        sort_column, self.sort_index = pagination.sort_column(sorted_by, self.sort_columns)
+        _, _, self._order_by = pagination.keyset(sort_column, order)
+        return self
+
+    def page(self, sorted_by: str = None, order: str = None, limit: int = None, after: str = None) -> "Select":
+        """Select one keyset page, one row more than the page size tells whether a next page exists."""
+        sort_column, self.sort_index = pagination.sort_column(sorted_by, self.sort_columns)
+        self.size = pagination.page_size(limit)
+        condition, params, self._order_by = pagination.keyset(sort_column, order, after)
+        if condition is not None:
+            self.where(condition, *params)
+        self._limit = self.size + 1
+        return self
+
+    @property
+    def order_by(self) -> str:
+        return self._order_by
+
+    def build(self) -> tuple:
+        """Return (sql, params)."""
+        sql = f"SELECT {self.columns} FROM {self.table}"
+        if self._conditions:
+            sql += " WHERE " + " AND ".join(self._conditions)
+        sql += self._order_by
+        params = list(self._params)
+        if self._limit is not None:
+            sql += " LIMIT %s"
+            params.append(self._limit)
+        return sql, tuple(params)
+
+
+def _columns(values: dict, allowed: tuple, skip_none: bool) -> list:
+    """Whitelisted columns given in `values`, in the order of `allowed`."""
+    return [column for column in allowed if column in values and not (skip_none and values[column] is None)]
+
+
+def insert(table: str, values: dict, allowed: tuple, returning: str = "*") -> tuple:
+    """INSERT of the given values, columns without a value are left to their defaults."""
+    columns = _columns(values, allowed, skip_none=True)
+    if not columns:
+        raise ValueError("No valid values to insert.")
+    placeholders = ", ".join(["%s"] * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) RETURNING {returning}"
+    return sql, tuple(values[column] for column in columns)
+
+
+def update(table: str, values: dict, allowed: tuple, key_column: str, key, returning: str = "*") -> tuple:
+    """UPDATE of one row by key, only whitelisted columns are set, others in `values` are ignored."""
+    columns = _columns(values, allowed, skip_none=False)
+    if not columns:
+        raise ValueError("No valid values to update.")
+    assignments = ", ".join(f"{column} = %s" for column in columns)
+    sql = f"UPDATE {table} SET {assignments} WHERE {key_column} = %s RETURNING {returning}"
+    return sql, (*(values[column] for column in columns), key)
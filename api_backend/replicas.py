@@ -0,0 +1,193 @@
+# Copyright (c) 2023 NGITL
+
+import contextvars
+import functools
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+from api_backend.connection_pool import ConnectionPool, PoolTimeout
+
+STRATEGIES = ("round_robin", "least_connections")
+
+# -- Client of the running invocation, writes open a read-your-writes window for it --
+current_session = contextvars.ContextVar("current_session", default=None)
+
+# -- Pool kind of the last read of the running invocation, "primary" or "replica" --
+read_target = contextvars.ContextVar("read_target", default=None)
+
+# -- Sessions are pruned once this many windows are tracked --
+MAX_TRACKED_SESSIONS = 10000
+
+
+@contextmanager
+def session_scope(session: str):
+    """Run the enclosed reads and writes on behalf of `session`."""
+    token = current_session.set(session)
+    target_token = read_target.set(None)
+    try:
+        yield
+    finally:
+        read_target.reset(target_token)
+        current_session.reset(token)
+
+
+def request_session(req) -> str:
+    """Session key of a request, the X-Session-Id header or else the client address."""
+    session = req.headers.get("X-Session-Id")
+    if session:
+        return session.strip()
+    forwarded = req.headers.get("X-Forwarded-For")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return None
+
+
+def read_from_replica() -> bool:
+    """Whether the last read of the current session scope was served by a replica, which may lag behind."""
+    return read_target.get() == "replica"
+
+
+def session_route(function):
+    """Run a route handler within the session of its request, the request is the first argument."""
+    @functools.wraps(function)
+    def wrapper(req, *args, **kwargs):
+        with session_scope(request_session(req)):
+            return function(req, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Sends writes to the primary pool and reads to the replica pools.
+
+    After a write, reads of the same session go to the primary for `window`
+    seconds, so a client sees its own writes despite replication lag. Reads
+    fall back to the primary when a replica can not hand out a connection.
+    Without replicas every call uses the primary.
+    """
+    def __init__(self, primary: ConnectionPool, replicas: list = None, strategy: str = "round_robin", window: float = 5.0) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Invalid replica strategy: {strategy}. Expected one of: {', '.join(STRATEGIES)}.")
+
+        self.primary = primary
+        self.replicas = list(replicas or [])
+        self.strategy = strategy
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._windows = {}
+        self._metrics = {
+            "primary_reads": 0,
+            "replica_reads": 0,
+            "window_reads": 0,
+            "fallbacks": 0,
+        }
+
+    # Internal Functions
+    def _in_window(self, session) -> bool:
+        with self._lock:
+            expires = self._windows.get(session)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del self._windows[session]
+                return False
+            return True
+
+    def _pick_replica(self) -> ConnectionPool:
+        if self.strategy == "least_connections":
+            return min(self.replicas, key=lambda pool: pool.stats()["in_use"])
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._metrics[key] += 1
+
+    # Routing Functions
+    def record_write(self) -> None:
+        """Open the read-your-writes window of the current session.
+
+        Writes without a session open no window, it would send every
+        anonymous client to the primary.
+        """
+        session = current_session.get()
+        if not self.replicas or self.window <= 0 or session is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._windows) >= MAX_TRACKED_SESSIONS:
+                self._windows = {key: expires for key, expires in self._windows.items() if expires > now}
+            self._windows[session] = now + self.window
+
+    def read_pool(self) -> ConnectionPool:
+        """Pool for the next read of the current session."""
+        if not self.replicas:
+            self._count("primary_reads")
+            return self.primary
+        if self._in_window(current_session.get()):
+            self._count("window_reads")
+            return self.primary
+        self._count("replica_reads")
+        return self._pick_replica()
+
+    @contextmanager
+    def connection(self, read: bool = False, primary: bool = False):
+        """Check out a connection for a read or a write and record writes for the session.
+
+        `primary` sends a read to the primary, e.g. for results that are cached.
+        """
+        pool = self.read_pool() if read and not primary else self.primary
+        try:
+            conn = pool.getconn()
+        except (psycopg2.OperationalError, PoolTimeout) as e:
+            if pool is self.primary:
+                raise
+            logging.warning(f"Replica unavailable, reading from the primary: {e}")
+            self._count("fallbacks")
+            pool = self.primary
+            conn = pool.getconn()
+        if read:
+            read_target.set("primary" if pool is self.primary else "replica")
+
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            pool.putconn(conn, discard=discard)
+
+        if not read:
+            self.record_write()
+
+    # Utility Functions
+    def open(self) -> None:
+        """Open the primary pool, replicas that can not be reached are opened on demand later."""
+        self.primary.open()
+        for replica in self.replicas:
+            try:
+                replica.open()
+            except psycopg2.OperationalError as e:
+                logging.warning(f"Could not open replica pool: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["sessions_in_window"] = len(self._windows)
+        stats.update({
+            "strategy": self.strategy,
+            "window": self.window,
+            "replicas": [replica.stats() for replica in self.replicas],
+        })
+        return stats
+
+    def close(self) -> None:
+        self.primary.close()
+        for replica in self.replicas:
+            replica.close()
@@ -1,26 +1,167 @@
+import hashlib
+import re
+import threading
+import time
 from pathlib import Path
 
+import psycopg2
+import psycopg2.extensions
+
 SQL_DIR_PATH = Path(__file__).parent / "sql_queries"
 
+PLACEHOLDER_PATTERN = re.compile(r"%s")
+
+# -- Upper bound of query builder texts that get prepared, later ones run unprepared --
+MAX_BUILT_STATEMENTS = 512
+
+
+class StatementError(Exception):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+
 def read_query(filename: str) -> str:
-    return open(SQL_DIR_PATH / filename, "r").read()
+    with open(SQL_DIR_PATH / filename, "r") as file:
+        return file.read()
+
+
+class Statement:
+    """One registered SQL statement with its server-side prepared form."""
+    def __init__(self, name: str, filename: str, text: str) -> None:
+        self.name = name
+        self.filename = filename
+        self.text = text.strip().rstrip(";").strip()
+        self.param_count = len(PLACEHOLDER_PATTERN.findall(self.text))
+        self.prepared_name = name.lower()
+
+        # -- PREPARE takes $1, $2, ... instead of the %s placeholders of psycopg2 --
+        counter = iter(range(1, self.param_count + 1))
+        self.prepare_query = f"PREPARE {self.prepared_name} AS " + PLACEHOLDER_PATTERN.sub(lambda _: f"${next(counter)}", self.text)
+        if self.param_count:
+            self.execute_query = f"EXECUTE {self.prepared_name} ({', '.join(['%s'] * self.param_count)})"
+        else:
+            self.execute_query = f"EXECUTE {self.prepared_name}"
+
+    def validate(self) -> None:
+        if not self.text:
+            raise StatementError(f"Empty statement {self.name} in {self.filename}")
+        if ";" in self.text:
+            raise StatementError(f"Statement {self.name} in {self.filename} must hold exactly one statement")
+
+
+class StatementRegistry:
+    """Loads the `.sql` files once and executes them as prepared statements.
+
+    Each statement is `PREPARE`d once per connection, later executions skip
+    parsing and planning. Connections without a `prepared_statements` set
+    fall back to plain execution.
+    """
+    def __init__(self, files: dict) -> None:
+        self.statements = {}
+        for name, filename in files.items():
+            try:
+                statement = Statement(name, filename, read_query(filename))
+            except OSError as e:
+                raise StatementError(f"Could not load statement {name} from {filename}: {e}")
+            statement.validate()
+            self.statements[name] = statement
+
+        self._lock = threading.Lock()
+        self._counters = {name: {"executions": 0, "prepares": 0, "seconds_total": 0.0} for name in self.statements}
+        self._built = {}
+
+    def __getitem__(self, name: str) -> Statement:
+        return self.statements[name]
+
+    def _prepare(self, cursor: psycopg2.extensions.cursor, statement: Statement, prepared: set) -> None:
+        cursor.execute(statement.prepare_query)
+        prepared.add(statement.name)
+        with self._lock:
+            self._counters[statement.name]["prepares"] += 1
+
+    def execute(self, cursor: psycopg2.extensions.cursor, name: str, params: tuple = ()) -> None:
+        statement = self.statements[name]
+        if len(params) != statement.param_count:
+            raise StatementError(f"Statement {name} expects {statement.param_count} parameters, got {len(params)}")
+
+        start = time.perf_counter()
+        prepared = getattr(cursor.connection, "prepared_statements", None)
+        if prepared is None:
+            cursor.execute(statement.text, params)
+        else:
+            if statement.name not in prepared:
+                self._prepare(cursor, statement, prepared)
+            cursor.execute(statement.execute_query, params)
+
+        with self._lock:
+            counter = self._counters[name]
+            counter["executions"] += 1
+            counter["seconds_total"] += time.perf_counter() - start
+
+    def execute_built(self, cursor: psycopg2.extensions.cursor, text: str, params: tuple = ()) -> None:
+        """Execute a query builder statement, registered under a name derived from its text on first use."""
+        name = self._built.get(text)
+        if name is None:
+            with self._lock:
+                name = self._built.get(text)
+                if name is None and len(self._built) < MAX_BUILT_STATEMENTS:
+                    name = "BUILT_" + hashlib.sha1(text.encode()).hexdigest()[:16].upper()
+                    statement = Statement(name, "<query builder>", text)
+                    statement.validate()
+                    self.statements[name] = statement
+                    self._counters[name] = {"executions": 0, "prepares": 0, "seconds_total": 0.0}
+                    self._built[text] = name
+        if name is None:
+            cursor.execute(text, params)
+            return
+        self.execute(cursor, name, params)
+
+    def prepare_all(self, connection: psycopg2.extensions.connection) -> None:
+        """Prepare every statement on a connection, fails early on invalid SQL."""
+        prepared = getattr(connection, "prepared_statements", None)
+        if prepared is None:
+            prepared = set()
+        with connection.cursor() as cursor:
+            # -- Snapshot, query builder statements may be registered meanwhile --
+            for statement in list(self.statements.values()):
+                if statement.name in prepared:
+                    continue
+                try:
+                    self._prepare(cursor, statement, prepared)
+                except psycopg2.Error as e:
+                    connection.rollback()
+                    raise StatementError(f"Statement {statement.name} in {statement.filename} is invalid: {e}")
+        connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(counter) for name, counter in self._counters.items()}
 
-QUERY_GET_ALL_DRIVERS = read_query("drivers/get_all_drivers.sql")
-QUERY_GET_DRIVER = read_query("drivers/drivers_get.sql")
-QUERY_CREATE_DRIVER = read_query("drivers/drivers_create.sql")
-QUERY_UPDATE_DRIVER = read_query("drivers/drivers_update.sql")
-QUERY_DELETE_DRIVER = read_query("drivers/drivers_delete.sql")
 
-QUERY_GET_ALL_CONVENTIONS = read_query("conventions/get_all_conventions.sql")
-QUERY_GET_CONVENTION = read_query("conventions/conventions_get.sql")
-QUERY_CREATE_CONVENTION = read_query("conventions/conventions_create.sql")
-QUERY_UPDATE_CONVENTION = read_query("conventions/conventions_update.sql")
-QUERY_DELETE_CONVENTION = read_query("conventions/conventions_delete.sql")
+registry = StatementRegistry({
+    "GET_DRIVER": "drivers/driver_get.sql",
+    "DELETE_DRIVER": "drivers/driver_delete.sql",
+    "GET_DRIVERS_BY_IDS": "drivers/drivers_get_many.sql",
 
-QUERY_GET_ALL_DRIVERTIMES = read_query("drivertimes/get_all_drivertimes.sql")
-QUERY_GET_DRIVERTIME = read_query("drivertimes/drivertimes_get.sql")
-QUERY_CREATE_DRIVERTIME = read_query("drivertimes/drivertimes_create.sql")
-QUERY_UPDATE_DRIVERTIME = read_query("drivertimes/drivertimes_update.sql")
-QUERY_DELETE_DRIVERTIME = read_query("drivertimes/drivertimes_delete.sql")
+    "GET_CONVENTION": "conventions/convention_get.sql",
+    "DELETE_CONVENTION": "conventions/convention_delete.sql",
+    "GET_CONVENTIONS_BY_IDS": "conventions/conventions_get_many.sql",
 
+    "GET_DRIVERTIME": "drivertimes/drivertime_get.sql",
+    "CREATE_DRIVERTIME": "drivertimes/drivertime_create.sql",
+    "DELETE_DRIVERTIME": "drivertimes/drivertime_delete.sql",
+    "GET_DRIVERTIMES_BY_IDS": "drivertimes/drivertimes_get_many.sql",
+    "BEST_SECTORS": "drivertimes/best_sectors.sql",
+    "BEST_SECTORS_DRIVER": "drivertimes/best_sectors_driver.sql",
+    "BEST_SECTORS_CONVENTION": "drivertimes/best_sectors_convention.sql",
+    "BEST_SECTORS_DRIVER_CONVENTION": "drivertimes/best_sectors_driver_convention.sql",
+    "DRIVERTIME_STATS": "drivertimes/drivertimes_stats.sql",
 
+    "GET_LEADERBOARD": "leaderboard/leaderboard_get.sql",
+    "RECORD_LEADERBOARD": "leaderboard/leaderboard_record.sql",
+    "LOCK_LEADERBOARD": "leaderboard/leaderboard_lock.sql",
+    "REFRESH_LEADERBOARD": "leaderboard/leaderboard_refresh.sql",
+    "PRUNE_LEADERBOARD": "leaderboard/leaderboard_prune.sql",
+    "BEST_LEADERBOARD": "leaderboard/leaderboard_best.sql",
+    "PLACEMENT_LEADERBOARD": "leaderboard/leaderboard_placement.sql",
+})
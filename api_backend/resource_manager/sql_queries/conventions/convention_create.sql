@@ -1,4 +0,0 @@
-INSERT INTO drivers
-(name) 
-VALUES (%s) 
-RETURNING uuid;
@@ -1,2 +1,3 @@
 DELETE FROM conventions
-WHERE id = %s;
+WHERE id = %s
+RETURNING id;
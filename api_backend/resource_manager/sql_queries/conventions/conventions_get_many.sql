@@ -0,0 +1,4 @@
+SELECT
+id, name, location, date
+FROM conventions
+WHERE id = ANY(%s::integer[]);
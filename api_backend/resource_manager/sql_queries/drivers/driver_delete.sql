@@ -1,2 +1,3 @@
 DELETE FROM drivers
-WHERE id = %s;
+WHERE id = %s
+RETURNING id;
@@ -0,0 +1,5 @@
+-- Takes text[] and casts it here, so the prepared form accepts the string array psycopg2 sends --
+SELECT
+id, name, email, createdAt
+FROM drivers
+WHERE id = ANY(%s::text[]::uuid[]);
@@ -1 +0,0 @@
-SELECT * FROM drivers;
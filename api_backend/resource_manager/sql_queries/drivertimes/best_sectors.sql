@@ -0,0 +1,3 @@
+SELECT
+MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime)
+FROM drivertimes;
@@ -0,0 +1,4 @@
+SELECT
+MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime)
+FROM drivertimes
+WHERE driver = %s;
@@ -1,4 +1,4 @@
 INSERT INTO drivertimes
-(name) 
-VALUES (%s) 
-RETURNING id;
+(driver, convention, sector1, sector2, sector3, laptime) 
+VALUES (%s, %s, %s, %s, %s, %s) 
+RETURNING id, sector1, sector2, sector3, laptime, driver, convention;
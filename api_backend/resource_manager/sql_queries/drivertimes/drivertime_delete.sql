@@ -1,2 +1,3 @@
-DELETE FROM drivers
-WHERE id = %s;
+DELETE FROM drivertimes
+WHERE id = %s
+RETURNING driver, convention;
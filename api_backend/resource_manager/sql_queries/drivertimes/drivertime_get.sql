@@ -1,3 +1,4 @@
-SELECT *
+SELECT
+id, sector1, sector2, sector3, laptime, driver, convention
 FROM drivertimes 
 WHERE id = %s;
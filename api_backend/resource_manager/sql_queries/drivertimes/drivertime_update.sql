@@ -1,4 +0,0 @@
-UPDATE drivertimes
-SET %s = %s
-WHERE id = %s
-RETURNING *;
\ No newline at end of file
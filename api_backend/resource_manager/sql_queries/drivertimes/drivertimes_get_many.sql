@@ -0,0 +1,4 @@
+SELECT
+id, sector1, sector2, sector3, laptime, driver, convention
+FROM drivertimes
+WHERE id = ANY(%s::integer[]);
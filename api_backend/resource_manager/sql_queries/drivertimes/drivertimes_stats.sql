@@ -0,0 +1,33 @@
+-- Count, mean, percentiles and an equal width histogram per sector and laptime, a NULL filter matches every row --
+WITH laps AS (
+    SELECT sector1, sector2, sector3, laptime
+    FROM drivertimes
+    WHERE (%s::integer IS NULL OR convention = %s::integer)
+    AND (%s::uuid IS NULL OR driver = %s::uuid)
+),
+samples AS (
+    SELECT sample.metric, sample.value
+    FROM laps
+    CROSS JOIN LATERAL (VALUES ('sector1', sector1), ('sector2', sector2), ('sector3', sector3), ('laptime', laptime)) AS sample (metric, value)
+),
+summary AS (
+    SELECT metric, COUNT(*) AS count, AVG(value) AS mean, MIN(value) AS min, MAX(value) AS max,
+    percentile_cont(ARRAY[0.5, 0.9, 0.99]) WITHIN GROUP (ORDER BY value) AS percentiles
+    FROM samples
+    GROUP BY metric
+),
+buckets AS (
+    SELECT samples.metric,
+    CASE WHEN summary.max = summary.min THEN 1
+    ELSE LEAST(width_bucket(samples.value, summary.min, summary.max, %s::integer), %s::integer) END AS bucket,
+    COUNT(*) AS count
+    FROM samples
+    JOIN summary ON summary.metric = samples.metric
+    GROUP BY 1, 2
+)
+SELECT
+summary.metric, summary.count, summary.mean, summary.min, summary.max, summary.percentiles,
+ARRAY_AGG(buckets.bucket ORDER BY buckets.bucket), ARRAY_AGG(buckets.count ORDER BY buckets.bucket)
+FROM summary
+JOIN buckets ON buckets.metric = summary.metric
+GROUP BY summary.metric, summary.count, summary.mean, summary.min, summary.max, summary.percentiles;
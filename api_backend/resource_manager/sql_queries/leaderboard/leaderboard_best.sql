@@ -0,0 +1,4 @@
+SELECT best_laptime
+FROM leaderboard
+WHERE convention = %s AND driver = %s
+FOR UPDATE;
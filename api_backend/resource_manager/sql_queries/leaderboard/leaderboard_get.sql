@@ -0,0 +1,13 @@
+SELECT
+RANK() OVER (ORDER BY leaderboard.best_laptime) AS rank,
+leaderboard.driver,
+drivers.name,
+leaderboard.best_laptime,
+leaderboard.best_sector1,
+leaderboard.best_sector2,
+leaderboard.best_sector3,
+leaderboard.laps
+FROM leaderboard
+LEFT JOIN drivers ON drivers.id = leaderboard.driver
+WHERE leaderboard.convention = %s
+ORDER BY leaderboard.best_laptime, leaderboard.driver;
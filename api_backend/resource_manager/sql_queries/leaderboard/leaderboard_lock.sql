@@ -0,0 +1,4 @@
+SELECT 1
+FROM leaderboard
+WHERE convention = %s AND driver = %s
+FOR UPDATE;
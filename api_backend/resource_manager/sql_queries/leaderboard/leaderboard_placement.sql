@@ -0,0 +1,4 @@
+-- Both counts are range scans on leaderboard_convention_laptime --
+SELECT
+(SELECT COUNT(*) FROM leaderboard WHERE convention = %s AND best_laptime < %s AND driver <> %s),
+(SELECT MIN(best_laptime) FROM leaderboard WHERE convention = %s);
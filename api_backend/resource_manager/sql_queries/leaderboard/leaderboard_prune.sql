@@ -0,0 +1,3 @@
+DELETE FROM leaderboard
+WHERE convention = %s AND driver = %s
+AND NOT EXISTS (SELECT 1 FROM drivertimes WHERE convention = %s AND driver = %s);
@@ -0,0 +1,9 @@
+INSERT INTO leaderboard
+(convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+VALUES (%s, %s, %s, %s, %s, %s, 1)
+ON CONFLICT (convention, driver) DO UPDATE SET
+best_sector1 = LEAST(leaderboard.best_sector1, EXCLUDED.best_sector1),
+best_sector2 = LEAST(leaderboard.best_sector2, EXCLUDED.best_sector2),
+best_sector3 = LEAST(leaderboard.best_sector3, EXCLUDED.best_sector3),
+best_laptime = LEAST(leaderboard.best_laptime, EXCLUDED.best_laptime),
+laps = leaderboard.laps + 1;
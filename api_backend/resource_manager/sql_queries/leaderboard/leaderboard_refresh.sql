@@ -0,0 +1,12 @@
+INSERT INTO leaderboard
+(convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+SELECT convention, driver, MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime), COUNT(*)
+FROM drivertimes
+WHERE convention = %s AND driver = %s
+GROUP BY convention, driver
+ON CONFLICT (convention, driver) DO UPDATE SET
+best_sector1 = EXCLUDED.best_sector1,
+best_sector2 = EXCLUDED.best_sector2,
+best_sector3 = EXCLUDED.best_sector3,
+best_laptime = EXCLUDED.best_laptime,
+laps = EXCLUDED.laps;
@@ -5,7 +5,7 @@ CREATE TABLE drivers (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name VARCHAR(255) NOT NULL,
     email VARCHAR(255),
-    createdAt TIMESTAMP DEFAULT NOW(),
+    createdAt TIMESTAMP NOT NULL DEFAULT NOW(),
     CONSTRAINT valid_email CHECK (email ~* '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$')
 );
 
@@ -26,6 +26,48 @@ CREATE TABLE drivertimes (
     convention INTEGER REFERENCES conventions(id)
 );
 
+-- Best lap and sectors per convention and driver, kept up to date on every drivertime write --
+CREATE TABLE leaderboard (
+    convention INTEGER REFERENCES conventions(id) ON DELETE CASCADE,
+    driver UUID REFERENCES drivers(id) ON DELETE CASCADE,
+    best_sector1 FLOAT NOT NULL,
+    best_sector2 FLOAT NOT NULL,
+    best_sector3 FLOAT NOT NULL,
+    best_laptime FLOAT NOT NULL,
+    laps INTEGER NOT NULL,
+    PRIMARY KEY (convention, driver)
+);
+
+CREATE INDEX leaderboard_convention_laptime ON leaderboard (convention, best_laptime);
+
+-- Last log sequence number of each write-behind buffer whose laps are committed --
+CREATE TABLE write_behind_checkpoints (
+    buffer VARCHAR(255) PRIMARY KEY,
+    seq BIGINT NOT NULL
+);
+
+-- Notify listeners on the drivertimes channel of every inserted and deleted lap, sent on commit --
+CREATE FUNCTION notify_drivertimes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('drivertimes', json_build_object('op', 'insert', 'id', id, 'convention', convention, 'driver', driver, 'laptime', laptime)::text)
+        FROM new_rows;
+    ELSE
+        PERFORM pg_notify('drivertimes', json_build_object('op', 'delete', 'id', id, 'convention', convention, 'driver', driver, 'laptime', laptime)::text)
+        FROM old_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER drivertimes_notify_insert AFTER INSERT ON drivertimes
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_drivertimes();
+
+CREATE TRIGGER drivertimes_notify_delete AFTER DELETE ON drivertimes
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_drivertimes();
+
 INSERT INTO drivers (id, name, email) 
 VALUES ('4823662a-29c5-47d7-bdba-68baa2825990', 'Dummy', 'example@email.test');
 
@@ -35,6 +77,9 @@ VALUES ('Dummy Convention', 'Dummy Location', '2020-01-01');
 INSERT INTO drivertimes (sector1, sector2, sector3, laptime, driver, convention)
 VALUES (3000, 3000, 3000, 9000, '4823662a-29c5-47d7-bdba-68baa2825990', 1);
 
+INSERT INTO leaderboard (convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+VALUES (1, '4823662a-29c5-47d7-bdba-68baa2825990', 3000, 3000, 3000, 9000, 1);
+
 
 
 
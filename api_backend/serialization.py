@@ -0,0 +1,179 @@
+# Copyright (c) 2023 NGITL
+
+import json
+import time
+
+from api_backend.metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# -- Response encodings with their media types, "columnar" holds one array per column --
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/vnd.columnar+json",
+    "msgpack": "application/msgpack",
+}
+ACCEPT_ALIASES = {
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+WILDCARD_MEDIA_TYPES = ("*/*", "application/*")
+
+
+def _format_timestamp(value) -> str:
+    # -- Same output as strftime("%Y-%m-%d-%H-%M-%S"), isoformat runs in C --
+    return value.isoformat("-", "seconds").replace(":", "-")
+
+
+def _format_date(value) -> str:
+    return value.isoformat()
+
+
+# -- Conversions the encoders can not do on their own, UUIDs are written by the encoders --
+CONVERTERS = {
+    "timestamp": _format_timestamp,
+    "date": _format_date,
+}
+
+
+class UnsupportedEncoding(Exception):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+
+def _quality(params: list) -> float:
+    """Read the q parameter of a media range, a missing q is 1 and a malformed one excludes the range."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                return 0.0
+            return quality if 0.0 <= quality <= 1.0 else 0.0
+    return 1.0
+
+
+def negotiate(format_param: str = None, accept: str = None) -> str:
+    """Pick a response encoding from the `format` query param, or else from the Accept header.
+
+    Unknown `format` values raise ValueError and "msgpack" without the
+    msgpack package raises UnsupportedEncoding. From the Accept header the
+    available media type with the highest q wins, ranges with q=0 are
+    skipped. A header without an available media type falls back to "json".
+    """
+    if format_param:
+        encoding = format_param.strip().lower()
+        if encoding not in MEDIA_TYPES:
+            raise ValueError(f"Invalid format: {format_param}. Expected one of: {', '.join(MEDIA_TYPES)}.")
+        if encoding == "msgpack" and msgpack is None:
+            raise UnsupportedEncoding("MessagePack responses need the msgpack package.")
+        return encoding
+
+    candidates = []
+    for index, media_range in enumerate((accept or "").split(",")):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        quality = _quality(params)
+        if quality <= 0:
+            continue
+
+        # -- Wildcards stand for the default, below explicit types of the same quality --
+        wildcard = media_type in WILDCARD_MEDIA_TYPES
+        encoding = "json" if wildcard else ACCEPT_ALIASES.get(media_type)
+        for known_encoding, known in MEDIA_TYPES.items():
+            if media_type == known:
+                encoding = known_encoding
+        if encoding == "msgpack" and msgpack is None:
+            continue
+        if encoding is not None:
+            candidates.append((-quality, wildcard, index, encoding))
+    return min(candidates)[3] if candidates else "json"
+
+
+
+class RowEncoder:
+    """Encodes DB row tuples straight to JSON bytes.
+
+    `columns` lists (key, kind) in row order, kind is one of "int", "float",
+    "str", "timestamp" or "date". Uses orjson when it is installed and the
+    standard library otherwise, both produce the same objects.
+    """
+    def __init__(self, columns: list, use_orjson: bool = True) -> None:
+        self.keys = tuple(key for key, _ in columns)
+        self.kinds = tuple(kind for _, kind in columns)
+        self.use_orjson = use_orjson and orjson is not None
+
+        # -- Only columns that need a conversion are touched on the fast path --
+        self._conversions = tuple(
+            (index, CONVERTERS[kind]) for index, kind in enumerate(self.kinds) if kind in CONVERTERS
+        )
+
+    def _convert(self, row) -> dict:
+        row = list(row)
+        for index, converter in self._conversions:
+            if row[index] is not None:
+                row[index] = converter(row[index])
+        return dict(zip(self.keys, row))
+
+    def encode_items(self, rows) -> bytes:
+        """Encode rows as comma separated JSON objects, without the surrounding brackets."""
+        if self._conversions:
+            items = [self._convert(row) for row in rows]
+        else:
+            keys = self.keys
+            items = [dict(zip(keys, row)) for row in rows]
+
+        if self.use_orjson:
+            return orjson.dumps(items)[1:-1]
+        return json.dumps(items, separators=(",", ":"), default=str)[1:-1].encode()
+
+    def encode(self, rows) -> bytes:
+        """Encode rows as a JSON array of objects."""
+        return b"[" + self.encode_items(rows) + b"]"
+
+    def columns(self, rows) -> dict:
+        """Transpose rows into one list per column, keys are repeated once instead of per row."""
+        columns = list(zip(*rows)) if rows else [()] * len(self.keys)
+        converters = dict(self._conversions)
+        result = {}
+        for index, (key, values) in enumerate(zip(self.keys, columns)):
+            converter = converters.get(index)
+            if converter is None:
+                result[key] = list(values)
+            else:
+                result[key] = [None if value is None else converter(value) for value in values]
+        return result
+
+    def encode_columnar(self, rows) -> bytes:
+        """Encode rows as a JSON object with one array per column."""
+        columns = self.columns(rows)
+        if self.use_orjson:
+            return orjson.dumps(columns)
+        return json.dumps(columns, separators=(",", ":"), default=str).encode()
+
+    def encode_msgpack(self, rows) -> bytes:
+        """Encode rows as a MessagePack map with one array per column, floats stay 64 bit."""
+        if msgpack is None:
+            raise UnsupportedEncoding("MessagePack responses need the msgpack package.")
+        return msgpack.packb(self.columns(rows), default=str, use_bin_type=True)
+
+    def encode_as(self, rows, encoding: str = "json") -> bytes:
+        """Encode rows in one of the MEDIA_TYPES encodings."""
+        start = time.perf_counter()
+        try:
+            if encoding == "columnar":
+                return self.encode_columnar(rows)
+            if encoding == "msgpack":
+                return self.encode_msgpack(rows)
+            return self.encode(rows)
+        finally:
+            metrics.observe_serialization(time.perf_counter() - start)
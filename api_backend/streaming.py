@@ -0,0 +1,22 @@
+# Copyright (c) 2023 NGITL
+
+
+def encoded_array_chunks(rows, encoder, chunk_rows: int = 2000):
+    """Encode rows into a JSON array with a `RowEncoder`, yielding one bytes chunk per `chunk_rows` rows.
+
+    Only one chunk is held in memory at a time, no matter how many rows
+    the iterable produces.
+    """
+    yield b"["
+    first = True
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield (b"" if first else b",") + encoder.encode_items(chunk)
+            first = False
+            chunk = []
+
+    if chunk:
+        yield (b"" if first else b",") + encoder.encode_items(chunk)
+    yield b"]"
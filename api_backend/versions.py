@@ -0,0 +1,86 @@
+# Copyright (c) 2023 NGITL
+
+import threading
+import time
+import uuid
+
+
+class VersionTracker:
+    """In-process change counters per table and per scope within a table (e.g. a convention).
+
+    Writes bump the counters after they are committed, reads turn them into
+    ETags before querying. A write with a known scope only changes that
+    scope, a write without one changes every scope of the table. ETags also
+    carry a random per-process epoch, so a restart never reuses old tags, and
+    a `ttl` time bucket to bound staleness against writes made by other
+    instances.
+    """
+    def __init__(self, ttl: float = 10.0) -> None:
+        self.ttl = ttl
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._resets = {}
+        self._scopes = {}
+        self.not_modified = 0
+
+    @staticmethod
+    def _key(scope) -> str:
+        key = str(scope).strip().lower()
+        # -- Integer ids are normalized, "01" and "1" select the same convention --
+        try:
+            return str(int(key))
+        except ValueError:
+            return key
+
+    def bump(self, table: str, *scopes) -> None:
+        """Record a committed write to `table`, limited to `scopes` when they are known."""
+        with self._lock:
+            self._tables[table] = self._tables.get(table, 0) + 1
+            if not scopes:
+                self._resets[table] = self._resets.get(table, 0) + 1
+            for scope in scopes:
+                key = (table, self._key(scope))
+                self._scopes[key] = self._scopes.get(key, 0) + 1
+
+    def version(self, table: str, scope=None) -> str:
+        with self._lock:
+            if scope is None:
+                return str(self._tables.get(table, 0))
+            return f"{self._resets.get(table, 0)}.{self._scopes.get((table, self._key(scope)), 0)}"
+
+    def etag(self, *parts, variant: str = None) -> str:
+        """Build an ETag from (table, scope) pairs, read it before running the query.
+
+        `variant` tells apart representations of the same data, e.g. response encodings.
+        """
+        versions = "-".join(f"{table}{self.version(table, scope)}" for table, scope in parts)
+        if self.ttl:
+            versions += f"-{int(time.time() // self.ttl)}"
+        if variant:
+            versions += f"-{variant}"
+        return f'"{self.epoch}-{versions}"'
+
+    def matches(self, if_none_match: str, etag: str) -> bool:
+        """Check an If-None-Match header against the current ETag."""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == etag:
+                with self._lock:
+                    self.not_modified += 1
+                return True
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "tables": dict(self._tables),
+                "scopes": len(self._scopes),
+                "not_modified": self.not_modified,
+                "ttl": self.ttl,
+            }
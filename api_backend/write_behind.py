@@ -0,0 +1,313 @@
+# Copyright (c) 2023 NGITL
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from api_backend.entities import drivertime
+
+# -- Retry delays of a failed flush, doubled up to the maximum --
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5.0
+
+
+class BufferFull(Exception):
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        super().__init__(f"Write-behind buffer still full after {timeout}s")
+
+
+class LogInUse(Exception):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(f"Write-behind log {path} is in use by another process")
+
+
+class WriteBehindBuffer:
+    """Acknowledges laps once they are fsync'd to a local append-only log, a background thread flushes them in batches.
+
+    Each lap gets a sequence number in the log. A flush inserts a batch with
+    the bulk path and stores its last sequence number in the
+    `write_behind_checkpoints` table in the same transaction, so a restart
+    replays exactly the laps that were not committed yet. The log is
+    truncated whenever everything in it is committed. At most `max_pending`
+    laps wait for a flush, `append` blocks up to `enqueue_timeout` seconds
+    for room and then raises BufferFull.
+
+    One process owns a log at a time, through an exclusive lock on
+    `path + ".lock"`. A second buffer on the same path raises LogInUse.
+    """
+    def __init__(self, backend, path: str, max_pending: int = 10000, batch_size: int = 500, enqueue_timeout: float = 1.0) -> None:
+        if max_pending < 1 or batch_size < 1:
+            raise ValueError(f"Invalid write-behind settings: max_pending={max_pending}, batch_size={batch_size}")
+
+        self.backend = backend
+        self.path = path
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+
+        # -- Lock order: _log_lock before _cond --
+        self._log_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._in_flight = 0
+        self._reserved = 0
+        self._stopped = False
+        self._thread = None
+
+        self._metrics = {
+            "queued": 0,
+            "flushed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "retries": 0,
+            "replayed": 0,
+            "backpressure_timeouts": 0,
+            "truncations": 0,
+            "fsync_seconds_total": 0.0,
+        }
+
+        self._lock_file = self._acquire(path)
+        self.name = self._load_name()
+        self._replay, self._seq = self._read_log()
+        self._log = open(self.path, "a", encoding="utf-8")
+
+    # Log Functions
+    def _acquire(self, path: str):
+        """Lock the log for this process, a separate file as truncation replaces the log itself."""
+        lock_file = open(path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise LogInUse(path)
+        return lock_file
+
+    def _load_name(self) -> str:
+        """Name of this buffer in the checkpoint table, kept next to the log so it survives restarts."""
+        name_path = self.path + ".name"
+        try:
+            with open(name_path, "r", encoding="utf-8") as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            name = uuid.uuid4().hex
+            self._write_durably(name_path, name)
+            return name
+
+    def _write_durably(self, path: str, text: str) -> None:
+        """Replace `path` atomically with `text`, the rename is fsync'd with the directory."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _read_log(self) -> tuple:
+        """Return the logged (seq, row) entries and the last sequence number used."""
+        entries = []
+        last_seq = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return entries, last_seq
+
+        for number, line in enumerate(lines, 1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # -- Only the last line can be torn by a crash during an append --
+                if number == len(lines):
+                    logging.warning(f"Ignoring torn last line of write-behind log {self.path}")
+                    continue
+                raise
+            if "checkpoint" in entry:
+                last_seq = max(last_seq, entry["checkpoint"])
+                continue
+            entries.append((entry["seq"], entry["row"]))
+            last_seq = max(last_seq, entry["seq"])
+        return entries, last_seq
+
+    def _truncate(self) -> None:
+        """Empty the log once everything in it is committed, keeping the last sequence number."""
+        with self._log_lock:
+            with self._cond:
+                if self._pending or self._in_flight or self._reserved:
+                    return
+            self._log.close()
+            self._write_durably(self.path, json.dumps({"checkpoint": self._seq}) + "\n")
+            self._log = open(self.path, "a", encoding="utf-8")
+            with self._cond:
+                self._metrics["truncations"] += 1
+
+    # Queue Functions
+    def append(self, row: dict) -> int:
+        """Log a lap durably and queue it for the flusher, returns its sequence number.
+
+        Invalid rows raise ValueError or TypeError before anything is logged.
+        """
+        drivertime._validate_bulk_row(row)
+
+        with self._cond:
+            if self._stopped:
+                raise BufferFull(0)
+            deadline = time.monotonic() + self.enqueue_timeout
+            while len(self._pending) + self._in_flight + self._reserved >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopped:
+                    self._metrics["backpressure_timeouts"] += 1
+                    raise BufferFull(self.enqueue_timeout)
+                self._cond.wait(remaining)
+            self._reserved += 1
+
+        try:
+            # -- Sequence numbers are taken and queued under the log lock, so the queue keeps log order --
+            with self._log_lock:
+                seq = self._seq + 1
+                start = time.perf_counter()
+                self._log.write(json.dumps({"seq": seq, "row": row}) + "\n")
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._seq = seq
+                with self._cond:
+                    self._pending.append((seq, row))
+                    self._metrics["queued"] += 1
+                    self._metrics["fsync_seconds_total"] += time.perf_counter() - start
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._reserved -= 1
+        return seq
+
+    def _take_batch(self) -> list:
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _flush(self, batch: list) -> None:
+        """Insert a batch, retrying until it is committed or the buffer is stopped.
+
+        A batch is committed in one transaction with its checkpoint, so a
+        retry first checks the checkpoint and skips a batch that is in.
+        """
+        delay = RETRY_DELAY
+        retry = False
+        while True:
+            try:
+                # -- A failed attempt may have committed before its reply was lost, the checkpoint tells --
+                if retry and self.backend.get_write_behind_checkpoint(self.name) >= batch[-1][0]:
+                    logging.info(f"Write-behind batch up to {batch[-1][0]} was already committed")
+                    result = {"inserted": len(batch), "errors": []}
+                    break
+                result = self.backend.post_drivertimes([row for _, row in batch], checkpoint=(self.name, batch[-1][0]))
+                break
+            except Exception as e:
+                retry = True
+                with self._cond:
+                    self._metrics["retries"] += 1
+                    if self._stopped:
+                        # -- The batch stays in the log and is replayed on the next start --
+                        self._in_flight = 0
+                        raise
+                logging.warning(f"Write-behind flush of {len(batch)} laps failed, retrying in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+        # -- Rows the database refused can not be retried, the client was already answered --
+        for error in result["errors"]:
+            logging.error(f"Write-behind lap {batch[error['row']][0]} was rejected: {error['error']}")
+
+        with self._cond:
+            self._in_flight = 0
+            self._metrics["flushed"] += result["inserted"]
+            self._metrics["rejected"] += len(result["errors"])
+            self._metrics["batches"] += 1
+            self._cond.notify_all()
+            empty = not self._pending
+
+        if empty:
+            self._truncate()
+
+    def _replay_log(self) -> None:
+        """Queue the logged laps that are newer than the committed checkpoint, ahead of new appends."""
+        delay = RETRY_DELAY
+        while True:
+            try:
+                checkpoint = self.backend.get_write_behind_checkpoint(self.name)
+                break
+            except Exception as e:
+                if self._stopped:
+                    return
+                logging.warning(f"Could not read the write-behind checkpoint, retrying in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+        replay = [entry for entry in self._replay if entry[0] > checkpoint]
+        self._replay = []
+        with self._cond:
+            self._pending.extendleft(reversed(replay))
+            self._metrics["replayed"] += len(replay)
+            self._cond.notify_all()
+        if replay:
+            logging.info(f"Replaying {len(replay)} laps from write-behind log {self.path}")
+
+    def _run(self) -> None:
+        self._replay_log()
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self._flush(batch)
+            except Exception:
+                return
+
+    # Utility Functions
+    def start(self) -> threading.Thread:
+        """Replay the log and start flushing in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="write-behind-flusher", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                "pending": len(self._pending),
+                "in_flight": self._in_flight,
+                "max_pending": self.max_pending,
+                "last_seq": self._seq,
+            })
+        return stats
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush what is queued within `timeout` seconds, the rest is replayed on the next start."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._pending or self._in_flight) and self._thread is not None and self._thread.is_alive():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(max(deadline - time.monotonic(), 0))
+        with self._log_lock:
+            self._log.close()
+        self._lock_file.close()
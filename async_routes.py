@@ -0,0 +1,298 @@
+import azure.functions as func
+import logging
+import json
+
+from api_backend.async_backend import AsyncBackend
+from api_backend.metrics import track_route
+from api_backend.entities.driver import DriverNotFound
+from api_backend.entities.drivertime import DriverTimeNotFound
+from api_backend.entities.convention import ConventionNotFound
+from api_backend.pagination import InvalidCursor
+
+# Async versions of the hot routes, served under /api/async/... next to the sync routes.
+bp = func.Blueprint()
+
+backend: AsyncBackend = None
+
+
+def init_async_routes(async_backend: AsyncBackend) -> func.Blueprint:
+    global backend
+    backend = async_backend
+    return bp
+
+
+def _parse_limit(limit: str):
+    if limit:
+        return int(limit)
+    return None
+
+
+def _not_modified(req: func.HttpRequest, etag: str) -> func.HttpResponse:
+    if backend.versions.matches(req.headers.get("If-None-Match"), etag):
+        return func.HttpResponse(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _page_response(page: dict, etag: str = None) -> func.HttpResponse:
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = etag
+    if page["next"] is not None:
+        headers["X-Next-Cursor"] = page["next"]
+    return func.HttpResponse(
+        json.dumps(page["items"]),
+        status_code=200,
+        headers=headers
+        )
+
+# Driver Specific Functions
+
+@bp.route(route="async/drivers", methods=["GET"])
+@track_route
+async def async_drivers_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    etag = backend.versions.etag(("drivers", None))
+    response = _not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try:
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        try:
+            limit = _parse_limit(req.params.get("limit"))
+        except ValueError:
+            return func.HttpResponse(
+                "Invalid limit. Expected integer.",
+                status_code=400
+            )
+        return _page_response(await backend.get_drivers(sorted_by=sorted_by, order=order, limit=limit, after=req.params.get("after")), etag)
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all drivers.",
+            status_code=400
+        )
+
+@bp.route(route="async/driver", methods=["GET"])
+@track_route
+async def async_drivers_get_driver(req: func.HttpRequest) -> func.HttpResponse:
+    driver_id = req.params.get("id")
+    if not driver_id:
+        return func.HttpResponse(
+            "No Driver ID provided.",
+            status_code=400
+        )
+    try:
+        driver = await backend.get_driver(driver_id)
+        return func.HttpResponse(
+            json.dumps(driver),
+            status_code=200
+            )
+
+    except DriverNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get driver.",
+            status_code=400
+        )
+
+# Convention Specific Functions
+
+@bp.route(route="async/conventions", methods=["GET"])
+@track_route
+async def async_conventions_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    etag = backend.versions.etag(("conventions", None))
+    response = _not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try:
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        try:
+            limit = _parse_limit(req.params.get("limit"))
+        except ValueError:
+            return func.HttpResponse(
+                "Invalid limit. Expected integer.",
+                status_code=400
+            )
+        return _page_response(await backend.get_conventions(sorted_by=sorted_by, order=order, limit=limit, after=req.params.get("after")), etag)
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all conventions.",
+            status_code=400
+        )
+
+@bp.route(route="async/convention", methods=["GET"])
+@track_route
+async def async_conventions_get_convention(req: func.HttpRequest) -> func.HttpResponse:
+    conv_id = req.params.get("id")
+    if not conv_id:
+        return func.HttpResponse(
+            "No Convention ID provided.",
+            status_code=400
+        )
+    try:
+        convention = await backend.get_convention(conv_id)
+        return func.HttpResponse(
+            json.dumps(convention),
+            status_code=200
+            )
+
+    except ConventionNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get convention.",
+            status_code=400
+        )
+
+# Drivertimes Specific Functions
+
+@bp.route(route="async/drivertimes", methods=["GET"])
+@track_route
+async def async_drivertimes_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        driver = req.params.get("driver_id")
+        convention = req.params.get("convention_id")
+
+        etag = backend.versions.etag(("drivertimes", convention))
+        response = _not_modified(req, etag)
+        if response is not None:
+            return response
+
+        try:
+            limit = _parse_limit(req.params.get("limit"))
+        except ValueError:
+            return func.HttpResponse(
+                "Invalid limit. Expected integer.",
+                status_code=400
+            )
+        return _page_response(await backend.get_drivertimes(sorted_by=sorted_by, order=order, limit=limit, driver_id=driver, convention_id=convention, after=req.params.get("after")), etag)
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all drivertimes.",
+            status_code=400
+        )
+
+@bp.route(route="async/drivertimes/bestsectors", methods=["GET"])
+@track_route
+async def async_drivertimes_get_best_sectors(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        driver = req.params.get("driver_id")
+        convention = req.params.get("convention_id")
+
+        etag = backend.versions.etag(("drivertimes", convention))
+        response = _not_modified(req, etag)
+        if response is not None:
+            return response
+
+        result = json.dumps(await backend.get_drivertimes_best_sectors(driver_id=driver, convention_id=convention))
+        return func.HttpResponse(
+            result,
+            status_code=200,
+            headers={"ETag": etag}
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get best sectors.",
+            status_code=400
+        )
+
+@bp.route(route="async/drivertime", methods=["GET"])
+@track_route
+async def async_drivertimes_get_drivertime(req: func.HttpRequest) -> func.HttpResponse:
+    time_id = req.params.get("id")
+    if not time_id:
+        return func.HttpResponse(
+            "No Drivertime ID provided.",
+            status_code=400
+        )
+    try:
+        drivertime = await backend.get_drivertime(time_id)
+        return func.HttpResponse(
+            json.dumps(drivertime),
+            status_code=200
+            )
+    except DriverTimeNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get drivertime.",
+            status_code=400
+        )
+
+@bp.route(route="async/drivertime", methods=["POST"])
+@track_route
+async def async_drivertimes_create_drivertime(req: func.HttpRequest) -> func.HttpResponse:
+    sector1 = req.params.get("sector1")
+    sector2 = req.params.get("sector2")
+    sector3 = req.params.get("sector3")
+    laptime = req.params.get("laptime")
+    driver_id = req.params.get("driver_id")
+    convention_id = req.params.get("convention_id")
+    placement = req.params.get("placement", "false").lower() in ("1", "true", "yes")
+    if not sector1 and not sector2 and not sector3 and not laptime:
+        return func.HttpResponse(
+            f"No Valid Data Given.",
+            status_code=400
+            )
+    if not driver_id:
+        logging.info("No driver_id given. using Dummy Driver.")
+        driver_id = "4823662a-29c5-47d7-bdba-68baa2825990"
+    if not convention_id:
+        logging.info("No convention_id given. using Dummy Convention.")
+        convention_id = 1
+    try:
+        result = await backend.post_drivertime(driver_id, convention_id, sector1, sector2, sector3, laptime, placement=placement)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=201
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            f"Drivertime with driver_id: {driver_id} and convention_id: {convention_id} could not be created.",
+            status_code=400
+            )
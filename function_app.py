@@ -1,497 +1,1107 @@
-import azure.functions as func
-import logging
-import json
-import os
-import psycopg2.errors
-from datetime import date, datetime
-import uuid
-
-from api_backend.api_backend import Backend
-from api_backend.entities.driver import DriverNotFound
-from api_backend.entities.drivertime import DriverTimeNotFound
-from api_backend.entities.convention import ConventionNotFound
-
-app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
-
-required_env_vars = ["PORT", "HOST", "USER", "PASSWORD", "DATABASE"]
-for env_var in required_env_vars:
-    if env_var not in os.environ:
-        raise Exception(f"Environment variable {env_var} not found.")
-
-PORT = os.environ["PORT"]
-HOST = os.environ["HOST"]
-USER = os.environ["USER"]
-PASSWORD = os.environ["PASSWORD"]
-DATABASE = os.environ["DATABASE"]
-
-backend = Backend(host=HOST, port=PORT, user=USER, password=PASSWORD, database=DATABASE)
-
-# Driver Specific Functions
-
-@app.route(route="drivers", methods=["GET"])
-def drivers_get_all(req: func.HttpRequest) -> func.HttpResponse:
-
-    try:
-        sorted_by = req.params.get("sorted_by")
-        order = req.params.get("order")
-        limit = req.params.get("limit")
-        if limit:
-            try:
-                limit = int(limit)
-            except TypeError:
-                return func.HttpResponse(
-                    "Invalid limit. Expected integer.",
-                    status_code=400
-                )
-        result = json.dumps(backend.get_drivers(sorted_by=sorted_by, order= order, limit=limit))
-        logging.info(result)
-        return func.HttpResponse(
-            result,
-            status_code=200
-            )
-
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get all drivers.",
-            status_code=400
-        )
-
-@app.route(route="driver", methods=["GET"])
-def drivers_get_driver(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        driver_id = req.params.get("id")
-        driver = backend.get_driver(driver_id)
-        if not driver_id:
-            return func.HttpResponse(
-                "No Driver ID provided.",
-                status_code=400
-            )
-
-
-        return func.HttpResponse(
-            json.dumps(driver),
-            status_code=200
-            )
-    
-    except DriverNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get driver.",
-            status_code=400
-        )
-
-@app.route(route="driver", methods=["POST"])
-def drivers_post_driver(req: func.HttpRequest) -> func.HttpResponse:
-    name = req.params.get("name")
-    email = req.params.get("email")
-    driver_id = req.params.get("id")
-    logging.info(f"Name: {name}, Email: {email}")
-    if not name:
-        return func.HttpResponse(
-            f"No Valid Name Given.",
-            status_code=400
-            )
-    if driver_id:
-        try: 
-            if not driver_id == str(uuid.UUID(driver_id)):
-                return func.HttpResponse(
-                    f"Invalid UUID: {driver_id}",
-                    status_code=400
-                    )
-        except ValueError:
-            return func.HttpResponse(
-                f"Invalid UUID: {driver_id}",
-                status_code=400
-                )
-    try:
-        result = backend.post_driver(name, driver_id, email)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=201
-            )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            f"Driver with name: {name} could not be created.",
-            status_code=400
-            )
-
-
-@app.route(route="driver", methods=["PUT"])
-def drivers_update_driver(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        driver_id = req.params.get("id")
-        new_name = req.params.get("name")
-        new_email = req.params.get("email")
-        values = {}
-        if new_name:
-            values["name"] = new_name
-        if new_email:
-            values["email"] = new_email
-        result = backend.update_driver(driver_id=driver_id, values=values)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=200
-            )
-    
-    except DriverNotFound as e:
-        return func.HttpResponse(
-            f"Driver not found: {e.args}",
-            status_code=404
-        )
-
-    except ValueError as e:
-        return func.HttpResponse(
-            f"Invalid data: {e.args}",
-            status_code=400
-        )
-    
-    except psycopg2.errors.CheckViolation as e:
-        return func.HttpResponse(
-            f"Invalid data: {e.args}",
-            status_code=400
-        )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not update driver.",
-            status_code=400
-        )
-
-
-@app.route(route="driver", methods=["DELETE"])
-def drivers_delete_driver(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        driver_id = req.params.get("id")
-        if not driver_id:
-            return func.HttpResponse(
-                "No Driver ID provided.",
-                status_code=400
-            )
-        result = backend.delete_driver(driver_id)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=200
-            )
-    except DriverNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not delete driver.",
-            status_code=400
-        )
-
-# Convention Specific Functions
-
-@app.route(route="conventions", methods=["GET"])
-def conventions_get_all(req: func.HttpRequest) -> func.HttpResponse:
-    try: 
-        sorted_by = req.params.get("sorted_by")
-        order = req.params.get("order")
-        limit = req.params.get("limit")
-        if limit:
-            try:
-                limit = int(limit)
-            except TypeError:
-                return func.HttpResponse(
-                    "Invalid limit. Expected integer.",
-                    status_code=400
-                )
-        result = json.dumps(backend.get_conventions(sorted_by=sorted_by, order= order, limit=limit))
-
-        return func.HttpResponse(
-            result,
-            status_code=200
-            )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get all conventions.",
-            status_code=400
-        )
-
-@app.route(route="convention", methods=["GET"])
-def conventions_get_convention(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        conv_id = req.params.get("id")
-        if not conv_id:
-            return func.HttpResponse(
-                "No Convention ID provided.",
-                status_code=400
-            )
-        convention = backend.get_convention(conv_id)
-        return func.HttpResponse(
-            json.dumps(convention),
-            status_code=200
-            )
-    
-    except ConventionNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get convention.",
-            status_code=400
-        )
-    
-
-@app.route(route="convention", methods=["POST"])
-def conventions_create_convention(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        name = req.params.get("name")
-        location = req.params.get("location")
-        date = req.params.get("date")
-        if date:
-            try: 
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-            except ValueError:
-                return func.HttpResponse(
-                    f"Invalid date format. Expected format: YYYY-MM-DD",
-                    status_code=400
-                    )
-        if not name:
-            return func.HttpResponse(
-                f"No Valid Name Given.",
-                status_code=400
-                )
-        try:
-            result = backend.post_convention(name, location, date)
-            return func.HttpResponse(
-                json.dumps(result),
-                status_code=201
-                )
-        
-        except:
-            return func.HttpResponse(
-                f"Convention with name: {name} could not be created.",
-                status_code=400
-                )
-    
-    except ValueError:
-        logging.info("No JSON data found.")
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not create convention.",
-            status_code=400
-        )
-
-@app.route(route="convention", methods=["PUT"])
-def conventions_update_convention(req: func.HttpRequest) -> func.HttpResponse:
-    try: 
-        convention_id = req.params.get("id")
-        new_name = req.params.get("name")
-        new_location = req.params.get("location")
-        date = req.params.get("date")
-        values = {}
-        if new_name:
-            values["name"] = new_name
-        if new_location:
-            values["location"] = new_location
-        if date:
-            try:
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-                values["date"] = date
-            except ValueError:
-                return func.HttpResponse(
-                    f"Invalid date format. Expected format: YYYY-MM-DD",
-                    status_code=400
-                    )
-        result = backend.update_convention(convention_id=convention_id, values=values)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=200
-        )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not update convention.",
-            status_code=400
-        )
-
-
-@app.route(route="convention", methods=["DELETE"])
-def conventions_delete_convention(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        convention_id = req.params.get("id")
-        if not convention_id:
-            return func.HttpResponse(
-                "No Convention ID provided.",
-                status_code=400
-            )
-        result = backend.delete_convention(convention_id)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=200
-            )
-    except ConventionNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not delete convention.",
-            status_code=400
-        )
-
-
-# Drivertimes Specific Functions
-
-@app.route(route="drivertimes", methods=["GET"])
-def drivertimes_get_all(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        sorted_by = req.params.get("sorted_by")
-        order = req.params.get("order")
-        limit = req.params.get("limit")
-        driver = req.params.get("driver_id")
-        convention = req.params.get("convention_id")
-        if limit:
-            try:
-                limit = int(limit)
-            except TypeError:
-                return func.HttpResponse(
-                    "Invalid limit. Expected integer.",
-                    status_code=400
-                )
-        
-        result = json.dumps(backend.get_drivertimes(sorted_by=sorted_by, order=order, limit=limit, driver_id=driver, convention_id=convention))
-        logging.info(result)
-        return func.HttpResponse(
-            result,
-            status_code=200
-            )
-
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get all drivertimes.",
-            status_code=400
-        )
-
-@app.route(route="drivertimes/bestsectors", methods=["GET"])
-def drivertimes_get_best_sectors(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        driver = req.params.get("driver_id")
-        convention = req.params.get("convention_id")
-
-        result = json.dumps(backend.get_drivertimes_best_sectors(driver_id=driver, convention_id=convention))
-
-        return func.HttpResponse(
-            result,
-            status_code=200
-            )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get best sectors.",
-            status_code=400
-        )
-
-@app.route(route="drivertime", methods=["GET"])
-def drivertimes_get_drivertime(req: func.HttpRequest) -> func.HttpResponse:
-    time_id = req.params.get("id")
-    if not time_id:
-        return func.HttpResponse(
-            "No Drivertime ID provided.",
-            status_code=400
-        )
-    try:
-        drivertime = backend.get_drivertime(time_id)
-        return func.HttpResponse(
-            json.dumps(drivertime),
-            status_code=200
-            )
-    except DriverTimeNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not get drivertime.",
-            status_code=400
-        )
-
-
-@app.route(route="drivertime", methods=["POST"])
-def drivertimes_create_drivertime(req: func.HttpRequest) -> func.HttpResponse:
-    sector1 = req.params.get("sector1")
-    sector2 = req.params.get("sector2")
-    sector3 = req.params.get("sector3")
-    laptime = req.params.get("laptime")
-    driver_id = req.params.get("driver_id")
-    convention_id = req.params.get("convention_id")
-    if not sector1 and not sector2 and not sector3 and not laptime:
-        return func.HttpResponse(
-            f"No Valid Data Given.",
-            status_code=400
-            )
-    if not driver_id:
-        logging.info("No driver_id given. using Dummy Driver.")
-        driver_id = "4823662a-29c5-47d7-bdba-68baa2825990"
-    if not convention_id:
-        logging.info("No convention_id given. using Dummy Convention.")
-        convention_id = 1
-    try:
-        result = backend.post_drivertime(driver_id, convention_id, sector1, sector2, sector3, laptime)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=201
-            )
-    
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            f"Drivertime with driver_id: {driver_id} and convention_id: {convention_id} could not be created.",
-            status_code=400
-            )
-
-@app.route(route="drivertime", methods=["DELETE"])
-def drivertimes_delete_drivertime(req: func.HttpRequest) -> func.HttpResponse:
-    drivertime_id = req.params.get("id")
-    if not drivertime_id:
-        return func.HttpResponse(
-            "No Drivertime ID provided.",
-            status_code=400
-        )
-    try:
-        result = backend.delete_drivertime(drivertime_id)
-        return func.HttpResponse(
-            json.dumps(result),
-            status_code=200
-            )
-    except DriverTimeNotFound as e:
-        return func.HttpResponse(
-            f"{e}",
-            status_code=404
-        )
-    except Exception as e:
-        logging.exception(e)
-        return func.HttpResponse(
-            "Could not delete drivertime.",
-            status_code=400
-        )
-    
-
+import azure.functions as func
+import logging
+import json
+import os
+import time
+import psycopg2.errors
+from datetime import date, datetime
+import uuid
+
+from api_backend.api_backend import Backend
+from api_backend.async_backend import AsyncBackend
+from api_backend.cache import BestSectorCache, VersionedCache
+from api_backend.live import InvalidLiveCursor, LiveFeed
+from api_backend.metrics import metrics, track_route
+from api_backend.replicas import read_from_replica, session_route
+from api_backend.versions import VersionTracker
+from api_backend.write_behind import BufferFull, LogInUse, WriteBehindBuffer
+from async_routes import init_async_routes
+from stream_routes import init_stream_routes
+from api_backend.entities.driver import DriverNotFound
+from api_backend.entities.drivertime import DriverTimeNotFound, MAX_STATS_BUCKETS, parse_expand
+from api_backend.entities.convention import ConventionNotFound
+from api_backend.pagination import InvalidCursor
+from api_backend.serialization import MEDIA_TYPES, UnsupportedEncoding, negotiate
+
+app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
+
+required_env_vars = ["PORT", "HOST", "USER", "PASSWORD", "DATABASE"]
+for env_var in required_env_vars:
+    if env_var not in os.environ:
+        raise Exception(f"Environment variable {env_var} not found.")
+
+PORT = os.environ["PORT"]
+HOST = os.environ["HOST"]
+USER = os.environ["USER"]
+PASSWORD = os.environ["PASSWORD"]
+DATABASE = os.environ["DATABASE"]
+
+# -- Optional connection pool settings --
+POOL_MIN_SIZE = int(os.environ.get("POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(os.environ.get("POOL_MAX_SIZE", 10))
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("POOL_CHECKOUT_TIMEOUT", 5.0))
+POOL_HEALTH_CHECK_INTERVAL = float(os.environ.get("POOL_HEALTH_CHECK_INTERVAL", 30.0))
+
+# -- Optional bulk ingestion settings --
+MAX_BULK_ROWS = int(os.environ.get("MAX_BULK_ROWS", 50000))
+
+# -- Optional batch lookup settings, IDs per ?ids= request --
+MAX_BATCH_IDS = int(os.environ.get("MAX_BATCH_IDS", 1000))
+# -- Range of the integer id columns --
+INT4_MIN, INT4_MAX = -2 ** 31, 2 ** 31 - 1
+
+# -- Optional read replica settings, DSNs separated by semicolons --
+REPLICA_DSNS = [dsn.strip() for dsn in os.environ.get("REPLICA_DSNS", "").split(";") if dsn.strip()]
+REPLICA_STRATEGY = os.environ.get("REPLICA_STRATEGY", "round_robin")
+READ_YOUR_WRITES_WINDOW = float(os.environ.get("READ_YOUR_WRITES_WINDOW", 5.0))
+
+# -- Optional write-behind settings, an empty log path keeps lap posts synchronous --
+WRITE_BEHIND_LOG = os.environ.get("WRITE_BEHIND_LOG", "")
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", 10000))
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 500))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.environ.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", 1.0))
+
+# -- Optional read transaction settings, autocommit reads skip BEGIN and COMMIT --
+READ_MODE = os.environ.get("READ_MODE", "autocommit")
+READ_ISOLATION_LEVEL = os.environ.get("READ_ISOLATION_LEVEL", "DEFAULT")
+
+# -- Optional live update settings, the listener connects on the first long-poll or stream --
+LIVE_UPDATES = os.environ.get("LIVE_UPDATES", "true").lower() in ("1", "true", "yes")
+LIVE_MAX_EVENTS = int(os.environ.get("LIVE_MAX_EVENTS", 1000))
+LIVE_MAX_WAIT = float(os.environ.get("LIVE_MAX_WAIT", 25.0))
+
+# -- Optional cache settings --
+BEST_SECTORS_CACHE_TTL = float(os.environ.get("BEST_SECTORS_CACHE_TTL", 10.0))
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", 30.0))
+
+# -- Optional cold start settings, connect in the background right after import --
+BACKEND_PREWARM = os.environ.get("BACKEND_PREWARM", "true").lower() in ("1", "true", "yes")
+
+# -- Optional conditional GET settings, seconds after which ETags change even without local writes --
+ETAG_TTL = float(os.environ.get("ETAG_TTL", 10.0))
+
+# -- Shared by the sync and async backend, so writes through either path update them --
+best_sectors_cache = BestSectorCache(ttl=BEST_SECTORS_CACHE_TTL)
+versions = VersionTracker(ttl=ETAG_TTL)
+
+backend = Backend(
+    host=HOST,
+    port=PORT,
+    user=USER,
+    password=PASSWORD,
+    database=DATABASE,
+    min_size=POOL_MIN_SIZE,
+    max_size=POOL_MAX_SIZE,
+    checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+    health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+    best_sectors_cache=best_sectors_cache,
+    stats_cache=VersionedCache(ttl=STATS_CACHE_TTL),
+    versions=versions,
+    open=False,
+    replica_dsns=REPLICA_DSNS,
+    replica_strategy=REPLICA_STRATEGY,
+    read_your_writes_window=READ_YOUR_WRITES_WINDOW,
+    read_mode=READ_MODE,
+    read_isolation_level=READ_ISOLATION_LEVEL
+)
+# -- No connection at import, an unreachable database only fails the requests that need it --
+if BACKEND_PREWARM:
+    backend.prewarm()
+
+# -- Laps logged before a restart are replayed by the flusher --
+# -- Only one worker process owns the log, the others post synchronously --
+write_behind = None
+if WRITE_BEHIND_LOG:
+    try:
+        write_behind = WriteBehindBuffer(
+            backend,
+            WRITE_BEHIND_LOG,
+            max_pending=WRITE_BEHIND_MAX_PENDING,
+            batch_size=WRITE_BEHIND_BATCH_SIZE,
+            enqueue_timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT
+        )
+        write_behind.start()
+    except LogInUse as e:
+        logging.warning(f"{e}, lap posts of this worker stay synchronous.")
+
+# -- Drivertime notifications for long-poll and stream clients, listens on the primary --
+live_feed = None
+if LIVE_UPDATES:
+    live_feed = LiveFeed(
+        max_events=LIVE_MAX_EVENTS,
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE
+    )
+
+# -- Async backend for the routes under /api/async/..., connects on first use --
+async_backend = AsyncBackend(
+    host=HOST,
+    port=PORT,
+    user=USER,
+    password=PASSWORD,
+    database=DATABASE,
+    min_size=POOL_MIN_SIZE,
+    max_size=POOL_MAX_SIZE,
+    checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+    best_sectors_cache=best_sectors_cache,
+    versions=versions,
+    read_mode=READ_MODE
+)
+app.register_functions(init_async_routes(async_backend))
+
+# -- Streaming exports and live events, served through the HTTP streams extension --
+app.register_functions(init_stream_routes(backend, live_feed))
+
+def not_modified(req: func.HttpRequest, etag: str) -> func.HttpResponse:
+    """Return a 304 response if the client already holds `etag`, None otherwise."""
+    if versions.matches(req.headers.get("If-None-Match"), etag):
+        return func.HttpResponse(status_code=304, headers={"ETag": etag})
+    return None
+
+def etag_headers(etag: str) -> dict:
+    """ETag header for a response, none for a body read from a replica, it may predate the version in the ETag."""
+    if etag is None or read_from_replica():
+        return {}
+    return {"ETag": etag}
+
+def page_response(page: dict, etag: str = None, encoding: str = "json", vary: bool = False) -> func.HttpResponse:
+    """Return a page as a JSON list with the cursor of the next page in the X-Next-Cursor header."""
+    headers = etag_headers(etag)
+    if vary:
+        headers["Vary"] = "Accept"
+    if page["next"] is not None:
+        headers["X-Next-Cursor"] = page["next"]
+    # -- Encoded pages already hold the JSON body as bytes --
+    body = page["items"]
+    if not isinstance(body, bytes):
+        start = time.perf_counter()
+        body = json.dumps(body)
+        metrics.observe_serialization(time.perf_counter() - start)
+    return func.HttpResponse(
+        body,
+        status_code=200,
+        headers=headers,
+        mimetype=MEDIA_TYPES[encoding]
+        )
+
+def parse_driver_id(value: str) -> str:
+    return str(uuid.UUID(value))
+
+def batch_response(req: func.HttpRequest, table: str, parse_id, lookup, id_key: str = "id") -> func.HttpResponse:
+    """Answer an ?ids=a,b,c lookup with one query, items keep the request order, missing ones are marked under `id_key`."""
+    etag = versions.etag((table, None))
+    response = not_modified(req, etag)
+    if response is not None:
+        return response
+
+    values = [value.strip() for value in req.params.get("ids").split(",") if value.strip()]
+    if not values:
+        return func.HttpResponse(
+            "No IDs provided.",
+            status_code=400
+        )
+    if len(values) > MAX_BATCH_IDS:
+        return func.HttpResponse(
+            f"Too many IDs, at most {MAX_BATCH_IDS} per request.",
+            status_code=400
+        )
+
+    ids = []
+    for value in values:
+        try:
+            ids.append(parse_id(value))
+        except ValueError:
+            return func.HttpResponse(
+                f"Invalid ID: {value}",
+                status_code=400
+            )
+
+    # -- Integer ids outside int4 can not exist, in the query their cast would fail the whole batch --
+    out_of_range = {item_id for item_id in ids if isinstance(item_id, int) and not INT4_MIN <= item_id <= INT4_MAX}
+    try:
+        found = iter(lookup([item_id for item_id in ids if item_id not in out_of_range]) if len(out_of_range) < len(ids) else [])
+        items = [{id_key: item_id, "not_found": True} if item_id in out_of_range else next(found) for item_id in ids]
+        return func.HttpResponse(
+            json.dumps(items),
+            status_code=200,
+            headers=etag_headers(etag),
+            mimetype="application/json"
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            f"Could not get {table}.",
+            status_code=400
+        )
+
+# Stats Specific Functions
+
+@app.route(route="metrics", methods=["GET"])
+def metrics_get(req: func.HttpRequest) -> func.HttpResponse:
+    return func.HttpResponse(
+        metrics.render(),
+        status_code=200,
+        mimetype="text/plain; version=0.0.4"
+        )
+
+@app.route(route="pool/stats", methods=["GET"])
+@track_route
+def pool_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        return func.HttpResponse(
+            json.dumps(backend.get_pool_stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get pool stats.",
+            status_code=400
+        )
+
+@app.route(route="cache/stats", methods=["GET"])
+@track_route
+def cache_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        return func.HttpResponse(
+            json.dumps(backend.get_cache_stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get cache stats.",
+            status_code=400
+        )
+
+@app.route(route="versions/stats", methods=["GET"])
+@track_route
+def versions_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        return func.HttpResponse(
+            json.dumps(backend.get_version_stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get version stats.",
+            status_code=400
+        )
+
+@app.route(route="writebehind/stats", methods=["GET"])
+@track_route
+def write_behind_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    if write_behind is None:
+        return func.HttpResponse(
+            "Write-behind is not enabled.",
+            status_code=404
+        )
+    try:
+        return func.HttpResponse(
+            json.dumps(write_behind.stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get write-behind stats.",
+            status_code=400
+        )
+
+@app.route(route="live/stats", methods=["GET"])
+@track_route
+def live_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    if live_feed is None:
+        return func.HttpResponse(
+            "Live updates are not enabled.",
+            status_code=404
+        )
+    try:
+        return func.HttpResponse(
+            json.dumps(live_feed.stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get live stats.",
+            status_code=400
+        )
+
+@app.route(route="statements/stats", methods=["GET"])
+@track_route
+def statements_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        return func.HttpResponse(
+            json.dumps(backend.get_statement_stats()),
+            status_code=200
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get statement stats.",
+            status_code=400
+        )
+
+# Driver Specific Functions
+
+@app.route(route="drivers", methods=["GET"])
+@track_route
+@session_route
+def drivers_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    if req.params.get("ids") is not None:
+        return batch_response(req, "drivers", parse_driver_id, backend.get_drivers_by_ids)
+
+    # -- Answer polls for unchanged data without touching the database --
+    etag = versions.etag(("drivers", None))
+    response = not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try:
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        limit = req.params.get("limit")
+        after = req.params.get("after")
+        if limit:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return func.HttpResponse(
+                    "Invalid limit. Expected integer.",
+                    status_code=400
+                )
+        else:
+            limit = None
+        return page_response(backend.get_drivers(sorted_by=sorted_by, order=order, limit=limit, after=after, encoding="json"), etag)
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all drivers.",
+            status_code=400
+        )
+
+@app.route(route="driver", methods=["GET"])
+@track_route
+@session_route
+def drivers_get_driver(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        driver_id = req.params.get("id")
+        driver = backend.get_driver(driver_id)
+        if not driver_id:
+            return func.HttpResponse(
+                "No Driver ID provided.",
+                status_code=400
+            )
+
+
+        return func.HttpResponse(
+            json.dumps(driver),
+            status_code=200
+            )
+    
+    except DriverNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get driver.",
+            status_code=400
+        )
+
+@app.route(route="driver", methods=["POST"])
+@track_route
+@session_route
+def drivers_post_driver(req: func.HttpRequest) -> func.HttpResponse:
+    name = req.params.get("name")
+    email = req.params.get("email")
+    driver_id = req.params.get("id")
+    logging.info(f"Name: {name}, Email: {email}")
+    if not name:
+        return func.HttpResponse(
+            f"No Valid Name Given.",
+            status_code=400
+            )
+    if driver_id:
+        try: 
+            if not driver_id == str(uuid.UUID(driver_id)):
+                return func.HttpResponse(
+                    f"Invalid UUID: {driver_id}",
+                    status_code=400
+                    )
+        except ValueError:
+            return func.HttpResponse(
+                f"Invalid UUID: {driver_id}",
+                status_code=400
+                )
+    try:
+        result = backend.post_driver(name, driver_id, email)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=201
+            )
+    
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            f"Driver with name: {name} could not be created.",
+            status_code=400
+            )
+
+
+@app.route(route="driver", methods=["PUT"])
+@track_route
+@session_route
+def drivers_update_driver(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        driver_id = req.params.get("id")
+        new_name = req.params.get("name")
+        new_email = req.params.get("email")
+        values = {}
+        if new_name:
+            values["name"] = new_name
+        if new_email:
+            values["email"] = new_email
+        result = backend.put_driver(driver_id=driver_id, values=values)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200
+            )
+    
+    except DriverNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+
+    except ValueError as e:
+        return func.HttpResponse(
+            f"Invalid data: {e.args}",
+            status_code=400
+        )
+    
+    except psycopg2.errors.CheckViolation as e:
+        return func.HttpResponse(
+            f"Invalid data: {e.args}",
+            status_code=400
+        )
+    
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not update driver.",
+            status_code=400
+        )
+
+
+@app.route(route="driver", methods=["DELETE"])
+@track_route
+@session_route
+def drivers_delete_driver(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        driver_id = req.params.get("id")
+        if not driver_id:
+            return func.HttpResponse(
+                "No Driver ID provided.",
+                status_code=400
+            )
+        result = backend.delete_driver(driver_id)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200
+            )
+    except DriverNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not delete driver.",
+            status_code=400
+        )
+
+# Convention Specific Functions
+
+@app.route(route="conventions", methods=["GET"])
+@track_route
+@session_route
+def conventions_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    if req.params.get("ids") is not None:
+        return batch_response(req, "conventions", int, backend.get_conventions_by_ids)
+
+    etag = versions.etag(("conventions", None))
+    response = not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try: 
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        limit = req.params.get("limit")
+        after = req.params.get("after")
+        if limit:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return func.HttpResponse(
+                    "Invalid limit. Expected integer.",
+                    status_code=400
+                )
+        else:
+            limit = None
+        return page_response(backend.get_conventions(sorted_by=sorted_by, order=order, limit=limit, after=after, encoding="json"), etag)
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all conventions.",
+            status_code=400
+        )
+
+@app.route(route="convention", methods=["GET"])
+@track_route
+@session_route
+def conventions_get_convention(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        conv_id = req.params.get("id")
+        if not conv_id:
+            return func.HttpResponse(
+                "No Convention ID provided.",
+                status_code=400
+            )
+        convention = backend.get_convention(conv_id)
+        return func.HttpResponse(
+            json.dumps(convention),
+            status_code=200
+            )
+    
+    except ConventionNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get convention.",
+            status_code=400
+        )
+    
+
+@app.route(route="convention", methods=["POST"])
+@track_route
+@session_route
+def conventions_create_convention(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        name = req.params.get("name")
+        location = req.params.get("location")
+        date = req.params.get("date")
+        if date:
+            try: 
+                date = datetime.strptime(date, "%Y-%m-%d").date()
+            except ValueError:
+                return func.HttpResponse(
+                    f"Invalid date format. Expected format: YYYY-MM-DD",
+                    status_code=400
+                    )
+        if not name:
+            return func.HttpResponse(
+                f"No Valid Name Given.",
+                status_code=400
+                )
+        try:
+            result = backend.post_convention(name, location, date)
+            return func.HttpResponse(
+                json.dumps(result),
+                status_code=201
+                )
+        
+        except:
+            return func.HttpResponse(
+                f"Convention with name: {name} could not be created.",
+                status_code=400
+                )
+    
+    except ValueError:
+        logging.info("No JSON data found.")
+    
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not create convention.",
+            status_code=400
+        )
+
+@app.route(route="convention", methods=["PUT"])
+@track_route
+@session_route
+def conventions_update_convention(req: func.HttpRequest) -> func.HttpResponse:
+    try: 
+        convention_id = req.params.get("id")
+        new_name = req.params.get("name")
+        new_location = req.params.get("location")
+        date = req.params.get("date")
+        values = {}
+        if new_name:
+            values["name"] = new_name
+        if new_location:
+            values["location"] = new_location
+        if date:
+            try:
+                date = datetime.strptime(date, "%Y-%m-%d").date()
+                values["date"] = date
+            except ValueError:
+                return func.HttpResponse(
+                    f"Invalid date format. Expected format: YYYY-MM-DD",
+                    status_code=400
+                    )
+        result = backend.update_convention(convention_id=convention_id, values=values)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200
+        )
+    
+    except ConventionNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not update convention.",
+            status_code=400
+        )
+
+
+@app.route(route="convention", methods=["DELETE"])
+@track_route
+@session_route
+def conventions_delete_convention(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        convention_id = req.params.get("id")
+        if not convention_id:
+            return func.HttpResponse(
+                "No Convention ID provided.",
+                status_code=400
+            )
+        result = backend.delete_convention(convention_id)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200
+            )
+    except ConventionNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not delete convention.",
+            status_code=400
+        )
+
+
+# Drivertimes Specific Functions
+
+@app.route(route="drivertimes", methods=["GET"])
+@track_route
+@session_route
+def drivertimes_get_all(req: func.HttpRequest) -> func.HttpResponse:
+    if req.params.get("ids") is not None:
+        return batch_response(req, "drivertimes", int, backend.get_drivertimes_by_ids, id_key="drivertime_id")
+
+    try:
+        sorted_by = req.params.get("sorted_by")
+        order = req.params.get("order")
+        limit = req.params.get("limit")
+        driver = req.params.get("driver_id")
+        convention = req.params.get("convention_id")
+        after = req.params.get("after")
+        encoding = negotiate(req.params.get("format"), req.headers.get("Accept"))
+        expand = parse_expand(req.params.get("expand"))
+
+        # -- Expanded pages also show driver and convention names --
+        etag = versions.etag(("drivertimes", convention), *[(f"{name}s", None) for name in expand], variant=encoding)
+        response = not_modified(req, etag)
+        if response is not None:
+            return response
+
+        if limit:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return func.HttpResponse(
+                    "Invalid limit. Expected integer.",
+                    status_code=400
+                )
+        else:
+            limit = None
+        return page_response(backend.get_drivertimes(sorted_by=sorted_by, order=order, limit=limit, driver_id=driver, convention_id=convention, after=after, encoding=encoding, expand=expand), etag, encoding, vary=True)
+
+    except UnsupportedEncoding as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=406
+        )
+
+    except (InvalidCursor, ValueError) as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get all drivertimes.",
+            status_code=400
+        )
+
+@app.route(route="drivertimes/bestsectors", methods=["GET"])
+@track_route
+@session_route
+def drivertimes_get_best_sectors(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        driver = req.params.get("driver_id")
+        convention = req.params.get("convention_id")
+
+        etag = versions.etag(("drivertimes", convention))
+        response = not_modified(req, etag)
+        if response is not None:
+            return response
+
+        result = json.dumps(backend.get_drivertimes_best_sectors(driver_id=driver, convention_id=convention))
+
+        return func.HttpResponse(
+            result,
+            status_code=200,
+            headers=etag_headers(etag)
+            )
+    
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get best sectors.",
+            status_code=400
+        )
+
+@app.route(route="drivertimes/stats", methods=["GET"])
+@track_route
+@session_route
+def drivertimes_get_stats(req: func.HttpRequest) -> func.HttpResponse:
+    driver = req.params.get("driver_id")
+    convention = req.params.get("convention_id")
+    if not driver and not convention:
+        return func.HttpResponse(
+            "No Driver ID or Convention ID provided.",
+            status_code=400
+        )
+
+    try:
+        buckets = int(req.params.get("buckets", 10))
+        if not 1 <= buckets <= MAX_STATS_BUCKETS:
+            raise ValueError(buckets)
+    except ValueError:
+        return func.HttpResponse(
+            f"Invalid buckets, expected an integer from 1 to {MAX_STATS_BUCKETS}.",
+            status_code=400
+        )
+
+    etag = versions.etag(("drivertimes", convention), variant=f"b{buckets}")
+    response = not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try:
+        result = json.dumps(backend.get_drivertime_stats(driver_id=driver, convention_id=convention, buckets=buckets))
+
+        return func.HttpResponse(
+            result,
+            status_code=200,
+            headers=etag_headers(etag)
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get drivertime stats.",
+            status_code=400
+        )
+
+@app.route(route="drivertimes/leaderboard", methods=["GET"])
+@track_route
+@session_route
+def drivertimes_get_leaderboard(req: func.HttpRequest) -> func.HttpResponse:
+    convention = req.params.get("convention_id")
+    if not convention:
+        return func.HttpResponse(
+            "No Convention ID provided.",
+            status_code=400
+        )
+
+    # -- The leaderboard also shows driver names --
+    etag = versions.etag(("drivertimes", convention), ("drivers", None))
+    response = not_modified(req, etag)
+    if response is not None:
+        return response
+
+    try:
+        result = json.dumps(backend.get_leaderboard(convention_id=convention))
+
+        return func.HttpResponse(
+            result,
+            status_code=200,
+            headers=etag_headers(etag)
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get leaderboard.",
+            status_code=400
+        )
+
+@app.route(route="drivertimes/live", methods=["GET"])
+@track_route
+async def drivertimes_get_live(req: func.HttpRequest) -> func.HttpResponse:
+    if live_feed is None:
+        return func.HttpResponse(
+            "Live updates are not enabled.",
+            status_code=404
+        )
+
+    try:
+        convention = int(req.params.get("convention_id"))
+    except (TypeError, ValueError):
+        return func.HttpResponse(
+            "Invalid or missing Convention ID. Expected integer.",
+            status_code=400
+        )
+
+    try:
+        timeout = float(req.params.get("timeout", LIVE_MAX_WAIT))
+        if not 0 <= timeout <= LIVE_MAX_WAIT:
+            raise ValueError(timeout)
+    except ValueError:
+        return func.HttpResponse(
+            f"Invalid timeout, expected seconds from 0 to {LIVE_MAX_WAIT}.",
+            status_code=400
+        )
+
+    try:
+        # -- Waits on the event loop, no worker thread is held while no lap arrives --
+        result = await live_feed.wait(convention, cursor=req.params.get("cursor"), timeout=timeout)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200,
+            headers={"X-Next-Cursor": result["cursor"], "Cache-Control": "no-store"}
+            )
+
+    except InvalidLiveCursor as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=400
+        )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get live drivertimes.",
+            status_code=400
+        )
+
+@app.route(route="drivertime", methods=["GET"])
+@track_route
+@session_route
+def drivertimes_get_drivertime(req: func.HttpRequest) -> func.HttpResponse:
+    time_id = req.params.get("id")
+    if not time_id:
+        return func.HttpResponse(
+            "No Drivertime ID provided.",
+            status_code=400
+        )
+    try:
+        drivertime = backend.get_drivertime(time_id)
+        return func.HttpResponse(
+            json.dumps(drivertime),
+            status_code=200
+            )
+    except DriverTimeNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not get drivertime.",
+            status_code=400
+        )
+
+
+@app.route(route="drivertime", methods=["POST"])
+@track_route
+@session_route
+def drivertimes_create_drivertime(req: func.HttpRequest) -> func.HttpResponse:
+    sector1 = req.params.get("sector1")
+    sector2 = req.params.get("sector2")
+    sector3 = req.params.get("sector3")
+    laptime = req.params.get("laptime")
+    driver_id = req.params.get("driver_id")
+    convention_id = req.params.get("convention_id")
+    placement = req.params.get("placement", "false").lower() in ("1", "true", "yes")
+    if not sector1 and not sector2 and not sector3 and not laptime:
+        return func.HttpResponse(
+            f"No Valid Data Given.",
+            status_code=400
+            )
+    if not driver_id:
+        logging.info("No driver_id given. using Dummy Driver.")
+        driver_id = "4823662a-29c5-47d7-bdba-68baa2825990"
+    if not convention_id:
+        logging.info("No convention_id given. using Dummy Convention.")
+        convention_id = 1
+    # -- Placement needs the committed lap, so those posts always go to the database --
+    if write_behind is not None and not placement:
+        try:
+            seq = write_behind.append({
+                "sector1": sector1,
+                "sector2": sector2,
+                "sector3": sector3,
+                "laptime": laptime,
+                "driver_id": driver_id,
+                "convention_id": convention_id
+            })
+            return func.HttpResponse(
+                json.dumps({"queued": True, "seq": seq}),
+                status_code=202
+                )
+
+        except BufferFull as e:
+            return func.HttpResponse(
+                f"{e}",
+                status_code=503,
+                headers={"Retry-After": "1"}
+                )
+        except (ValueError, TypeError) as e:
+            return func.HttpResponse(
+                f"Invalid drivertime: {e}",
+                status_code=400
+                )
+    try:
+        result = backend.post_drivertime(driver_id, convention_id, sector1, sector2, sector3, laptime, placement=placement)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=201
+            )
+    
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            f"Drivertime with driver_id: {driver_id} and convention_id: {convention_id} could not be created.",
+            status_code=400
+            )
+
+def parse_bulk_body(body: bytes) -> list:
+    """Parse a JSON array or NDJSON (one JSON object per line) request body."""
+    text = body.decode("utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+@app.route(route="drivertimes/bulk", methods=["POST"])
+@track_route
+@session_route
+def drivertimes_create_drivertimes(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        rows = parse_bulk_body(req.get_body())
+    except ValueError as e:
+        return func.HttpResponse(
+            f"Invalid JSON or NDJSON body: {e}",
+            status_code=400
+        )
+    if not rows:
+        return func.HttpResponse(
+            "No Valid Data Given.",
+            status_code=400
+        )
+    if len(rows) > MAX_BULK_ROWS:
+        return func.HttpResponse(
+            f"Too many drivertimes, at most {MAX_BULK_ROWS} per request.",
+            status_code=413
+        )
+    try:
+        result = backend.post_drivertimes(rows)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=201 if result["inserted"] else 400
+            )
+
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Drivertimes could not be created.",
+            status_code=400
+            )
+
+@app.route(route="drivertime", methods=["DELETE"])
+@track_route
+@session_route
+def drivertimes_delete_drivertime(req: func.HttpRequest) -> func.HttpResponse:
+    drivertime_id = req.params.get("id")
+    if not drivertime_id:
+        return func.HttpResponse(
+            "No Drivertime ID provided.",
+            status_code=400
+        )
+    try:
+        result = backend.delete_drivertime(drivertime_id)
+        return func.HttpResponse(
+            json.dumps(result),
+            status_code=200
+            )
+    except DriverTimeNotFound as e:
+        return func.HttpResponse(
+            f"{e}",
+            status_code=404
+        )
+    except Exception as e:
+        logging.exception(e)
+        return func.HttpResponse(
+            "Could not delete drivertime.",
+            status_code=400
+        )
+    
+
@@ -0,0 +1,105 @@
+import azure.functions as func
+import asyncio
+import json
+import logging
+
+from api_backend.api_backend import Backend
+from api_backend.live import InvalidLiveCursor, LiveFeed
+
+# Streaming responses need the HTTP streams extension, the app setting PYTHON_ENABLE_INIT_INDEXING=1 turns it on.
+from azurefunctions.extensions.http.fastapi import Request, StreamingResponse, PlainTextResponse
+
+backend: Backend = None
+live_feed: LiveFeed = None
+
+# -- Seconds between keep-alive comments, and until a live stream ends and the client reconnects --
+LIVE_HEARTBEAT = 15.0
+LIVE_STREAM_DURATION = 200.0
+
+
+def init_stream_routes(sync_backend: Backend, feed: LiveFeed = None):
+    global backend, live_feed
+    backend = sync_backend
+    live_feed = feed
+    return bp
+
+
+async def live_events(convention_id: int, cursor: str):
+    """Server-Sent Events of a convention, ends before the platform timeout, EventSource reconnects with Last-Event-ID."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LIVE_STREAM_DURATION
+    yield "retry: 1000\n\n"
+    while loop.time() < deadline:
+        result = await live_feed.wait(convention_id, cursor=cursor, timeout=min(LIVE_HEARTBEAT, max(deadline - loop.time(), 0)))
+        cursor = result["cursor"]
+        if result["reset"]:
+            yield f"id: {cursor}\nevent: reset\ndata: {{}}\n\n"
+        for event in result["events"]:
+            yield f"id: {event['cursor']}\nevent: {event['op']}\ndata: {json.dumps(event)}\n\n"
+        if not result["reset"] and not result["events"]:
+            yield ": keep-alive\n\n"
+
+
+bp = func.Blueprint()
+
+@bp.route(route="drivers/stream", methods=["GET"])
+async def drivers_stream_all(req: Request) -> StreamingResponse:
+    try:
+        # -- The first chunk runs the query, keep it off the event loop --
+        stream = await asyncio.to_thread(
+            backend.stream_drivers,
+            sorted_by=req.query_params.get("sorted_by"),
+            order=req.query_params.get("order")
+        )
+        return StreamingResponse(stream, media_type="application/json")
+
+    except ValueError as e:
+        return PlainTextResponse(f"{e}", status_code=400)
+
+    except Exception as e:
+        logging.exception(e)
+        return PlainTextResponse("Could not stream drivers.", status_code=400)
+
+@bp.route(route="drivertimes/stream", methods=["GET"])
+async def drivertimes_stream_all(req: Request) -> StreamingResponse:
+    try:
+        stream = await asyncio.to_thread(
+            backend.stream_drivertimes,
+            sorted_by=req.query_params.get("sorted_by"),
+            order=req.query_params.get("order"),
+            driver_id=req.query_params.get("driver_id"),
+            convention_id=req.query_params.get("convention_id")
+        )
+        return StreamingResponse(stream, media_type="application/json")
+
+    except ValueError as e:
+        return PlainTextResponse(f"{e}", status_code=400)
+
+    except Exception as e:
+        logging.exception(e)
+        return PlainTextResponse("Could not stream drivertimes.", status_code=400)
+
+@bp.route(route="drivertimes/live/stream", methods=["GET"])
+async def drivertimes_stream_live(req: Request) -> StreamingResponse:
+    if live_feed is None:
+        return PlainTextResponse("Live updates are not enabled.", status_code=404)
+
+    try:
+        convention_id = int(req.query_params.get("convention_id"))
+    except (TypeError, ValueError):
+        return PlainTextResponse("Invalid or missing Convention ID. Expected integer.", status_code=400)
+
+    cursor = req.headers.get("Last-Event-ID") or req.query_params.get("cursor")
+    try:
+        # -- Malformed cursors fail before the stream starts, without one the stream starts now --
+        current = await live_feed.wait(convention_id, cursor=cursor, timeout=0)
+    except InvalidLiveCursor as e:
+        return PlainTextResponse(f"{e}", status_code=400)
+    if cursor is None:
+        cursor = current["cursor"]
+
+    return StreamingResponse(
+        live_events(convention_id, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,65 @@
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+# Manual benchmark against a running Function host (func host start), not part of the test suite.
+# Compares the sync routes with their async counterparts under /api/async/...
+
+BASE_URL = "http://localhost:7071/api"
+
+ROUTES = [
+    "drivers",
+    "conventions",
+    "drivertimes?limit=100",
+    "drivertimes/bestsectors",
+]
+
+
+def timed_get(url: str) -> float:
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(url: str, requests: int, concurrency: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        latencies = sorted(executor.map(timed_get, [url] * requests))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Side-by-side benchmark of sync and async routes.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = {}
+    for route in ROUTES:
+        report[route] = {
+            "sync": run(f"{args.base_url}/{route}", args.requests, args.concurrency),
+            "async": run(f"{args.base_url}/async/{route}", args.requests, args.concurrency),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'route':<28}{'mode':<7}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for route, modes in report.items():
+        for mode, result in modes.items():
+            print(f"{route:<28}{mode:<7}{result['requests_per_second']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
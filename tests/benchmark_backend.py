@@ -0,0 +1,432 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+# Benchmark suite against a throwaway Postgres started with pytest-postgresql, not part of the test suite.
+# Seeds synthetic data at growing sizes and times every Backend method and route handler in process.
+# Needs a local PostgreSQL installation, point --pg-ctl at its pg_ctl if it is not on the PATH.
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+import psycopg2.extras
+
+from api_backend.migration_manager.migrate import apply_migrations
+from api_backend.resource_manager.sql_queries import read_query
+
+DATABASE = "benchmark"
+COPY_CHUNK_ROWS = 200_000
+
+REBUILD_LEADERBOARD_QUERY = """
+    INSERT INTO leaderboard (convention, driver, best_sector1, best_sector2, best_sector3, best_laptime, laps)
+    SELECT convention, driver, MIN(sector1), MIN(sector2), MIN(sector3), MIN(laptime), COUNT(*)
+    FROM drivertimes
+    WHERE convention IS NOT NULL AND driver IS NOT NULL
+    GROUP BY convention, driver
+    """
+
+
+# Database Setup
+
+def start_postgres(args) -> tuple:
+    """Start a throwaway server and create an empty database, returns (executor, janitor, settings)."""
+    from pytest_postgresql.executor import PostgreSQLExecutor
+    from pytest_postgresql.janitor import DatabaseJanitor
+
+    datadir = tempfile.mkdtemp(prefix="benchmark_postgres_")
+    executor = PostgreSQLExecutor(
+        executable=args.pg_ctl,
+        host="127.0.0.1",
+        port=args.port,
+        datadir=datadir,
+        unixsocketdir=datadir,
+        logfile=os.path.join(datadir, "postgresql.log"),
+        startparams="-w",
+        dbname="postgres",
+    )
+    executor.start()
+
+    janitor = DatabaseJanitor(
+        user=executor.user,
+        host=executor.host,
+        port=executor.port,
+        dbname=DATABASE,
+        version=executor.version,
+        password=executor.password,
+    )
+    janitor.init()
+
+    settings = {
+        "host": executor.host,
+        "port": str(executor.port),
+        "user": executor.user,
+        "password": executor.password or "",
+        "database": DATABASE,
+    }
+    return executor, janitor, settings
+
+
+def create_schema(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(read_query("setup_database.sql"))
+    connection.commit()
+    apply_migrations(connection)
+    connection.autocommit = False
+
+
+def seed_drivers(connection, count: int, rng: random.Random) -> list:
+    driver_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)]
+    with connection.cursor() as cursor:
+        psycopg2.extras.execute_values(
+            cursor,
+            "INSERT INTO drivers (id, name, email) VALUES %s",
+            [(driver_id, f"Driver {index}", f"driver{index}@email.test") for index, driver_id in enumerate(driver_ids)],
+            page_size=1000
+        )
+    connection.commit()
+    return driver_ids
+
+
+def seed_conventions(connection, count: int) -> list:
+    start = date(2023, 1, 1)
+    with connection.cursor() as cursor:
+        rows = psycopg2.extras.execute_values(
+            cursor,
+            "INSERT INTO conventions (name, location, date) VALUES %s RETURNING id",
+            [(f"Convention {index}", f"Location {index % 7}", start + timedelta(days=index * 14)) for index in range(count)],
+            fetch=True
+        )
+    connection.commit()
+    return [row[0] for row in rows]
+
+
+def seed_drivertimes(connection, count: int, driver_ids: list, convention_ids: list, rng: random.Random) -> None:
+    """Append `count` drivertimes with COPY and rebuild the leaderboard from them."""
+    with connection.cursor() as cursor:
+        remaining = count
+        while remaining > 0:
+            rows = min(remaining, COPY_CHUNK_ROWS)
+            buffer = io.StringIO()
+            for _ in range(rows):
+                sector1 = rng.uniform(20000, 40000)
+                sector2 = rng.uniform(20000, 40000)
+                sector3 = rng.uniform(20000, 40000)
+                buffer.write(f"{sector1}\t{sector2}\t{sector3}\t{sector1 + sector2 + sector3}\t{rng.choice(driver_ids)}\t{rng.choice(convention_ids)}\n")
+            buffer.seek(0)
+            cursor.copy_expert("COPY drivertimes (sector1, sector2, sector3, laptime, driver, convention) FROM STDIN", buffer)
+            remaining -= rows
+
+        cursor.execute("TRUNCATE leaderboard")
+        cursor.execute(REBUILD_LEADERBOARD_QUERY)
+    connection.commit()
+
+    # -- Fresh statistics, so the planner sees the new size --
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    connection.autocommit = False
+
+
+def sample_drivertime_ids(connection, count: int, rng: random.Random) -> list:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(id) FROM drivertimes")
+        max_id = cursor.fetchone()[0]
+    return [rng.randint(1, max_id) for _ in range(count)]
+
+
+# Cases
+
+def backend_cases(backend, data: dict) -> list:
+    """(name, function) pairs, every function is one call of a Backend method."""
+    rng = data["rng"]
+    driver_ids = data["driver_ids"]
+    convention_ids = data["convention_ids"]
+    drivertime_ids = data["drivertime_ids"]
+    posted_drivertimes = []
+    posted_drivers = []
+    posted_conventions = []
+
+    def lap():
+        sectors = [rng.uniform(20000, 40000) for _ in range(3)]
+        return (*sectors, sum(sectors))
+
+    def best_sectors(driver_id, convention_id):
+        backend.best_sectors_cache.invalidate()
+        return backend.get_drivertimes_best_sectors(driver_id, convention_id)
+
+    def drivertime_stats(driver_id, convention_id):
+        backend.stats_cache.invalidate()
+        return backend.get_drivertime_stats(driver_id, convention_id)
+
+    def consume(stream):
+        for _ in stream:
+            pass
+
+    def post_drivertime():
+        result = backend.post_drivertime(rng.choice(driver_ids), rng.choice(convention_ids), *lap())
+        posted_drivertimes.append(result["drivertime_id"])
+
+    def post_drivertime_placement():
+        result = backend.post_drivertime(rng.choice(driver_ids), rng.choice(convention_ids), *lap(), placement=True)
+        posted_drivertimes.append(result["drivertime_id"])
+
+    def post_drivertimes():
+        rows = [
+            dict(zip(("sector1", "sector2", "sector3", "laptime"), lap()), driver_id=rng.choice(driver_ids), convention_id=rng.choice(convention_ids))
+            for _ in range(1000)
+        ]
+        posted_drivertimes.extend(backend.post_drivertimes(rows)["ids"])
+
+    def post_driver():
+        posted_drivers.append(backend.post_driver(f"Benchmark {uuid.uuid4().hex[:8]}")["id"])
+
+    def post_convention():
+        posted_conventions.append(backend.post_convention("Benchmark", "Benchmark", date.today())["id"])
+
+    return [
+        ("get_drivers", lambda: backend.get_drivers(limit=100)),
+        ("get_drivers_encoded", lambda: backend.get_drivers(limit=100, encoding="json")),
+        ("get_driver", lambda: backend.get_driver(rng.choice(driver_ids))),
+        ("get_drivertimes", lambda: backend.get_drivertimes(limit=1000)),
+        ("get_drivertimes_by_convention", lambda: backend.get_drivertimes(limit=1000, convention_id=rng.choice(convention_ids), encoding="json")),
+        ("get_drivertimes_by_driver", lambda: backend.get_drivertimes(limit=1000, driver_id=rng.choice(driver_ids), encoding="json")),
+        ("get_drivertimes_by_laptime", lambda: backend.get_drivertimes(sorted_by="laptime", limit=100, encoding="json")),
+        ("get_drivertimes_columnar", lambda: backend.get_drivertimes(limit=1000, convention_id=rng.choice(convention_ids), encoding="columnar")),
+        ("stream_drivertimes_by_driver", lambda: consume(backend.stream_drivertimes(driver_id=rng.choice(driver_ids)))),
+        ("get_drivertimes_best_sectors", lambda: best_sectors(None, None)),
+        ("get_drivertimes_best_sectors_by_convention", lambda: best_sectors(None, rng.choice(convention_ids))),
+        ("get_drivertimes_best_sectors_by_driver", lambda: best_sectors(rng.choice(driver_ids), None)),
+        ("get_drivertimes_best_sectors_cached", lambda: backend.get_drivertimes_best_sectors(None, convention_ids[0])),
+        ("get_drivertime_stats_by_convention", lambda: drivertime_stats(None, rng.choice(convention_ids))),
+        ("get_drivertime_stats_by_driver", lambda: drivertime_stats(rng.choice(driver_ids), None)),
+        ("get_drivertime_stats_cached", lambda: backend.get_drivertime_stats(None, convention_ids[0])),
+        ("get_leaderboard", lambda: backend.get_leaderboard(rng.choice(convention_ids))),
+        ("get_drivertime", lambda: backend.get_drivertime(rng.choice(drivertime_ids))),
+        ("post_drivertime", post_drivertime),
+        ("post_drivertime_placement", post_drivertime_placement),
+        ("post_drivertimes_1000", post_drivertimes),
+        ("delete_drivertime", lambda: backend.delete_drivertime(posted_drivertimes.pop())),
+        ("get_conventions", lambda: backend.get_conventions(limit=100)),
+        ("get_convention", lambda: backend.get_convention(rng.choice(convention_ids))),
+        ("post_driver", post_driver),
+        ("put_driver", lambda: backend.put_driver(posted_drivers[-1], {"name": f"Benchmark {uuid.uuid4().hex[:8]}"})),
+        ("delete_driver", lambda: backend.delete_driver(posted_drivers.pop())),
+        ("post_convention", post_convention),
+        ("update_convention", lambda: backend.update_convention(posted_conventions[-1], {"name": "Benchmark Updated"})),
+        ("delete_convention", lambda: backend.delete_convention(posted_conventions.pop())),
+    ]
+
+
+def route_cases(handlers: dict, data: dict) -> list:
+    """(name, function) pairs, every function calls one route handler with a func.HttpRequest."""
+    import azure.functions as func
+
+    rng = data["rng"]
+    driver_ids = data["driver_ids"]
+    convention_ids = data["convention_ids"]
+    drivertime_ids = data["drivertime_ids"]
+
+    def call(name: str, method: str, route: str, params: dict = None, headers: dict = None, body: bytes = b""):
+        request = func.HttpRequest(method=method, url=f"/api/{route}", headers=headers or {}, params=params or {}, body=body)
+        response = handlers[name](request)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} answered {response.status_code}: {response.get_body()[:200]!r}")
+        return response
+
+    def lap() -> dict:
+        sectors = [rng.uniform(20000, 40000) for _ in range(3)]
+        return {
+            "sector1": str(sectors[0]), "sector2": str(sectors[1]), "sector3": str(sectors[2]), "laptime": str(sum(sectors)),
+            "driver_id": rng.choice(driver_ids), "convention_id": str(rng.choice(convention_ids)),
+        }
+
+    return [
+        ("drivers_get_all", lambda: call("drivers_get_all", "GET", "drivers", {"limit": "100"})),
+        ("drivers_get_driver", lambda: call("drivers_get_driver", "GET", "driver", {"id": rng.choice(driver_ids)})),
+        ("drivertimes_get_all", lambda: call("drivertimes_get_all", "GET", "drivertimes", {"limit": "1000", "convention_id": str(rng.choice(convention_ids))})),
+        ("drivertimes_get_all_msgpack", lambda: call("drivertimes_get_all", "GET", "drivertimes", {"limit": "1000", "convention_id": str(rng.choice(convention_ids))}, {"Accept": "application/msgpack"})),
+        ("drivertimes_get_best_sectors", lambda: call("drivertimes_get_best_sectors", "GET", "drivertimes/bestsectors", {"convention_id": str(rng.choice(convention_ids))})),
+        ("drivertimes_get_leaderboard", lambda: call("drivertimes_get_leaderboard", "GET", "drivertimes/leaderboard", {"convention_id": str(rng.choice(convention_ids))})),
+        ("drivertimes_get_drivertime", lambda: call("drivertimes_get_drivertime", "GET", "drivertime", {"id": str(rng.choice(drivertime_ids))})),
+        ("drivertimes_create_drivertime", lambda: call("drivertimes_create_drivertime", "POST", "drivertime", lap())),
+        ("drivertimes_create_drivertimes_1000", lambda: call("drivertimes_create_drivertimes", "POST", "drivertimes/bulk", body=json.dumps([lap() for _ in range(1000)]).encode())),
+        ("conventions_get_all", lambda: call("conventions_get_all", "GET", "conventions", {"limit": "100"})),
+        ("conventions_get_convention", lambda: call("conventions_get_convention", "GET", "convention", {"id": str(rng.choice(convention_ids))})),
+        ("drivers_post_driver", lambda: call("drivers_post_driver", "POST", "driver", {"name": f"Benchmark {uuid.uuid4().hex[:8]}"})),
+    ]
+
+
+def load_handlers(settings: dict) -> tuple:
+    """Import the Function app against the benchmark database, returns (backend, handlers by function name)."""
+    os.environ.update({
+        "HOST": settings["host"],
+        "PORT": settings["port"],
+        "USER": settings["user"],
+        "PASSWORD": settings["password"],
+        "DATABASE": settings["database"],
+    })
+    import function_app
+
+    handlers = {function.get_function_name(): function.get_user_function() for function in function_app.app.get_functions()}
+    return function_app.backend, handlers
+
+
+# Measurement
+
+def measure(function, repeat: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        try:
+            function()
+        except Exception:
+            pass
+
+    timings = []
+    errors = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            function()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+
+    result = {"runs": len(timings), "errors": len(errors)}
+    if errors:
+        result["first_error"] = errors[0][:300]
+    if timings:
+        timings.sort()
+        result.update({
+            "min_ms": round(timings[0], 3),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(timings[-1], 3),
+        })
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose p50 got slower than the baseline by more than `threshold`."""
+    previous = {(result["size"], result["kind"], result["name"]): result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get((result["size"], result["kind"], result["name"]))
+        if old is None or "p50_ms" not in old or "p50_ms" not in result:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append({**result, "baseline_p50_ms": old["p50_ms"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of every Backend method and route handler on a throwaway Postgres.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated drivertime counts, seeded in ascending order.")
+    parser.add_argument("--drivers", type=int, default=1000)
+    parser.add_argument("--conventions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pg-ctl", default="pg_ctl", help="Path to pg_ctl of the PostgreSQL installation.")
+    parser.add_argument("--port", type=int, default=55432)
+    parser.add_argument("--skip-routes", action="store_true", help="Only measure the Backend methods.")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report.")
+    parser.add_argument("--baseline", help="Earlier report to compare against, exits with 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown against the baseline.")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    rng = random.Random(args.seed)
+
+    executor, janitor, settings = start_postgres(args)
+    try:
+        connection = psycopg2.connect(
+            host=settings["host"], port=settings["port"], user=settings["user"],
+            password=settings["password"], database=settings["database"]
+        )
+        create_schema(connection)
+        driver_ids = seed_drivers(connection, args.drivers, rng)
+        convention_ids = seed_conventions(connection, args.conventions)
+
+        backend, handlers = load_handlers(settings)
+
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "postgres": str(executor.version),
+                "platform": platform.platform(),
+                "drivers": args.drivers,
+                "conventions": args.conventions,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+            "results": [],
+        }
+
+        seeded = 0
+        for size in sizes:
+            start = time.perf_counter()
+            seed_drivertimes(connection, size - seeded, driver_ids, convention_ids, rng)
+            seeded = size
+            print(f"Seeded {size} drivertimes in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+            data = {
+                "rng": rng,
+                "driver_ids": driver_ids,
+                "convention_ids": convention_ids,
+                "drivertime_ids": sample_drivertime_ids(connection, 1000, rng),
+            }
+            cases = [("backend", name, function) for name, function in backend_cases(backend, data)]
+            if not args.skip_routes:
+                cases += [("route", name, function) for name, function in route_cases(handlers, data)]
+
+            for kind, name, function in cases:
+                result = {"size": size, "kind": kind, "name": name, **measure(function, args.repeat, args.warmup)}
+                report["results"].append(result)
+                print(f"{size:>10} {kind:<8}{name:<46}{result.get('p50_ms', float('nan')):>10.2f} ms p50{result['errors']:>4} errors", file=sys.stderr)
+
+        backend.close()
+        connection.close()
+
+    finally:
+        janitor.drop()
+        executor.stop()
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression['size']} {regression['kind']} {regression['name']} {regression['baseline_p50_ms']} -> {regression['p50_ms']} ms ({regression['ratio']}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import random
+import time
+import urllib.request
+# Manual benchmark against a running Function host (func host start), not part of the test suite.
+# Measures laps/s of the bulk drivertime endpoint.
+
+BASE_URL = "http://localhost:7071/api"
+
+
+def make_laps(count: int) -> list:
+    laps = []
+    for _ in range(count):
+        sectors = [round(random.uniform(20000, 40000), 3) for _ in range(3)]
+        laps.append({
+            "sector1": sectors[0],
+            "sector2": sectors[1],
+            "sector3": sectors[2],
+            "laptime": round(sum(sectors), 3),
+        })
+    return laps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the bulk drivertime endpoint.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--laps", type=int, default=20000)
+    parser.add_argument("--ndjson", action="store_true", help="Send NDJSON instead of a JSON array.")
+    args = parser.parse_args()
+
+    laps = make_laps(args.laps)
+    if args.ndjson:
+        body = "\n".join(json.dumps(lap) for lap in laps).encode()
+        content_type = "application/x-ndjson"
+    else:
+        body = json.dumps(laps).encode()
+        content_type = "application/json"
+
+    request = urllib.request.Request(f"{args.base_url}/drivertimes/bulk", data=body, headers={"Content-Type": content_type}, method="POST")
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        result = json.loads(response.read())
+    elapsed = time.perf_counter() - start
+
+    print(f"HTTP Status Code: {response.status}")
+    print(f"Inserted: {result['inserted']}, Errors: {len(result['errors'])}")
+    print(f"{result['inserted'] / elapsed:.0f} laps/s ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
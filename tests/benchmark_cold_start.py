@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+# Manual cold start benchmark, not part of the test suite.
+# Imports function_app in fresh interpreters and times the import and the first request, like a new worker would.
+# Uses the HOST, PORT, USER, PASSWORD and DATABASE environment variables of the Function app.
+
+ROOT = Path(__file__).parent.parent
+
+# -- Runs in the fresh interpreter, prints one JSON line --
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    import function_app
+except Exception as e:
+    print(json.dumps({"import_s": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"}))
+    sys.exit(0)
+imported = time.perf_counter()
+time.sleep(%(delay)s)
+
+import azure.functions as func
+handlers = {function.get_function_name(): function.get_user_function() for function in function_app.app.get_functions()}
+request = func.HttpRequest(method="GET", url="/api/drivers", params={"limit": "1"}, body=b"")
+first = time.perf_counter()
+response = handlers["drivers_get_all"](request)
+print(json.dumps({"import_s": imported - start, "first_request_s": time.perf_counter() - first, "status": response.status_code}))
+"""
+
+
+def export_revision(revision: str, target: Path) -> Path:
+    """Extract `revision` of the repository into `target` with git archive."""
+    archive = target / "revision.tar"
+    with open(archive, "wb") as file:
+        subprocess.run(["git", "archive", revision], cwd=ROOT, stdout=file, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(target / "tree")
+    return target / "tree"
+
+
+def top_imports(tree: Path, env: dict, count: int = 10) -> list:
+    """Modules with the highest cumulative import time, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import function_app"],
+        cwd=tree, env=env, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)} for cumulative, name in modules[:count]]
+
+
+def run(tree: Path, runs: int, delay: float, env: dict) -> dict:
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE % {"delay": delay}],
+            cwd=tree, env=env, capture_output=True, text=True
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            samples.append({"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output"})
+            continue
+        samples.append(json.loads(lines[-1]))
+
+    report = {"runs": runs, "errors": [sample["error"] for sample in samples if "error" in sample][:3]}
+    for key in ("import_s", "first_request_s"):
+        values = [sample[key] * 1000 for sample in samples if key in sample]
+        if values:
+            report[f"{key[:-2]}_p50_ms"] = round(statistics.median(values), 1)
+            report[f"{key[:-2]}_max_ms"] = round(max(values), 1)
+    report["top_imports"] = top_imports(tree, env)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the Function app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds between import and first request, gives the pre-warm time to connect.")
+    parser.add_argument("--baseline", help="Git revision to compare against, e.g. HEAD~1.")
+    parser.add_argument("--no-prewarm", action="store_true", help="Set BACKEND_PREWARM=false.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.no_prewarm:
+        env["BACKEND_PREWARM"] = "false"
+
+    report = {"current": run(ROOT, args.runs, args.delay, env)}
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as directory:
+            report[args.baseline] = run(export_revision(args.baseline, Path(directory)), args.runs, args.delay, env)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, result in report.items():
+        print(f"{name}: import p50 {result.get('import_p50_ms', float('nan')):.1f} ms, first request p50 {result.get('first_request_p50_ms', float('nan')):.1f} ms")
+        for error in result["errors"]:
+            print(f"  error: {error}")
+        for module in result["top_imports"][:5]:
+            print(f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}")
+
+
+if __name__ == "__main__":
+    main()
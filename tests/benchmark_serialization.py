@@ -0,0 +1,124 @@
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+# Manual benchmark, not part of the test suite. Needs no database.
+# Compares the dict-per-row path with RowEncoder on synthetic rows.
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api_backend.serialization import RowEncoder, msgpack, orjson
+from api_backend.entities import driver, drivertime
+
+
+def make_drivertimes(count: int) -> list:
+    drivers = [str(uuid.uuid4()) for _ in range(50)]
+    rows = []
+    for index in range(count):
+        sectors = [random.uniform(20000, 40000) for _ in range(3)]
+        rows.append((index + 1, *sectors, sum(sectors), random.choice(drivers), random.randint(1, 10)))
+    return rows
+
+
+def make_drivers(count: int) -> list:
+    start = datetime(2023, 1, 1)
+    return [(str(uuid.uuid4()), f"Driver {index}", f"driver{index}@email.test", start + timedelta(seconds=index * 37)) for index in range(count)]
+
+
+def drivertimes_dict_path(rows: list) -> bytes:
+    drivertimes = []
+    for drivertime_id, drivertime_sector1, drivertime_sector2, drivertime_sector3, drivertime_laptime, driver_id, convention_id in rows:
+        drivertimes.append({
+            "drivertime_id": drivertime_id,
+            "sector1": drivertime_sector1,
+            "sector2": drivertime_sector2,
+            "sector3": drivertime_sector3,
+            "laptime": drivertime_laptime,
+            "driver_id": driver_id,
+            "convention_id": convention_id
+        })
+    return json.dumps(drivertimes).encode()
+
+
+def drivers_dict_path(rows: list) -> bytes:
+    drivers = []
+    for driver_id, driver_name, driver_email, driver_created in rows:
+        drivers.append({
+            "id": driver_id,
+            "name": driver_name,
+            "email": driver_email,
+            "created": driver_created.strftime("%Y-%m-%d-%H-%M-%S"),
+        })
+    return json.dumps(drivers).encode()
+
+
+def best_of(function, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the list serialization paths.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    datasets = {
+        "drivertimes": (make_drivertimes(args.rows), drivertimes_dict_path, drivertime.ENCODER_COLUMNS),
+        "drivers": (make_drivers(args.rows), drivers_dict_path, driver.ENCODER_COLUMNS),
+    }
+
+    report = {}
+    for name, (rows, dict_path, columns) in datasets.items():
+        expected = json.loads(dict_path(rows))
+        paths = {"dict + json.dumps": dict_path, "RowEncoder (stdlib)": RowEncoder(columns, use_orjson=False).encode}
+        if orjson is not None:
+            paths["RowEncoder (orjson)"] = RowEncoder(columns).encode
+
+        report[name] = {}
+        for path, function in paths.items():
+            assert json.loads(function(rows)) == expected, f"{path} output differs for {name}"
+            report[name][path] = round(best_of(function, rows, args.repeat) * 1000, 1)
+
+    # -- Response formats of the drivertimes list, payload size and client parse time --
+    rows = datasets["drivertimes"][0]
+    encoder = RowEncoder(drivertime.ENCODER_COLUMNS)
+    formats = {"json": json.loads, "columnar": json.loads}
+    if msgpack is not None:
+        formats["msgpack"] = msgpack.unpackb
+    report["formats"] = {}
+    for encoding, parse in formats.items():
+        payload = encoder.encode_as(rows, encoding)
+        report["formats"][encoding] = {
+            "bytes": len(payload),
+            "encode_ms": round(best_of(lambda rows: encoder.encode_as(rows, encoding), rows, args.repeat) * 1000, 1),
+            "parse_ms": round(best_of(parse, payload, args.repeat) * 1000, 1),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    formats = report.pop("formats")
+    for name, paths in report.items():
+        baseline = paths["dict + json.dumps"]
+        for path, milliseconds in paths.items():
+            print(f"{name:<14}{path:<24}{milliseconds:>10.1f} ms{baseline / milliseconds:>8.2f}x")
+
+    print("drivertimes formats")
+    for encoding, result in formats.items():
+        print(f"{encoding:<14}{result['bytes']:>12} bytes{result['encode_ms']:>10.1f} ms encode{result['parse_ms']:>10.1f} ms parse")
+
+
+if __name__ == "__main__":
+    main()
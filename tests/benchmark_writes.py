@@ -0,0 +1,164 @@
+import argparse
+import importlib.util
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+# Manual benchmark of the update and delete paths with simulated network latency, not part of the test suite.
+# Runs the entity functions of the current tree and of a baseline revision against a throwaway Postgres.
+# Needs a local PostgreSQL installation, point --pg-ctl at its pg_ctl if it is not on the PATH.
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+import psycopg2.extensions
+
+from benchmark_backend import create_schema, seed_conventions, seed_drivers, start_postgres
+from api_backend.entities import convention, driver, drivertime
+
+ROOT = Path(__file__).parent.parent
+ENTITIES = ("driver", "drivertime", "convention")
+
+
+class LatencyConnection(psycopg2.extensions.connection):
+    """Sleeps `latency` seconds per round trip, i.e. per execute, commit and rollback, and counts them."""
+    latency = 0.0
+    round_trips = 0
+
+    def _round_trip(self) -> None:
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def commit(self):
+        self._round_trip()
+        return super().commit()
+
+    def rollback(self):
+        self._round_trip()
+        return super().rollback()
+
+
+class LatencyCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        self.connection._round_trip()
+        return super().execute(query, vars)
+
+
+def load_baseline(revision: str) -> dict:
+    """Entity modules of `revision`, loaded next to the current ones."""
+    modules = {}
+    for name in ENTITIES:
+        source = subprocess.run(
+            ["git", "show", f"{revision}:api_backend/entities/{name}.py"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        spec = importlib.util.spec_from_loader(f"baseline_{name}", loader=None)
+        module = importlib.util.module_from_spec(spec)
+        exec(compile(source, f"{revision}:{name}.py", "exec"), module.__dict__)
+        modules[name] = module
+    return modules
+
+
+def cases(modules: dict, connection, driver_ids: list, convention_ids: list) -> list:
+    """(name, setup, function) triples, `setup` runs untimed and without latency and returns the argument."""
+    def insert(query: str, params: tuple):
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            value = cursor.fetchone()[0]
+        connection.commit()
+        return value
+
+    def new_driver():
+        return insert("INSERT INTO drivers (name) VALUES (%s) RETURNING id::text", (f"Benchmark {uuid.uuid4().hex[:8]}",))
+
+    def new_drivertime():
+        return insert(
+            "INSERT INTO drivertimes (sector1, sector2, sector3, laptime, driver, convention) VALUES (1, 1, 1, 3, %s, %s) RETURNING id",
+            (random.choice(driver_ids), random.choice(convention_ids))
+        )
+
+    def new_convention():
+        return insert("INSERT INTO conventions (name, location, date) VALUES ('Benchmark', 'Benchmark', %s) RETURNING id", (date.today(),))
+
+    def call(function, *args):
+        with connection.cursor() as cursor:
+            return function(connection, cursor, *args)
+
+    return [
+        ("put_driver", lambda: random.choice(driver_ids), lambda driver_id: call(modules["driver"].put_driver, driver_id, {"name": "Updated"})),
+        ("delete_driver", new_driver, lambda driver_id: call(modules["driver"].delete_driver, driver_id)),
+        ("delete_drivertime", new_drivertime, lambda drivertime_id: call(modules["drivertime"].delete_drivertime, drivertime_id)),
+        ("delete_convention", new_convention, lambda convention_id: call(modules["convention"].delete_convention, convention_id)),
+    ]
+
+
+def measure(connection, setup, function, latency: float, repeat: int) -> dict:
+    timings = []
+    round_trips = []
+    for _ in range(repeat):
+        connection.latency = 0.0
+        argument = setup()
+        connection.latency = latency
+        connection.round_trips = 0
+        start = time.perf_counter()
+        function(argument)
+        timings.append((time.perf_counter() - start) * 1000)
+        round_trips.append(connection.round_trips)
+    connection.latency = 0.0
+    return {"p50_ms": round(statistics.median(timings), 3), "round_trips": max(round_trips)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update and delete paths of a baseline revision and the current tree under simulated latency.")
+    parser.add_argument("--baseline", default="HEAD~1", help="Git revision to compare against.")
+    parser.add_argument("--latencies", default="1,20", help="Comma separated round trip latencies in ms.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--drivers", type=int, default=100)
+    parser.add_argument("--conventions", type=int, default=5)
+    parser.add_argument("--pg-ctl", default="pg_ctl", help="Path to pg_ctl of the PostgreSQL installation.")
+    parser.add_argument("--port", type=int, default=55433)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    versions = {
+        args.baseline: load_baseline(args.baseline),
+        "current": {"driver": driver, "drivertime": drivertime, "convention": convention},
+    }
+
+    executor, janitor, settings = start_postgres(args)
+    results = []
+    try:
+        connection = psycopg2.connect(
+            host=settings["host"], port=settings["port"], user=settings["user"],
+            password=settings["password"], database=settings["database"],
+            connection_factory=LatencyConnection, cursor_factory=LatencyCursor
+        )
+        create_schema(connection)
+        driver_ids = seed_drivers(connection, args.drivers, random.Random(1))
+        convention_ids = seed_conventions(connection, args.conventions)
+
+        for latency in (float(value) for value in args.latencies.split(",")):
+            for version, modules in versions.items():
+                for name, setup, function in cases(modules, connection, driver_ids, convention_ids):
+                    result = {"latency_ms": latency, "version": version, "name": name, **measure(connection, setup, function, latency / 1000, args.repeat)}
+                    results.append(result)
+                    print(f"{latency:>6.0f} ms {version:<10}{name:<20}{result['p50_ms']:>10.2f} ms p50{result['round_trips']:>4} round trips", file=sys.stderr)
+
+        connection.close()
+
+    finally:
+        janitor.drop()
+        executor.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import sys
+from pathlib import Path
+# Shared fakes for the unit tests, they run without a database.
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# -- function_app reads its settings at import, the tests never connect --
+for name, value in {"PORT": "5432", "HOST": "localhost", "USER": "test", "PASSWORD": "test", "DATABASE": "test"}.items():
+    os.environ.setdefault(name, value)
+os.environ["BACKEND_PREWARM"] = "false"
+os.environ["WRITE_BEHIND_LOG"] = ""
+
+import psycopg2.extensions
+import pytest
+
+# -- Manual scripts that run at import, not tests --
+collect_ignore = ["payload_test.py"]
+
+
+class FakeCursor:
+    """Cursor that records executed queries and returns the queued rows."""
+    def __init__(self, connection, rows: list = None) -> None:
+        self.connection = connection
+        self.rows = list(rows or [])
+        self.executed = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def __iter__(self):
+        rows, self.rows = self.rows, []
+        return iter(rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Connection with the parts of the psycopg2 API the pool and the entity functions use."""
+    def __init__(self, rows: list = None) -> None:
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.cursors = []
+        self.rows = list(rows or [])
+
+    def cursor(self, *args, **kwargs):
+        cursor = FakeCursor(self, self.rows)
+        self.rows = []
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """Replace psycopg2.connect, returns the list of connections made."""
+    connections = []
+
+    def connect(**kwargs):
+        connection = FakeConnection()
+        connections.append(connection)
+        return connection
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    return connections
+
+
+@pytest.fixture
+def fake_connection():
+    """A fresh fake connection, queue the rows its next cursor fetches in `rows`."""
+    return FakeConnection()
+
+
+@pytest.fixture(scope="session")
+def routes():
+    """The function app module and its route handlers by function name, indexed once since indexing registers the blueprints."""
+    import function_app
+    return function_app, {f.get_function_name(): f.get_user_function() for f in function_app.app.get_functions()}
+
+
+@pytest.fixture
+def database(routes, fake_connection, monkeypatch):
+    """Run the entity functions of the backend on a fake connection, queue the rows they fetch in `rows`."""
+    function_app, _ = routes
+    database = fake_connection
+
+    def execute(function, *args, dict_cursor=False, read=False, primary=False, **kwargs):
+        with database.cursor() as cursor:
+            return function(database, cursor, *args, **kwargs)
+
+    monkeypatch.setattr(function_app.backend, "_execute", execute)
+    return database
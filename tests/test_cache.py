@@ -0,0 +1,51 @@
+from api_backend.cache import BestSectorCache
+
+BEST_SECTORS = {
+    "sector_1_best_time": 20.0,
+    "sector_2_best_time": 21.0,
+    "sector_3_best_time": 22.0,
+    "lap_best_time": 63.0,
+}
+
+
+def test_best_sector_cache_hit_and_miss():
+    cache = BestSectorCache(ttl=None)
+    best_sectors, generation = cache.get("A", 1)
+    assert best_sectors is None
+    cache.put("A", 1, BEST_SECTORS, generation)
+    assert cache.get("a", "1")[0] == BEST_SECTORS
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_lap_lowers_cached_entries():
+    cache = BestSectorCache(ttl=None)
+    cache.put("A", 1, BEST_SECTORS, cache.get("A", 1)[1])
+    cache.put(None, 1, BEST_SECTORS, cache.get(None, 1)[1])
+    cache.record_drivertime("A", 1, 19.0, 25.0, 22.0, 66.0)
+    for driver_id in ("A", None):
+        best_sectors = cache.get(driver_id, 1)[0]
+        assert best_sectors["sector_1_best_time"] == 19.0
+        assert best_sectors["sector_2_best_time"] == 21.0
+        assert best_sectors["lap_best_time"] == 63.0
+
+
+def test_result_of_a_query_older_than_a_write_is_not_stored():
+    cache = BestSectorCache(ttl=None)
+    _, generation = cache.get("A", 1)
+    cache.record_drivertime("A", 1, 19.0, 20.0, 21.0, 60.0)
+    cache.put("A", 1, BEST_SECTORS, generation)
+    assert cache.get("A", 1)[0] is None
+
+
+def test_invalidate_clears_entries():
+    cache = BestSectorCache(ttl=None)
+    cache.put("A", 1, BEST_SECTORS, cache.get("A", 1)[1])
+    cache.invalidate()
+    assert cache.get("A", 1)[0] is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_expired_entries_miss():
+    cache = BestSectorCache(ttl=0)
+    cache.put("A", 1, BEST_SECTORS, cache.get("A", 1)[1])
+    assert cache.get("A", 1)[0] is None
@@ -0,0 +1,62 @@
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from api_backend.connection_pool import ConnectionPool, PoolClosed, PoolTimeout
+
+
+def test_open_connects_min_size(fake_connect):
+    pool = ConnectionPool(min_size=2, max_size=4)
+    assert len(fake_connect) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_connections_are_reused(fake_connect):
+    pool = ConnectionPool(min_size=0, max_size=2, open=False)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["created"] == 1
+
+
+def test_checkout_times_out_when_exhausted(fake_connect):
+    pool = ConnectionPool(min_size=0, max_size=1, open=False)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.01)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_open_transaction_is_rolled_back_on_return(fake_connect):
+    pool = ConnectionPool(min_size=0, max_size=1, open=False)
+    conn = pool.getconn()
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_operational_error_discards_connection(fake_connect):
+    pool = ConnectionPool(min_size=0, max_size=1, open=False)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("server closed the connection")
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+    assert pool.getconn() is not conn
+
+
+def test_closed_idle_connection_is_replaced(fake_connect):
+    pool = ConnectionPool(min_size=1, max_size=1)
+    fake_connect[0].closed = 1
+    conn = pool.getconn()
+    assert conn is fake_connect[1]
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_closed_pool_refuses_checkouts(fake_connect):
+    pool = ConnectionPool(min_size=1, max_size=1)
+    pool.close()
+    assert fake_connect[0].closed
+    with pytest.raises(PoolClosed):
+        pool.getconn()
@@ -0,0 +1,26 @@
+import pytest
+
+from api_backend.migration_manager.migrate import _split_statements
+
+
+def test_splits_on_semicolons_and_drops_comments():
+    sql = "-- first; comment\nCREATE INDEX a ON t (x);\n/* block; */ CREATE INDEX b ON t (y);\n"
+    assert _split_statements(sql) == ["CREATE INDEX a ON t (x)", "CREATE INDEX b ON t (y)"]
+
+
+@pytest.mark.parametrize("literal", [
+    "'a;b'",
+    "'it''s;'",
+    '"odd;name"',
+    "$$ SELECT 1; $$",
+    "$body$ SELECT ';'; $body$",
+    "E'it\\'s;'",
+    "e'a\\\\;'",
+    "E'it''s; \\'quoted\\';'",
+])
+def test_semicolons_in_literals_do_not_split(literal):
+    assert _split_statements(f"SELECT {literal}; SELECT 2;") == [f"SELECT {literal}", "SELECT 2"]
+
+
+def test_backslash_outside_escape_strings_does_not_escape():
+    assert _split_statements("SELECT 'a\\'; SELECT 'b';") == ["SELECT 'a\\'", "SELECT 'b'"]
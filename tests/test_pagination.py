@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+from api_backend import pagination
+from api_backend.entities import driver
+
+
+def test_cursor_round_trip():
+    cursor = pagination.encode_cursor(datetime(2023, 5, 1, 12, 30), "4823662a-29c5-47d7-bdba-68baa2825990")
+    assert pagination.decode_cursor(cursor) == ("2023-05-01T12:30:00", "4823662a-29c5-47d7-bdba-68baa2825990")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "e30"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.decode_cursor(cursor)
+
+
+def test_page_size_is_bounded():
+    assert pagination.page_size(None) == pagination.DEFAULT_PAGE_SIZE
+    assert pagination.page_size(10 ** 6) == pagination.MAX_PAGE_SIZE
+    with pytest.raises(ValueError):
+        pagination.page_size(0)
+
+
+def test_sort_column_whitelist():
+    assert pagination.sort_column("Name", driver.SORT_COLUMNS) == ("name", 1)
+    with pytest.raises(ValueError):
+        pagination.sort_column("email; DROP TABLE drivers", driver.SORT_COLUMNS)
+
+
+def test_next_cursor_only_with_more_rows():
+    rows = [(1, "a"), (2, "b"), (3, "c")]
+    assert pagination.next_cursor(rows, 3, 1) is None
+    assert pagination.decode_cursor(pagination.next_cursor(rows, 2, 1)) == ("b", "2")
@@ -0,0 +1,47 @@
+import pytest
+
+from api_backend import pagination, query_builder
+from api_backend.entities import convention, driver, drivertime
+
+
+def test_select_first_page():
+    query = query_builder.Select("drivers", sort_columns=driver.SORT_COLUMNS).page("name", "desc", 10)
+    assert query.build() == ("SELECT * FROM drivers ORDER BY name DESC, id DESC LIMIT %s", (11,))
+    assert (query.size, query.sort_index) == (10, 1)
+
+
+def test_select_filters_then_keyset():
+    after = pagination.encode_cursor(61.5, 7)
+    query = (
+        query_builder.Select("drivertimes", sort_columns=drivertime.SORT_COLUMNS)
+        .filter("driver", None)
+        .filter("convention", 3)
+        .page("laptime", None, 5, after)
+    )
+    assert query.build() == (
+        "SELECT * FROM drivertimes WHERE convention = %s AND (laptime, id) > (%s, %s) ORDER BY laptime ASC, id ASC LIMIT %s",
+        (3, 61.5, "7", 6),
+    )
+
+
+def test_select_text_does_not_depend_on_values():
+    first = query_builder.Select("drivertimes", sort_columns=drivertime.SORT_COLUMNS).filter("convention", 1).page(limit=10)
+    second = query_builder.Select("drivertimes", sort_columns=drivertime.SORT_COLUMNS).filter("convention", 2).page(limit=20)
+    assert first.build()[0] == second.build()[0]
+
+
+def test_insert_skips_missing_values():
+    values = {"name": "Summit", "location": None, "date": "2023-05-01"}
+    assert query_builder.insert("conventions", values, convention.CONVENTION_COLUMNS) == (
+        "INSERT INTO conventions (name, date) VALUES (%s, %s) RETURNING *",
+        ("Summit", "2023-05-01"),
+    )
+
+
+def test_update_only_sets_whitelisted_columns():
+    assert query_builder.update("drivers", {"name": "Max", "createdAt": "x"}, driver.UPDATE_COLUMNS, "id", "abc") == (
+        "UPDATE drivers SET name = %s WHERE id = %s RETURNING *",
+        ("Max", "abc"),
+    )
+    with pytest.raises(ValueError):
+        query_builder.update("drivers", {"createdAt": "x"}, driver.UPDATE_COLUMNS, "id", "abc")
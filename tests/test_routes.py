@@ -0,0 +1,99 @@
+import json
+from datetime import date, datetime
+
+import azure.functions as func
+
+DRIVER_ID = "4823662a-29c5-47d7-bdba-68baa2825990"
+CREATED = datetime(2023, 5, 1, 12, 30, 5)
+
+
+def call(routes, name: str, method: str, params: dict) -> func.HttpResponse:
+    _, handlers = routes
+    return handlers[name](func.HttpRequest(method=method, url="/api/route", params=params, body=b""))
+
+
+def test_post_driver(routes, database):
+    database.rows = [(DRIVER_ID, "Max", "max@example.com", CREATED)]
+    response = call(routes, "drivers_post_driver", "POST", {"name": "Max", "email": "max@example.com"})
+    assert response.status_code == 201
+    assert json.loads(response.get_body()) == {"id": DRIVER_ID, "name": "Max", "email": "max@example.com", "created": "2023-05-01-12-30-05"}
+    assert database.commits == 1
+
+
+def test_post_driver_rejects_invalid_id(routes, database):
+    response = call(routes, "drivers_post_driver", "POST", {"name": "Max", "id": "not-a-uuid"})
+    assert response.status_code == 400
+    assert database.cursors == []
+
+
+def test_put_driver(routes, database):
+    database.rows = [(DRIVER_ID, "Lewis", "max@example.com", CREATED)]
+    response = call(routes, "drivers_update_driver", "PUT", {"id": DRIVER_ID, "name": "Lewis"})
+    assert response.status_code == 200
+    assert json.loads(response.get_body())["name"] == "Lewis"
+    assert database.cursors[0].executed[0][1] == ("Lewis", DRIVER_ID)
+
+
+def test_put_unknown_driver(routes, database):
+    response = call(routes, "drivers_update_driver", "PUT", {"id": DRIVER_ID, "name": "Lewis"})
+    assert response.status_code == 404
+    assert database.rollbacks == 1
+
+
+def test_put_driver_without_values(routes, database):
+    response = call(routes, "drivers_update_driver", "PUT", {"id": DRIVER_ID})
+    assert response.status_code == 400
+
+
+def test_post_convention_without_date(routes, database):
+    database.rows = [(1, "Summit", "Berlin", None)]
+    response = call(routes, "conventions_create_convention", "POST", {"name": "Summit", "location": "Berlin"})
+    assert response.status_code == 201
+    assert json.loads(response.get_body()) == {"id": 1, "name": "Summit", "location": "Berlin", "created": None}
+
+
+def test_post_convention_with_date(routes, database):
+    database.rows = [(1, "Summit", None, date(2023, 5, 1))]
+    response = call(routes, "conventions_create_convention", "POST", {"name": "Summit", "date": "2023-05-01"})
+    assert response.status_code == 201
+    assert json.loads(response.get_body())["created"] == "2023-05-01"
+    assert database.cursors[0].executed[0][1] == ("Summit", date(2023, 5, 1))
+
+
+def test_post_convention_rejects_invalid_date(routes, database):
+    response = call(routes, "conventions_create_convention", "POST", {"name": "Summit", "date": "01.05.2023"})
+    assert response.status_code == 400
+    assert database.cursors == []
+
+
+def test_put_convention_with_null_date(routes, database):
+    database.rows = [(1, "Summit", "Hamburg", None)]
+    response = call(routes, "conventions_update_convention", "PUT", {"id": "1", "location": "Hamburg"})
+    assert response.status_code == 200
+    assert json.loads(response.get_body()) == {"id": 1, "name": "Summit", "location": "Hamburg", "created": None}
+
+
+def test_put_unknown_convention(routes, database):
+    response = call(routes, "conventions_update_convention", "PUT", {"id": "99", "name": "Summit"})
+    assert response.status_code == 404
+    assert database.rollbacks == 1
+
+
+def test_batch_lookup_marks_ids_outside_int4_as_not_found(routes, database):
+    database.rows = [(1, "Summit", None, None)]
+    response = call(routes, "conventions_get_all", "GET", {"ids": "1,99999999999,-2147483649,1"})
+    assert response.status_code == 200
+    assert json.loads(response.get_body()) == [
+        {"id": 1, "name": "Summit", "location": None, "created": None},
+        {"id": 99999999999, "not_found": True},
+        {"id": -2147483649, "not_found": True},
+        {"id": 1, "name": "Summit", "location": None, "created": None},
+    ]
+    assert database.cursors[0].executed[0][1] == ([1],)
+
+
+def test_batch_lookup_without_ids_in_range_skips_the_query(routes, database):
+    response = call(routes, "drivertimes_get_all", "GET", {"ids": "2147483648"})
+    assert response.status_code == 200
+    assert json.loads(response.get_body()) == [{"drivertime_id": 2147483648, "not_found": True}]
+    assert database.cursors == []
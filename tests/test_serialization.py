@@ -0,0 +1,32 @@
+import pytest
+
+from api_backend import serialization
+from api_backend.serialization import negotiate
+
+
+def test_format_param_wins_over_accept():
+    assert negotiate("Columnar", "application/msgpack") == "columnar"
+    with pytest.raises(ValueError):
+        negotiate("xml")
+
+
+@pytest.mark.parametrize("accept, encoding", [
+    (None, "json"),
+    ("text/html", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack", "msgpack"),
+    ("application/msgpack;q=0.1, application/json", "json"),
+    ("application/json;q=0.5, application/vnd.columnar+json;q=0.8", "columnar"),
+    ("application/msgpack;q=0, application/vnd.columnar+json;q=0.2", "columnar"),
+    ("*/*, application/msgpack", "msgpack"),
+    ("application/msgpack;q=0.5, */*;q=0.9", "json"),
+    ("application/msgpack;q=oops, application/vnd.columnar+json;q=0.1", "columnar"),
+    ("application/msgpack; Q=0.3, application/json; q=0.2", "msgpack"),
+])
+def test_accept_header_quality(accept, encoding):
+    assert negotiate(None, accept) == encoding
+
+
+def test_accept_skips_msgpack_without_the_package(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    assert negotiate(None, "application/msgpack, application/vnd.columnar+json;q=0.5") == "columnar"
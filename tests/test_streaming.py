@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from azurefunctions.extensions.http.fastapi import Request
+
+from api_backend import streaming
+from api_backend.entities import driver
+
+DRIVER_ROWS = [
+    ("4823662a-29c5-47d7-bdba-68baa2825990", "Max", "max@example.com", datetime(2023, 5, 1, 12, 30, 5)),
+    ("0b7f4c1e-8d9a-4a43-9b55-2f5c1d6a7e10", "Lewis", None, datetime(2023, 5, 2, 8, 0, 0)),
+    ("9a1f0e52-6c3b-4d27-8e4f-1b2a3c4d5e6f", "Charles", "charles@example.com", datetime(2023, 5, 3, 9, 15, 0)),
+]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 10])
+def test_chunks_join_to_one_array(chunk_rows):
+    chunks = list(streaming.encoded_array_chunks(DRIVER_ROWS, driver.ENCODER, chunk_rows))
+    assert len(chunks) == 2 + -(-len(DRIVER_ROWS) // chunk_rows)
+    assert [row["name"] for row in json.loads(b"".join(chunks))] == ["Max", "Lewis", "Charles"]
+
+
+def test_no_rows_stream_an_empty_array():
+    assert b"".join(streaming.encoded_array_chunks([], driver.ENCODER)) == b"[]"
+
+
+def test_stream_drivers_reads_a_server_side_cursor(fake_connection):
+    fake_connection.rows = list(DRIVER_ROWS)
+    body = b"".join(driver.stream_drivers(fake_connection, sorted_by="name", order="desc", itersize=2))
+
+    assert json.loads(body)[0] == {"id": DRIVER_ROWS[0][0], "name": "Max", "email": "max@example.com", "created": "2023-05-01-12-30-05"}
+    cursor = fake_connection.cursors[0]
+    assert cursor.itersize == 2
+    assert cursor.executed[0][0].endswith("ORDER BY name DESC, id DESC")
+    assert cursor.closed
+    assert fake_connection.commits == 1
+
+
+def test_stream_drivers_rejects_unknown_sort_before_querying(fake_connection):
+    with pytest.raises(ValueError):
+        next(driver.stream_drivers(fake_connection, sorted_by="password"))
+    assert fake_connection.cursors == []
+
+
+@pytest.fixture
+def stream_database(routes, fake_connection, monkeypatch):
+    """Run the streaming entity functions of the backend on a fake connection."""
+    function_app, _ = routes
+
+    def stream_chunks(function, *args, **kwargs):
+        yield from function(fake_connection, *args, **kwargs)
+
+    monkeypatch.setattr(function_app.backend, "_stream_chunks", stream_chunks)
+    return fake_connection
+
+
+def get(routes, name: str, query: str):
+    _, handlers = routes
+    request = Request({"type": "http", "method": "GET", "path": "/", "query_string": query.encode(), "headers": []})
+
+    async def run():
+        response = await handlers[name](request)
+        if not hasattr(response, "body_iterator"):
+            return response, response.body
+        return response, b"".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(run())
+
+
+def test_stream_routes_are_registered(routes):
+    _, handlers = routes
+    assert {"drivers_stream_all", "drivertimes_stream_all", "drivertimes_stream_live"} <= set(handlers)
+
+
+def test_drivers_stream_route(routes, stream_database):
+    stream_database.rows = list(DRIVER_ROWS)
+    response, body = get(routes, "drivers_stream_all", "sorted_by=name")
+    assert response.status_code == 200
+    assert response.media_type == "application/json"
+    assert [row["name"] for row in json.loads(body)] == ["Max", "Lewis", "Charles"]
+
+
+def test_drivers_stream_route_rejects_unknown_sort(routes, stream_database):
+    response, _ = get(routes, "drivers_stream_all", "sorted_by=password")
+    assert response.status_code == 400
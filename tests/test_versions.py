@@ -0,0 +1,40 @@
+from api_backend.versions import VersionTracker
+
+
+def test_scoped_bump_only_changes_its_scope():
+    versions = VersionTracker(ttl=0)
+    first, second = versions.etag(("drivertimes", 1)), versions.etag(("drivertimes", 2))
+    versions.bump("drivertimes", 1)
+    assert versions.etag(("drivertimes", 1)) != first
+    assert versions.etag(("drivertimes", 2)) == second
+
+
+def test_unscoped_bump_changes_every_scope():
+    versions = VersionTracker(ttl=0)
+    etag = versions.etag(("drivertimes", 2))
+    versions.bump("drivertimes")
+    assert versions.etag(("drivertimes", 2)) != etag
+
+
+def test_etag_variants_and_tables_differ():
+    versions = VersionTracker(ttl=0)
+    assert versions.etag(("drivers", None)) != versions.etag(("conventions", None))
+    assert versions.etag(("drivers", None), variant="msgpack") != versions.etag(("drivers", None))
+
+
+def test_if_none_match():
+    versions = VersionTracker(ttl=0)
+    etag = versions.etag(("drivers", None))
+    assert versions.matches(f'"other", W/{etag}', etag)
+    assert not versions.matches(None, etag)
+    versions.bump("drivers")
+    assert not versions.matches(etag, versions.etag(("drivers", None)))
+    assert versions.stats()["not_modified"] == 1
+
+
+def test_integer_scopes_are_normalized():
+    versions = VersionTracker(ttl=0)
+    etag = versions.etag(("drivertimes", "01"))
+    assert versions.etag(("drivertimes", " 1")) == etag
+    versions.bump("drivertimes", 1)
+    assert versions.etag(("drivertimes", "01")) != etag
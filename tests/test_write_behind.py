@@ -0,0 +1,129 @@
+import json
+
+import psycopg2
+import pytest
+
+from api_backend import write_behind
+from api_backend.write_behind import LogInUse, WriteBehindBuffer
+
+DRIVER_ID = "4823662a-29c5-47d7-bdba-68baa2825990"
+
+
+def lap(laptime: float) -> dict:
+    return {"sector1": 1, "sector2": 1, "sector3": 1, "laptime": laptime, "driver_id": DRIVER_ID, "convention_id": 1}
+
+
+class FakeBackend:
+    """Stores posted laps and checkpoints, `lose_replies` commits that many batches and then raises."""
+    def __init__(self, lose_replies: int = 0) -> None:
+        self.laps = []
+        self.checkpoints = {}
+        self.lose_replies = lose_replies
+
+    def post_drivertimes(self, rows: list, checkpoint: tuple = None) -> dict:
+        self.laps.extend(row["laptime"] for row in rows)
+        name, seq = checkpoint
+        self.checkpoints[name] = max(self.checkpoints.get(name, 0), seq)
+        if self.lose_replies:
+            self.lose_replies -= 1
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        return {"inserted": len(rows), "errors": []}
+
+    def get_write_behind_checkpoint(self, name: str) -> int:
+        return self.checkpoints.get(name, 0)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.0)
+
+
+def test_flushes_and_truncates(tmp_path):
+    backend = FakeBackend()
+    path = str(tmp_path / "laps.log")
+    buffer = WriteBehindBuffer(backend, path)
+    buffer.start()
+    for laptime in (60.0, 61.0, 62.0):
+        buffer.append(lap(laptime))
+    buffer.close()
+
+    assert backend.laps == [60.0, 61.0, 62.0]
+    assert backend.checkpoints[buffer.name] == 3
+    with open(path) as file:
+        assert [json.loads(line) for line in file] == [{"checkpoint": 3}]
+
+
+def test_replays_only_laps_after_the_checkpoint(tmp_path):
+    path = str(tmp_path / "laps.log")
+    buffer = WriteBehindBuffer(FakeBackend(), path)
+    for laptime in (60.0, 61.0, 62.0):
+        buffer.append(lap(laptime))
+    buffer.close()
+
+    # -- The first lap was committed before the restart --
+    backend = FakeBackend()
+    backend.checkpoints[buffer.name] = 1
+    restarted = WriteBehindBuffer(backend, path)
+    assert restarted.name == buffer.name
+    restarted.start()
+    restarted.close()
+
+    assert backend.laps == [61.0, 62.0]
+    assert restarted.stats()["replayed"] == 2
+
+
+def test_sequence_numbers_continue_after_a_restart(tmp_path):
+    path = str(tmp_path / "laps.log")
+    buffer = WriteBehindBuffer(FakeBackend(), path)
+    buffer.start()
+    buffer.append(lap(60.0))
+    buffer.close()
+
+    restarted = WriteBehindBuffer(FakeBackend(), path)
+    assert restarted.append(lap(61.0)) == 2
+    restarted.close()
+
+
+def test_batch_committed_before_a_lost_reply_is_not_inserted_twice(tmp_path):
+    backend = FakeBackend(lose_replies=1)
+    buffer = WriteBehindBuffer(backend, str(tmp_path / "laps.log"))
+    buffer.append(lap(60.0))
+    buffer.append(lap(61.0))
+    buffer.start()
+    buffer.close()
+
+    assert backend.laps == [60.0, 61.0]
+    assert buffer.stats()["retries"] == 1
+    assert buffer.stats()["flushed"] == 2
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "laps.log")
+    buffer = WriteBehindBuffer(FakeBackend(), path)
+    buffer.append(lap(60.0))
+    buffer.close()
+    with open(path, "a") as file:
+        file.write('{"seq": 2, "row": {"sect')
+
+    backend = FakeBackend()
+    restarted = WriteBehindBuffer(backend, path)
+    restarted.start()
+    restarted.close()
+    assert backend.laps == [60.0]
+
+
+def test_invalid_lap_is_rejected_before_logging(tmp_path):
+    buffer = WriteBehindBuffer(FakeBackend(), str(tmp_path / "laps.log"))
+    with pytest.raises(ValueError):
+        buffer.append({"sector1": 1})
+    assert buffer.stats()["last_seq"] == 0
+    buffer.close()
+
+
+def test_log_is_owned_by_one_buffer(tmp_path):
+    path = str(tmp_path / "laps.log")
+    buffer = WriteBehindBuffer(FakeBackend(), path)
+    with pytest.raises(LogInUse):
+        WriteBehindBuffer(FakeBackend(), path)
+    buffer.close()
+    WriteBehindBuffer(FakeBackend(), path).close()